@@ -0,0 +1,71 @@
+import os, time, threading
+from typing import Dict
+
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "64"))  # 0 = unlimited
+DEGRADED_SCORING = os.getenv("DEGRADED_SCORING", "0") == "1"            # rule-only answers instead of 503s
+DEADLINE_HEADER = "x-deadline-ms"          # caller's remaining budget in milliseconds
+LATENCY_EWMA_ALPHA = 0.1
+RETRY_AFTER_S = 1
+
+class AdmissionController:
+    """Bounds concurrent `/score` work and drops requests that can't finish in time.
+
+    A request is rejected up front when ADMISSION_MAX_INFLIGHT requests are already
+    admitted (queued for a worker thread or running), or when its deadline is shorter
+    than the recent average latency. An admitted request whose deadline passes while it
+    waits for a thread is dropped before the model runs (`expired`). Rejections are cheap
+    503s, or rule-only scores when DEGRADED_SCORING is on. Every request ends up in exactly
+    one of `accepted` (scored by the model), `shed`, `degraded` or `failed` (answered with an
+    error status, or raised); the outcome is counted once the response is known.
+    """
+
+    def __init__(self, max_inflight: int = ADMISSION_MAX_INFLIGHT):
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.latency_s = 0.0   # EWMA of admitted requests' end-to-end latency
+        self._lock = threading.Lock()
+        self.stats = {"accepted": 0, "shed": 0, "degraded": 0, "failed": 0}
+        self.rejected = {"in_flight": 0, "deadline": 0, "expired": 0}
+
+    def admit(self, budget_s: float | None) -> str | None:
+        """None if admitted (call `release` when done), else why the request was turned away."""
+        with self._lock:
+            if self.max_inflight and self.inflight >= self.max_inflight:
+                reason = "in_flight"
+            elif budget_s is not None and (budget_s <= 0 or budget_s < self.latency_s):
+                reason = "deadline"
+            else:
+                self.inflight += 1
+                return None
+            self.rejected[reason] += 1
+            return reason
+
+    def release(self, elapsed_s: float):
+        with self._lock:
+            self.inflight -= 1
+            a = LATENCY_EWMA_ALPHA
+            self.latency_s = elapsed_s if not self.latency_s else (1 - a) * self.latency_s + a * elapsed_s
+
+    def expired(self):
+        """An admitted request dropped before scoring (its outcome is shed or degraded)."""
+        with self._lock:
+            self.rejected["expired"] += 1
+
+    def count(self, outcome: str):
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {"max_inflight": self.max_inflight, "inflight": self.inflight, "degraded_scoring": DEGRADED_SCORING,
+                    "latency_ewma_ms": round(self.latency_s * 1e3, 3), **self.stats, "rejected": dict(self.rejected)}
+
+def parse_deadline(value: str | None) -> float | None:
+    """Budget in seconds from the deadline header (None when absent or malformed)."""
+    try:
+        return float(value) / 1000 if value is not None else None
+    except ValueError:
+        return None
+
+def deadline_passed(deadline: float | None) -> bool:
+    return deadline is not None and time.monotonic() > deadline
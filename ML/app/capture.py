@@ -0,0 +1,49 @@
+import os, json, time, threading
+from typing import Dict
+
+CAPTURE_PATH = os.getenv("CAPTURE_PATH", "")  # JSONL file; empty = capture off
+
+class TrafficCapture:
+    """Records raw `/score` request bodies with their inter-arrival times, for `replay_traffic.py`.
+
+    One JSON line per request: ``{"ts", "dt", "tenant_header", "outcome", "reason", "status", "body"}``
+    where ``ts`` is the arrival time, taken before admission, and ``dt`` is seconds since the
+    previous arrival. ``outcome`` is ``accepted``, ``shed``, ``degraded`` or ``failed``, and ``reason``
+    is the admission rejection (``in_flight``, ``deadline``, ``expired``) if any. Lines are
+    written when the response is ready, so they are not in arrival order. Writes go through
+    a buffered file under a lock; this is a short-lived diagnostic mode, not the audit journal.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._f = open(path, "a", buffering=1 << 20)
+        self._lock = threading.Lock()
+        self._last = None
+        self.captured = 0
+
+    def arrival(self) -> tuple:
+        """(ts, dt) for a request that just arrived; pass it to `record` with the outcome."""
+        now = time.time()
+        with self._lock:
+            dt = 0.0 if self._last is None else now - self._last
+            self._last = now
+        return now, dt
+
+    def record(self, arrival: tuple, body, tenant_header: str | None = None, outcome: str = "accepted",
+               reason: str | None = None, status: int = 200):
+        ts, dt = arrival
+        if isinstance(body, bytes):  # raw request body: keep it as JSON when it parses
+            try:
+                body = json.loads(body)
+            except ValueError:
+                body = body.decode("utf-8", "replace")
+        line = json.dumps({"ts": ts, "dt": round(dt, 6), "tenant_header": tenant_header, "outcome": outcome,
+                           "reason": reason, "status": status, "body": body})
+        with self._lock:
+            self._f.write(line + "\n")
+            self.captured += 1
+
+    def close(self):
+        with self._lock:
+            self._f.close()
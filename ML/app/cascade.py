@@ -0,0 +1,51 @@
+import os, threading
+from typing import Dict
+import numpy as np
+
+CASCADE_SCORING = os.getenv("CASCADE_SCORING", "0") == "1"
+
+def logit(p):
+    p = np.clip(np.asarray(p, dtype=float), 1e-12, 1 - 1e-12)
+    return np.log(p) - np.log1p(-p)
+
+def sigmoid(m):
+    return 1.0 / (1.0 + np.exp(-np.asarray(m, dtype=float)))
+
+class CascadeScorer:
+    """Two-stage scoring from meta's ``cascade`` block (see ``train/cascade.py``).
+
+    Stage 1 evaluates the first ``trees`` trees and maps that partial margin onto the
+    full-model scale (``a * m + b``). If the result is further than ``margin`` (logit
+    units) from every tier boundary, its tier can't change and the request exits
+    early. Otherwise, only the remaining trees are evaluated and added to the stage-1
+    margin, so a full evaluation costs no more than the plain model.
+    """
+
+    def __init__(self, model, cascade: Dict):
+        self.booster = getattr(model, "booster_", model)
+        self.trees = int(cascade["trees"])
+        self.a, self.b = float(cascade["a"]), float(cascade["b"])
+        self.margin = float(cascade["margin"])
+        self.boundaries = np.asarray(list(cascade["threshold_margins"].values()), dtype=float)
+        self._lock = threading.Lock()
+        self.stats = {"early_exits": 0, "full_evaluations": 0}
+
+    def predict(self, x: np.ndarray, **kwargs) -> np.ndarray:
+        """Uncalibrated risk for the rows of `x`, exactly as the full model would give
+        for rows near a boundary, and the stage-1 estimate for the rest. Extra kwargs
+        (e.g. num_threads) go to LightGBM's predict."""
+        m1 = self.booster.predict(x, num_iteration=self.trees, raw_score=True, **kwargs)
+        est = self.a * m1 + self.b
+        near = np.min(np.abs(est[:, None] - self.boundaries[None, :]), axis=1) <= self.margin
+        if near.any():
+            est[near] = m1[near] + self.booster.predict(x[near], start_iteration=self.trees, raw_score=True, **kwargs)
+        with self._lock:
+            self.stats["full_evaluations"] += int(near.sum())
+            self.stats["early_exits"] += int(len(near) - near.sum())
+        return sigmoid(est)
+
+    def info(self) -> Dict:
+        with self._lock:
+            total = self.stats["early_exits"] + self.stats["full_evaluations"]
+            return {"trees": self.trees, "margin": self.margin, **self.stats,
+                    "early_exit_rate": self.stats["early_exits"] / total if total else None}
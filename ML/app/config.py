@@ -2,6 +2,16 @@ import os
 
 MODEL_DIR = os.getenv("MODEL_DIR", "./model_store")
 MODEL_FALLBACK = os.getenv("MODEL_FALLBACK", "latest")  # or explicit filename
+COMPACT_SUFFIX = "-compact"  # <version>-compact.pkl: size/latency-optimized sibling of <version>.pkl
+SERVE_COMPACT = os.getenv("SERVE_COMPACT", "0") == "1"  # serve the compact sibling when one exists
+# Inference threads per worker: LightGBM's OpenMP pool is per process, so with several uvicorn
+# workers each one gets its share of the cores (0 = auto: cores // workers)
+SERVING_WORKERS = int(os.getenv("SERVING_WORKERS", os.getenv("WEB_CONCURRENCY", "1")))
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))
+PARALLEL_MIN_ROWS = int(os.getenv("INFERENCE_PARALLEL_MIN_ROWS", "512"))  # smaller batches run on one thread
+WARMUP_ROWS = int(os.getenv("WARMUP_ROWS", "200"))  # single-row predictions before the worker reports ready
+TENANTS_SUBDIR = "tenants"  # per-tenant namespaces live under MODEL_DIR/tenants/<tenant_id>/
+TENANT_ID_PATTERN = r"[A-Za-z0-9][A-Za-z0-9_-]{0,63}"  # ids are namespace directory names (UUIDs, slugs)
 FEATURES_REQUIRED = [
     "activity_7d","activity_30d","time_since_last_use_days",
     "failed_renewals_30d","tickets_7d","tickets_30d","plan_value","region","usage_score"
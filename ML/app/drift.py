@@ -0,0 +1,127 @@
+import threading
+from bisect import bisect_right
+from typing import Dict, List
+import numpy as np
+
+REFERENCE_QUANTILES = [i / 10 for i in range(1, 10)]  # decile edges -> up to 10 bins per feature
+PSI_EPS = 1e-4
+
+def reference_statistics(X: np.ndarray, feature_order: List[str]) -> Dict:
+    """Training-time reference saved into meta: per numeric feature mean/std and decile
+    bins with their proportions, plus region shares from the one-hot columns."""
+    X = np.asarray(X, dtype=float)
+    ref = {"samples": int(len(X)), "features": {}, "region": {}}
+    for j, f in enumerate(feature_order):
+        col = X[:, j]
+        if f.startswith("region__"):
+            ref["region"][f.split("__", 1)[1]] = float(col.mean()) if len(col) else 0.0
+            continue
+        edges = np.unique(np.quantile(col, REFERENCE_QUANTILES)).tolist() if len(col) else []
+        counts = np.bincount(np.searchsorted(edges, col, side="right"), minlength=len(edges) + 1)
+        ref["features"][f] = {
+            "mean": float(col.mean()) if len(col) else 0.0,
+            "std": float(col.std()) if len(col) else 0.0,
+            "edges": edges,
+            "proportions": (counts / max(1, len(col))).tolist()
+        }
+    return ref
+
+def sample_reference(reference: Dict, feature_order: List[str], n: int, seed: int = 0) -> np.ndarray:
+    """Rows resembling the training data: each numeric feature drawn uniformly within a
+    reference bin picked by its proportion, one region set by the reference shares."""
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n, len(feature_order)))
+    feats = reference.get("features", {})
+    for j, f in enumerate(feature_order):
+        ref = feats.get(f)
+        if f.startswith("region__") or not ref or not ref["edges"]:
+            continue
+        edges = np.r_[ref["edges"][0], ref["edges"], ref["edges"][-1]]
+        p = np.asarray(ref["proportions"], dtype=float)
+        b = rng.choice(len(p), size=n, p=p / p.sum())
+        X[:, j] = rng.uniform(edges[b], edges[b + 1])
+    regions = [j for j, f in enumerate(feature_order) if f.startswith("region__")]
+    if regions:
+        shares = np.asarray([reference.get("region", {}).get(feature_order[j].split("__", 1)[1], 0.0) for j in regions])
+        shares = shares / shares.sum() if shares.sum() > 0 else None
+        X[np.arange(n), rng.choice(regions, size=n, p=shares)] = 1.0
+    return X
+
+def psi(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Population stability index between two binned distributions (proportions)."""
+    e = np.clip(expected, PSI_EPS, None)
+    a = np.clip(actual, PSI_EPS, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+class DriftMonitor:
+    """Fixed-memory streaming sketches of the live feature vectors for one model.
+
+    Per numeric feature: Welford running mean/variance and counts over the reference
+    decile bins (a fixed quantile sketch, which also gives a binned KS distance); per
+    region: a category count. Memory depends only on the number of features, never
+    on traffic. An update is one lock acquisition plus a bisect per feature.
+    """
+
+    def __init__(self, reference: Dict, feature_order: List[str]):
+        self.reference = reference
+        self._lock = threading.Lock()
+        self._numeric = [(j, f, reference["features"][f]["edges"]) for j, f in enumerate(feature_order)
+                         if f in reference.get("features", {})]
+        self._regions = [(j, f.split("__", 1)[1]) for j, f in enumerate(feature_order) if f.startswith("region__")]
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.n = 0
+            self._mean = {f: 0.0 for _, f, _ in self._numeric}
+            self._m2 = {f: 0.0 for _, f, _ in self._numeric}
+            self._bins = {f: [0] * (len(edges) + 1) for _, f, edges in self._numeric}
+            self._region_counts = {r: 0 for _, r in self._regions}
+
+    def update(self, x: np.ndarray):
+        """Fold one vectorized request (model feature order) into the sketches."""
+        with self._lock:
+            self.n += 1
+            n = self.n
+            for j, f, edges in self._numeric:
+                v = float(x[j])
+                delta = v - self._mean[f]
+                self._mean[f] += delta / n
+                self._m2[f] += delta * (v - self._mean[f])
+                self._bins[f][bisect_right(edges, v)] += 1
+            for j, r in self._regions:
+                if x[j] >= 0.5:
+                    self._region_counts[r] += 1
+
+    def report(self) -> Dict:
+        """PSI and binned KS per feature against the training reference."""
+        with self._lock:
+            n = self.n
+            bins = {f: list(c) for f, c in self._bins.items()}
+            means, m2 = dict(self._mean), dict(self._m2)
+            regions = dict(self._region_counts)
+        out = {"observed": n, "reference_samples": self.reference.get("samples"), "features": {}, "region": {}}
+        if n == 0:
+            return out
+        for _, f, _ in self._numeric:
+            ref = self.reference["features"][f]
+            live = np.asarray(bins[f], dtype=float) / n
+            expected = np.asarray(ref["proportions"], dtype=float)
+            out["features"][f] = {
+                "psi": psi(expected, live),
+                "ks": float(np.max(np.abs(np.cumsum(live) - np.cumsum(expected)))),
+                "live_mean": means[f],
+                "live_std": float(np.sqrt(m2[f] / n)),
+                "reference_mean": ref["mean"],
+                "reference_std": ref["std"]
+            }
+        ref_regions = self.reference.get("region", {})
+        if ref_regions:
+            names = list(ref_regions)
+            live = np.asarray([regions.get(r, 0) for r in names], dtype=float) / n
+            out["region"] = {
+                "psi": psi(np.asarray([ref_regions[r] for r in names]), live),
+                "live_shares": dict(zip(names, live.tolist())),
+                "reference_shares": ref_regions
+            }
+        return out
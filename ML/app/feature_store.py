@@ -0,0 +1,182 @@
+import os, json, math, time, threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable
+import numpy as np
+
+FEATURE_STORE = os.getenv("FEATURE_STORE", "0") == "1"
+FEATURE_STORE_SOURCE = os.getenv("FEATURE_STORE_SOURCE", "")    # JSONL events ingested at startup
+FEATURE_STORE_USERS = os.getenv("FEATURE_STORE_USERS", "")      # users.json with region / plan
+FEATURE_STORE_CLOCK = os.getenv("FEATURE_STORE_CLOCK", "wall")  # "wall" or "event" (latest event seen, for replays)
+
+DAY_S = 86400
+WINDOW_DAYS = 30                      # ring of daily buckets; the 7d window reads the newest 7
+COUNTERS = ["activity", "tickets", "failed_renewals"]
+TICKET_EVENTS = {"ticket_opened"}
+FAILED_RENEWAL_EVENTS = {"plan_renewal_failed", "pre_renewal_card_decline"}
+PLAN_VALUES = {"Basic": 9, "Pro": 29, "Enterprise": 99}  # as in the backend FeatureService
+MAX_EXPECTED_ACTIVITY = 10            # usage_score = min(activity_30d / 10, 1)
+NO_ACTIVITY_DAYS = WINDOW_DAYS        # time_since_last_use_days for users with no events yet
+
+def _epoch(ts) -> float:
+    """Epoch seconds of a numeric or ISO-8601 timestamp; ISO without an offset is UTC."""
+    if isinstance(ts, (int, float)):
+        out = float(ts)
+    else:
+        dt = datetime.fromisoformat(str(ts).replace("Z", "+00:00"))
+        out = (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+    if not math.isfinite(out):
+        raise ValueError(f"non-finite timestamp {ts!r}")
+    return out
+
+def parse_event(event: Dict) -> tuple:
+    """(userId, name, epoch seconds) of a domain event; KeyError / ValueError / TypeError if malformed."""
+    return str(event["userId"]), str(event["name"]), _epoch(event["ts"])
+
+def parse_customer(customer: Dict) -> tuple:
+    """(userId, plan, region) of a customer profile; KeyError / TypeError if malformed."""
+    user_id = customer.get("userId", customer.get("id"))
+    if user_id is None:
+        raise KeyError("userId")
+    plan, region = customer.get("plan"), customer.get("region")
+    if not all(v is None or isinstance(v, str) for v in (plan, region)):
+        raise TypeError(f"plan and region must be strings, got {plan!r}, {region!r}")
+    return str(user_id), plan, region
+
+class FeatureStore:
+    """Rolling-window model inputs per user, maintained from domain events.
+
+    Each user owns one row of compact arrays: a ring of WINDOW_DAYS daily buckets per
+    counter (all events = activity, ``ticket_opened``, failed renewals), the absolute
+    day each bucket holds, the last event time and the plan / region profile. An event
+    touches one bucket; a bucket left over from an older day is zeroed when it is
+    reused, and reads skip buckets outside the window, so expiry is lazy and both
+    ingest and lookup are O(1) per user. Windows are whole UTC days.
+    """
+
+    def __init__(self, clock: str = FEATURE_STORE_CLOCK, capacity: int = 1024):
+        self.clock = clock
+        self._index: Dict[str, int] = {}
+        self._counts = np.zeros((capacity, WINDOW_DAYS, len(COUNTERS)), dtype=np.int32)
+        self._bucket_day = np.full((capacity, WINDOW_DAYS), -1, dtype=np.int64)
+        self._last_ts = np.full(capacity, np.nan)
+        self._plan_value = np.zeros(capacity, dtype=np.float32)
+        self._region = [None] * capacity
+        self._latest_ts = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"events": 0, "late_events": 0, "profiles": 0}
+
+    def _row(self, user_id: str) -> int:
+        row = self._index.get(user_id)
+        if row is None:
+            row = len(self._index)
+            if row == len(self._last_ts):
+                self._grow()
+            self._index[user_id] = row
+        return row
+
+    def _grow(self):
+        n = len(self._last_ts)
+        self._counts = np.concatenate([self._counts, np.zeros_like(self._counts)])
+        self._bucket_day = np.concatenate([self._bucket_day, np.full_like(self._bucket_day, -1)])
+        self._last_ts = np.concatenate([self._last_ts, np.full(n, np.nan)])
+        self._plan_value = np.concatenate([self._plan_value, np.zeros(n, dtype=np.float32)])
+        self._region += [None] * n
+
+    def set_profile(self, user_id: str, plan: str | None = None, region: str | None = None):
+        with self._lock:
+            row = self._row(user_id)
+            if plan is not None:
+                self._plan_value[row] = PLAN_VALUES.get(plan, 0)
+            if region is not None:
+                self._region[row] = region
+            self.stats["profiles"] += 1
+
+    def ingest(self, event: Dict):
+        """Apply one domain event (``{userId, name, ts}``, as the backend stores them)."""
+        self._apply(*parse_event(event))
+
+    def _apply(self, user_id: str, name: str, ts: float):
+        day = int(ts // DAY_S)
+        with self._lock:
+            row = self._row(user_id)
+            slot = day % WINDOW_DAYS
+            held = self._bucket_day[row, slot]
+            if held > day:
+                self.stats["late_events"] += 1   # older than the window the bucket now covers
+                return
+            if held != day:
+                self._counts[row, slot] = 0
+                self._bucket_day[row, slot] = day
+            self._counts[row, slot, 0] += 1
+            self._counts[row, slot, 1] += name in TICKET_EVENTS
+            self._counts[row, slot, 2] += name in FAILED_RENEWAL_EVENTS
+            if not ts <= self._last_ts[row]:   # also true for NaN (first event)
+                self._last_ts[row] = ts
+            self._latest_ts = max(self._latest_ts, ts)
+            self.stats["events"] += 1
+
+    def ingest_many(self, events: Iterable[Dict]) -> int:
+        n = 0
+        for e in events:
+            self.ingest(e)
+            n += 1
+        return n
+
+    def ingest_batch(self, events: Iterable[Dict], customers: Iterable[Dict] = ()) -> int:
+        """All or nothing: every customer and event is parsed before any is applied, so a
+        malformed entry raises with the store untouched. Returns the number of events."""
+        profiles = [parse_customer(c) for c in customers]
+        parsed = [parse_event(e) for e in events]
+        for p in profiles:
+            self.set_profile(*p)
+        for p in parsed:
+            self._apply(*p)
+        return len(parsed)
+
+    def now(self) -> float:
+        return self._latest_ts if self.clock == "event" and self._latest_ts else time.time()
+
+    def features(self, user_id: str, now: float | None = None) -> Dict | None:
+        """The nine model inputs for a user as of `now`, or None for a user never seen."""
+        now = self.now() if now is None else now
+        today = int(now // DAY_S)
+        with self._lock:
+            row = self._index.get(user_id)
+            if row is None:
+                return None
+            days = self._bucket_day[row]
+            counts = self._counts[row]
+            in30 = (days > today - 30) & (days <= today)
+            c30 = counts[in30].sum(axis=0)
+            c7 = counts[in30 & (days > today - 7)].sum(axis=0)
+            last, plan_value, region = self._last_ts[row], self._plan_value[row], self._region[row]
+        return {
+            "activity_7d": int(c7[0]), "activity_30d": int(c30[0]),
+            "time_since_last_use_days": NO_ACTIVITY_DAYS if np.isnan(last) else int(max(0.0, now - last) // DAY_S),
+            "failed_renewals_30d": int(c30[2]),
+            "tickets_7d": int(c7[1]), "tickets_30d": int(c30[1]),
+            "plan_value": float(plan_value),
+            "region": region or "US",
+            "usage_score": min(int(c30[0]) / MAX_EXPECTED_ACTIVITY, 1.0)
+        }
+
+    def info(self) -> Dict:
+        with self._lock:
+            n = len(self._index)
+            nbytes = self._counts.nbytes + self._bucket_day.nbytes + self._last_ts.nbytes + self._plan_value.nbytes
+            return {"users": n, "capacity": len(self._last_ts), "clock": self.clock,
+                    "now": datetime.fromtimestamp(self.now(), timezone.utc).isoformat(),
+                    "mb": round(nbytes / 2**20, 3), **self.stats}
+
+def load_users(store: FeatureStore, path: str) -> int:
+    """Seed plan / region from a ``{"users": [...]}`` file (the mock service's users.json)."""
+    with open(path) as f:
+        users = json.load(f).get("users", [])
+    for u in users:
+        store.set_profile(str(u["id"]), u.get("plan"), u.get("region"))
+    return len(users)
+
+def load_events(store: FeatureStore, path: str) -> int:
+    """Ingest a JSONL file of domain events; the local stand-in for the event stream."""
+    with open(path) as f:
+        return store.ingest_many(json.loads(line) for line in f if line.strip())
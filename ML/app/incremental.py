@@ -0,0 +1,215 @@
+import os, time, threading
+from collections import OrderedDict
+from typing import Dict, Tuple
+import numpy as np
+
+INCREMENTAL_SCORING = os.getenv("INCREMENTAL_SCORING", "0") == "1"
+INCREMENTAL_CACHE_MB = float(os.getenv("INCREMENTAL_CACHE_MB", "256"))
+ZERO_THRESHOLD = 1e-35          # LightGBM's kZeroThreshold
+MISSING = {"None": 0, "Zero": 1, "NaN": 2}
+ENTRY_OVERHEAD_BYTES = 400      # tuple, key, OrderedDict node and array headers
+
+class CompiledEnsemble:
+    """A LightGBM model flattened into node arrays for partial re-evaluation.
+
+    Nodes of all trees share one set of arrays (internal nodes, then leaves). For every leaf, ``lo``/``hi`` hold
+    the per-feature interval its path implies (``lo < x <= hi``). If a changed
+    feature's new value is still inside that interval, the tree's leaf can't move.
+    Categorical splits (a set of category ids goes left) don't narrow the interval;
+    every tree splitting on a categorical feature is re-traversed when it changes.
+    """
+
+    def __init__(self, model):
+        booster = getattr(model, "booster_", model)
+        dump = booster.dump_model()
+        if dump.get("objective", "").split()[0] not in ("binary", "cross_entropy"):
+            raise ValueError(f"incremental scoring needs a sigmoid objective, got {dump.get('objective')!r}")
+        self.n_features = dump["max_feature_idx"] + 1
+        feat, thr, dleft, mtype, left, right = [], [], [], [], [], []
+        leaf_value, lo, hi, roots, leaf_offset = [], [], [], [], []
+        cats = {}   # internal node -> category ids that go left
+        uses = np.zeros((len(dump["tree_info"]), self.n_features), dtype=bool)
+
+        def build(node, t, box_lo, box_hi):
+            if "leaf_value" in node:
+                g = leaf_offset[t] + node.get("leaf_index", 0)   # global id matches pred_leaf numbering
+                leaf_value[g], lo[g], hi[g] = node["leaf_value"], box_lo, box_hi
+                return -(g + 1)
+            i = len(feat)
+            f = node["split_feature"]
+            if node["decision_type"] == "==":
+                cats[i], th = frozenset(int(c) for c in str(node["threshold"]).split("||")), np.nan
+            else:
+                th = float(node["threshold"])
+            feat.append(f); thr.append(th); dleft.append(node["default_left"])
+            mtype.append(MISSING[node["missing_type"]]); left.append(0); right.append(0)
+            uses[t, f] = True
+            l_hi, r_lo = box_hi.copy(), box_lo.copy()
+            if i not in cats:
+                l_hi[f], r_lo[f] = min(box_hi[f], th), max(box_lo[f], th)
+            left[i] = build(node["left_child"], t, box_lo, l_hi)
+            right[i] = build(node["right_child"], t, r_lo, box_hi)
+            return i
+
+        for t, tree in enumerate(dump["tree_info"]):
+            leaf_offset.append(len(leaf_value))
+            leaf_value += [0.0] * tree["num_leaves"]
+            lo += [None] * tree["num_leaves"]
+            hi += [None] * tree["num_leaves"]
+            roots.append(build(tree["tree_structure"], t,
+                               np.full(self.n_features, -np.inf), np.full(self.n_features, np.inf)))
+
+        # Leaves are numbered after the internal nodes: a walk stops once the id reaches n_int
+        n_int = len(feat)
+        node = lambda c: c if c >= 0 else n_int - c - 1
+        self.n_internal = n_int
+        self.feat, self.thr = np.asarray(feat, dtype=np.intp), np.asarray(thr)
+        self.left = np.asarray([node(c) for c in left], dtype=np.intp)
+        self.right = np.asarray([node(c) for c in right], dtype=np.intp)
+        self.default_left, self.missing = np.asarray(dleft, dtype=bool), np.asarray(mtype, dtype=np.int8)
+        self.cats = cats
+        self.has_missing_splits = bool(np.any(self.missing)) or bool(cats)   # no plain `<=` walk
+        self.missing_features = set(self.feat[self.missing != 0].tolist())
+        self.categorical_features = {feat[i] for i in cats}
+        self.leaf_value = np.asarray(leaf_value)
+        self.lo_by_feature = np.ascontiguousarray(np.asarray(lo).T)   # [feature][leaf]
+        self.hi_by_feature = np.ascontiguousarray(np.asarray(hi).T)
+        self.roots = np.asarray([node(r) for r in roots], dtype=np.intp)
+        self.leaf_offset = np.asarray(leaf_offset, dtype=np.intp)
+        self.n_trees = len(roots)
+        self.trees_of = [np.flatnonzero(m) for m in uses.T]   # feature -> trees that split on it
+        self._walk = (self.feat.tolist(), self.thr.tolist(), self.left.tolist(), self.right.tolist(),
+                      self.roots.tolist(), n_int)
+        self.booster = booster
+        self.max_retraverse = self._break_even()
+
+    def _break_even(self, repeats: int = 20) -> int:
+        """Re-traversed tree count beyond which one LightGBM pred_leaf call is cheaper than the Python walk."""
+        x, trees = np.zeros(self.n_features), np.arange(self.n_trees)
+        def best(fn):
+            times = []
+            for _ in range(repeats):
+                t0 = time.perf_counter(); fn(); times.append(time.perf_counter() - t0)
+            return min(times)
+        per_tree = best(lambda: self.traverse(x, trees)) / self.n_trees
+        return max(1, min(self.n_trees, int(best(lambda: self.full(x)) / per_tree)))
+
+    def traverse(self, x: np.ndarray, trees) -> np.ndarray:
+        """Global leaf ids reached by row `x` in `trees`. A plain Python walk over lists:
+        for a single row and a few dozen trees it beats per-level numpy calls several times over."""
+        feat, thr, left, right, roots, n_int = self._walk
+        xl = np.where(np.isnan(x), 0.0, x).tolist() if not self.has_missing_splits else None
+        out = []
+        for t in trees:
+            n = roots[t]
+            if xl is not None:
+                while n < n_int:
+                    n = left[n] if xl[feat[n]] <= thr[n] else right[n]
+            else:
+                while n < n_int:
+                    n = left[n] if self._goes_left(x[feat[n]], n) else right[n]
+            out.append(n - n_int)
+        return np.asarray(out, dtype=np.intp)
+
+    def _goes_left(self, v: float, n: int) -> bool:
+        cats = self.cats.get(n)
+        if cats is not None:   # NaN and negative ids go right; others are truncated like LightGBM's int cast
+            return not np.isnan(v) and v > -1 and int(v) in cats
+        mt = self.missing[n]
+        if np.isnan(v) and mt != 2:
+            v = 0.0
+        if (mt == 1 and abs(v) <= ZERO_THRESHOLD) or (mt == 2 and np.isnan(v)):
+            return bool(self.default_left[n])
+        return v <= self.thr[n]
+
+    def full(self, x: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Leaves of every tree (LightGBM's own pred_leaf) and the raw margin."""
+        local = self.booster.predict(x.reshape(1, -1), pred_leaf=True, num_threads=1)[0]
+        leaves = (self.leaf_offset + local).astype(np.int32)
+        return leaves, float(self.leaf_value[leaves].sum())
+
+    def update(self, x_old: list, x: list, leaves: np.ndarray, margin: float):
+        """Re-evaluate only trees whose leaf can move when `x_old` becomes `x` (plain lists).
+        Returns (leaves, margin, trees_retraversed); `leaves` is updated in place."""
+        changed = [i for i, (a, b) in enumerate(zip(x, x_old)) if a != b and not (a != a and b != b)]
+        if not changed:
+            return leaves, margin, 0
+        # Of the trees splitting on a changed feature, only those whose current leaf box
+        # no longer contains the new value can move
+        moved = []
+        for f in changed:
+            trees, v = self.trees_of[f], x[f]
+            if f in self.categorical_features or (f in self.missing_features and (v != v or abs(v) <= ZERO_THRESHOLD)):
+                moved.append(trees)   # categories, and Zero / NaN taking the default direction, aren't boxed
+                continue
+            v = 0.0 if v != v else v
+            cur = leaves.take(trees)
+            moved.append(trees[(self.lo_by_feature[f].take(cur) >= v) | (v > self.hi_by_feature[f].take(cur))])
+        touched = moved[0] if len(moved) == 1 else np.unique(np.concatenate(moved))
+        if len(touched) == 0:
+            return leaves, margin, 0
+        if len(touched) > self.max_retraverse:
+            leaves, margin = self.full(np.asarray(x, dtype=float))  # LightGBM's C walk is cheaper here
+            return leaves, margin, len(touched)
+        new = self.traverse(np.asarray(x, dtype=float), touched)
+        margin += float(self.leaf_value[new].sum() - self.leaf_value[leaves[touched]].sum())
+        leaves[touched] = new
+        return leaves, margin, len(touched)
+
+class IncrementalScorer:
+    """Per-user cache of (vector, per-tree leaves, margin) keyed by userId and model version.
+
+    A cached user's request only re-traverses trees whose leaf can move for the
+    features that changed since their last request; a new user pays one full
+    evaluation. Entries live in an LRU bounded by INCREMENTAL_CACHE_MB.
+    """
+
+    def __init__(self, model, version: str, budget_mb: float = INCREMENTAL_CACHE_MB):
+        self.ensemble = CompiledEnsemble(model)
+        self.version = version
+        self.entry_bytes = self.ensemble.n_trees * 4 + self.ensemble.n_features * 32 + ENTRY_OVERHEAD_BYTES
+        self.max_entries = max(1, int(budget_mb * 2**20 // self.entry_bytes))
+        self._cache: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "unchanged": 0, "trees_retraversed": 0, "evictions": 0}
+
+    def margin(self, user_id: str, x: np.ndarray) -> float:
+        key = (user_id, self.version)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+        xl = np.asarray(x, dtype=float).ravel().tolist()
+        if entry is None:
+            leaves, m = self.ensemble.full(np.asarray(xl))
+            retraversed = None
+        else:
+            x_old, leaves, m = entry
+            leaves, m, retraversed = self.ensemble.update(x_old, xl, leaves.copy(), m)
+        with self._lock:
+            self._cache[key] = (xl, leaves, m)
+            self._cache.move_to_end(key)
+            if retraversed is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["hits"] += 1
+                self.stats["trees_retraversed"] += retraversed
+                self.stats["unchanged"] += retraversed == 0
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+                self.stats["evictions"] += 1
+        return m
+
+    def predict(self, user_id: str, x: np.ndarray) -> np.ndarray:
+        """Uncalibrated risk, same contract as `predict_risk` for one row."""
+        return np.asarray([1.0 / (1.0 + np.exp(-self.margin(user_id, x)))])
+
+    def info(self) -> Dict:
+        with self._lock:
+            hits = self.stats["hits"]
+            return {
+                "entries": len(self._cache), "max_entries": self.max_entries,
+                "used_mb": round(len(self._cache) * self.entry_bytes / 2**20, 3),
+                "trees": self.ensemble.n_trees, "max_retraverse": self.ensemble.max_retraverse, **self.stats,
+                "avg_trees_per_hit": self.stats["trees_retraversed"] / hits if hits else None
+            }
@@ -0,0 +1,126 @@
+import os, time, threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict
+from .config import FEATURES_REQUIRED
+
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", "")                              # empty = journaling off
+JOURNAL_BUFFER = int(os.getenv("JOURNAL_BUFFER", "65536"))             # records held in memory before dropping
+JOURNAL_FLUSH_S = float(os.getenv("JOURNAL_FLUSH_S", "1.0"))
+JOURNAL_ROTATE_ROWS = int(os.getenv("JOURNAL_ROTATE_ROWS", "1000000"))
+JOURNAL_ROTATE_S = float(os.getenv("JOURNAL_ROTATE_S", "3600"))
+
+NUMERIC_FEATURES = [f for f in FEATURES_REQUIRED if f != "region"]
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema(
+        [("snapshot_ts", pa.timestamp("ms", tz="UTC")), ("userId", pa.string()), ("tenantId", pa.string())]
+        + [(f"features__{f}", pa.float64()) for f in NUMERIC_FEATURES]
+        + [("features__region", pa.string()), ("risk", pa.float64()), ("tier", pa.string()), ("modelVersion", pa.string())]
+    )
+
+class ScoreJournal:
+    """Append-only journal of scored requests, written off the request path.
+
+    `record` only appends a tuple to a bounded in-memory buffer; when the buffer is
+    full the record is dropped and counted instead of waiting. A background thread
+    drains the buffer every JOURNAL_FLUSH_S into Parquet files under `journal_dir`,
+    one row group per flush. Files are rotated by row count and age and only appear
+    as ``*.parquet`` once closed, so readers never see a half-written file. Columns
+    follow the training snapshot layout (``snapshot_ts``, ``features__<name>``).
+    """
+
+    def __init__(self, journal_dir: str, capacity: int = JOURNAL_BUFFER, flush_s: float = JOURNAL_FLUSH_S,
+                 rotate_rows: int = JOURNAL_ROTATE_ROWS, rotate_s: float = JOURNAL_ROTATE_S):
+        self.journal_dir = journal_dir
+        self.capacity = capacity
+        self.flush_s = flush_s
+        self.rotate_rows = rotate_rows
+        self.rotate_s = rotate_s
+        self._buf: deque = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._writer = None
+        self._path = None
+        self._opened_at = 0.0
+        self._file_rows = 0
+        self._seq = 0   # files opened by this journal; keeps names unique within a second
+        self.stats = {"recorded": 0, "dropped": 0, "written": 0, "files": 0, "write_errors": 0}
+        os.makedirs(journal_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="score-journal", daemon=True)
+        self._thread.start()
+
+    def record(self, user_id: str, tenant_id: str | None, features: Dict, risk: float, tier: str, version: str):
+        rec = (time.time(), user_id, tenant_id, features, risk, tier, version)
+        with self._lock:
+            if len(self._buf) >= self.capacity:
+                self.stats["dropped"] += 1
+                return
+            self._buf.append(rec)
+            self.stats["recorded"] += 1
+
+    def _drain(self) -> deque:
+        with self._lock:
+            batch, self._buf = self._buf, deque()  # swap, so the lock is held for O(1)
+        return batch
+
+    def _run(self):
+        while not self._stop.wait(self.flush_s):
+            self._flush()
+        self._flush()
+        self._close_file()
+
+    def _flush(self):
+        batch = self._drain()
+        try:
+            if batch:
+                self._write(batch)
+            if self._writer is not None and time.monotonic() - self._opened_at >= self.rotate_s:
+                self._close_file()
+        except Exception as e:  # never let a disk problem kill the writer thread
+            self.stats["write_errors"] += 1
+            print(f"⚠️  Score journal write failed ({len(batch)} records lost): {e}")
+
+    def _write(self, batch: deque):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        cols = {
+            "snapshot_ts": [int(r[0] * 1000) for r in batch],
+            "userId": [r[1] for r in batch],
+            "tenantId": [r[2] for r in batch],
+            **{f"features__{f}": [float(r[3].get(f, 0.0)) for r in batch] for f in NUMERIC_FEATURES},
+            "features__region": [str(r[3].get("region", "US")) for r in batch],
+            "risk": [r[4] for r in batch],
+            "tier": [r[5] for r in batch],
+            "modelVersion": [r[6] for r in batch],
+        }
+        table = pa.Table.from_pydict(cols, schema=_schema())
+        if self._writer is None:
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+            self._seq += 1
+            self._path = os.path.join(self.journal_dir, f"scores-{stamp}-{os.getpid()}-{self._seq:06d}.parquet")
+            self._writer = pq.ParquetWriter(self._path + ".tmp", table.schema)
+            self._opened_at, self._file_rows = time.monotonic(), 0
+        self._writer.write_table(table)
+        self._file_rows += len(batch)
+        self.stats["written"] += len(batch)
+        if self._file_rows >= self.rotate_rows:
+            self._close_file()
+
+    def _close_file(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        os.replace(self._path + ".tmp", self._path)  # publish only complete files
+        self._writer = None
+        self.stats["files"] += 1
+
+    def close(self, timeout: float = 10.0):
+        """Flush what is buffered and close the current file (call on shutdown)."""
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {"dir": self.journal_dir, "buffered": len(self._buf), "capacity": self.capacity, **self.stats}
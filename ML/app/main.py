@@ -1,52 +1,282 @@
-from fastapi import FastAPI, HTTPException
-from .schemas import ScoreIn, ScoreOut, HealthOut
-from .model_registry import load_model
-from .reasons import rule_based_reasons
-from .config import FEATURES_REQUIRED
+# Time app imports from here on; the report is printed once startup has finished
+import time, threading
+from .startup import ImportTimer, StartupReport, STARTUP_REPORT
+STARTUP = StartupReport()
+IMPORT_TIMER = ImportTimer().install() if STARTUP_REPORT else None
 
-import numpy as np
+from fastapi import FastAPI, HTTPException, Header, Request
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from .schemas import ScoreIn, ScoreOut, HealthOut, EventsIn
+from .model_registry import load_model, calibrate
+from .tenant_models import ServingModel, TenantModelCache
+from .reasons import rule_based_reasons, rule_based_score
+from .config import FEATURES_REQUIRED, SERVE_COMPACT
+from .journal import ScoreJournal, JOURNAL_DIR
+from .capture import TrafficCapture, CAPTURE_PATH
+from .score_table import ScoreTableReader, ScoreTableCache
+from .feature_store import (FeatureStore, load_events, load_users, FEATURE_STORE,
+                            FEATURE_STORE_SOURCE, FEATURE_STORE_USERS)
+from .admission import (AdmissionController, parse_deadline, deadline_passed, DEADLINE_HEADER,
+                        DEGRADED_SCORING, RETRY_AFTER_S)
 
 app = FastAPI(title="CS-ML Service", version="1.0")
 
-# Load model on startup
-MODEL, META = load_model(None)
-FEATURE_ORDER = META["feature_order"]           # list[str]
-ENCODER = META.get("encoders", {})              # e.g., region one-hot mapping
-THRESHOLDS = META.get("thresholds", {"med":0.4, "high":0.7})
-MODEL_VERSION = META["version"]
-
-def vectorize(feat: dict) -> np.ndarray:
-    # Basic: numerical passthrough + region one-hot (stored in META)
-    x = []
-    for f in FEATURE_ORDER:
-        if f.startswith("region__"):
-            reg = f.split("__",1)[1]
-            val = 1.0 if feat.get("region","US")==reg else 0.0
-            x.append(val)
-        else:
-            x.append(float(feat.get(f, 0.0)))
-    return np.asarray(x, dtype=float)
+# Set in the startup phase (load_default_model); tenant models load lazily on first request
+DEFAULT_MODEL: ServingModel | None = None
+MODELS: TenantModelCache | None = None
+MODEL_VERSION: str | None = None
+# Scored requests are journaled off the request path when JOURNAL_DIR is set
+JOURNAL = ScoreJournal(JOURNAL_DIR) if JOURNAL_DIR else None
+# Raw request bodies with inter-arrival times for replay_traffic.py when CAPTURE_PATH is set
+CAPTURE = TrafficCapture(CAPTURE_PATH) if CAPTURE_PATH else None
+# Rolling-window features maintained from domain events, so /score can take just a userId
+FEATURES = FeatureStore() if FEATURE_STORE else None
+# Bounds in-flight /score requests; overload is shed with fast 503s or rule-only scores
+ADMISSION = AdmissionController()
+STARTUP.phases["app_import"] = round(STARTUP.elapsed(), 4)
+
+# Liveness (/healthz) is up once the model is loaded; readiness (/readyz) waits for warm-up
+READY = threading.Event()
+
+@app.on_event("startup")
+def load_default_model():
+    # Importing this module does no I/O; uvicorn only accepts requests after this returns
+    global DEFAULT_MODEL, MODELS, MODEL_VERSION
+    with STARTUP.phase("model_load"):
+        DEFAULT_MODEL = ServingModel(*load_model(None, compact=SERVE_COMPACT))
+        MODELS = TenantModelCache(DEFAULT_MODEL)
+        MODEL_VERSION = DEFAULT_MODEL.version
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+def warm_up():
+    if FEATURES is not None:
+        try:
+            with STARTUP.phase("feature_store_load"):
+                if FEATURE_STORE_USERS:
+                    print(f"👤 Feature store: {load_users(FEATURES, FEATURE_STORE_USERS)} customer profiles")
+                if FEATURE_STORE_SOURCE:
+                    print(f"📥 Feature store: {load_events(FEATURES, FEATURE_STORE_SOURCE)} events from {FEATURE_STORE_SOURCE}")
+        except Exception as e:
+            # A half-loaded store would serve wrong features: stay unready and say why in /readyz
+            STARTUP.failed("feature_store_load", e)
+            return
+    try:
+        with STARTUP.phase("warm_up"):
+            STARTUP.warm_up = DEFAULT_MODEL.warm_up()
+    except Exception as e:
+        # Warm-up only pre-touches caches; serving cold beats never becoming ready
+        STARTUP.failed("warm_up", e)
+    READY.set()
+    STARTUP.ready(IMPORT_TIMER)
+    if STARTUP_REPORT:
+        STARTUP.print()
+
+# Precomputed per-user scores (score_all.py), one reader per registry namespace (LRU-bounded)
+SCORE_TABLES = ScoreTableCache()
+
+def score_table(tenant_id: str | None) -> ScoreTableReader:
+    try:
+        return SCORE_TABLES.get(tenant_id)
+    except ValueError as e:  # not a valid registry namespace, e.g. "../x"
+        raise HTTPException(400, str(e))
+
+def serving_model(tenant_id: str | None) -> ServingModel:
+    try:
+        return MODELS.get(tenant_id)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+@app.on_event("shutdown")
+def flush_journal():
+    if JOURNAL is not None:
+        JOURNAL.close()
+    if CAPTURE is not None:
+        CAPTURE.close()
 
 @app.get("/healthz", response_model=HealthOut)
 def health():
-    return HealthOut(ok=True, modelVersion=MODEL_VERSION)
+    # Liveness: the process is up and has a model; `ready` tells whether warm-up is done
+    return HealthOut(ok=True, ready=READY.is_set(), modelVersion=MODEL_VERSION)
 
-@app.post("/score", response_model=ScoreOut)
-def score(inp: ScoreIn):
-    # Basic input check
+@app.get("/readyz", response_model=HealthOut)
+def ready():
+    # Readiness: route traffic here only after warm-up, so no request pays for cold caches
+    if not READY.is_set():
+        if "feature_store_load" in STARTUP.errors:
+            raise HTTPException(503, f"feature store load failed: {STARTUP.errors['feature_store_load']}")
+        raise HTTPException(503, "warming up")
+    return HealthOut(ok=True, ready=True, modelVersion=MODEL_VERSION)
+
+@app.get("/startup")
+def startup_report():
+    return STARTUP.info()
+
+@app.get("/models")
+def models():
+    return MODELS.info()
+
+@app.get("/journal")
+def journal():
+    if JOURNAL is None:
+        return {"enabled": False}
+    return {"enabled": True, **JOURNAL.info()}
+
+@app.get("/cascade")
+def cascade(tenantId: str | None = None):
+    # Early-exit counters for the model serving this tenant (CASCADE_SCORING=1)
+    m = serving_model(tenantId)
+    if m.cascade is None:
+        return {"enabled": False, "modelVersion": m.version}
+    return {"enabled": True, "modelVersion": m.version, **m.cascade.info()}
+
+@app.get("/incremental")
+def incremental(tenantId: str | None = None):
+    # Per-user leaf cache counters for the model serving this tenant (INCREMENTAL_SCORING=1)
+    m = serving_model(tenantId)
+    if m.incremental is None:
+        return {"enabled": False, "modelVersion": m.version}
+    return {"enabled": True, "modelVersion": m.version, **m.incremental.info()}
+
+def feature_store() -> FeatureStore:
+    if FEATURES is None:
+        raise HTTPException(404, "feature store is disabled; set FEATURE_STORE=1")
+    return FEATURES
+
+@app.post("/events")
+def ingest_events(inp: EventsIn):
+    try:
+        n = feature_store().ingest_batch(inp.events, inp.customers)  # nothing is applied if any entry is bad
+    except (KeyError, ValueError, TypeError) as e:
+        raise HTTPException(400, f"bad event or customer: {e!r}")
+    return {"ingested": n, "customers": len(inp.customers)}
+
+@app.get("/features/{userId}")
+def user_features(userId: str):
+    feats = feature_store().features(userId)
+    if feats is None:
+        raise HTTPException(404, f"no events or profile for user {userId}")
+    return {"userId": userId, "features": feats}
+
+@app.get("/feature_store")
+def feature_store_info():
+    if FEATURES is None:
+        return {"enabled": False}
+    return {"enabled": True, **FEATURES.info()}
+
+@app.get("/score_table")
+def score_table_info(tenantId: str | None = None):
+    return score_table(tenantId).info()
+
+@app.get("/drift")
+def drift(tenantId: str | None = None, reset: bool = False):
+    # PSI / KS of live traffic since startup (or the last reset) against the model's training data
+    m = serving_model(tenantId)
+    if m.drift is None:
+        raise HTTPException(404, f"model {m.version} has no reference_stats; retrain to enable drift monitoring")
+    report = {"modelVersion": m.version, **m.drift.report()}
+    if reset:
+        m.drift.reset()
+    return report
+
+def resolve_features(inp: ScoreIn):
+    # Without features, use the user's rolling-window features from the event stream
     if not inp.features:
-        raise HTTPException(400, "features are required for scoring in MVP")
+        if FEATURES is None:
+            raise HTTPException(400, "features are required unless the feature store is enabled (FEATURE_STORE=1)")
+        inp.features = FEATURES.features(inp.userId)
+        if inp.features is None:
+            raise HTTPException(404, f"no events or profile for user {inp.userId}")
     # Fill missing with sensible defaults
     for k in FEATURES_REQUIRED:
         inp.features.setdefault(k, 0 if k!="region" else "US")
 
-    x = vectorize(inp.features).reshape(1, -1)
-    # LightGBM sklearn API uses predict_proba for binary
-    if hasattr(MODEL, "predict_proba"):
-        p = float(MODEL.predict_proba(x)[0,1])
+def overloaded(inp: ScoreIn | None, reason: str, request: Request) -> JSONResponse:
+    # Fast answer without the model: a flagged rule-only score, or a 503 the caller can retry
+    if DEGRADED_SCORING and inp is not None:
+        try:
+            resolve_features(inp)
+        except HTTPException as e:
+            return JSONResponse({"detail": e.detail}, status_code=e.status_code)
+        risk, tier = rule_based_score(inp.features)
+        ADMISSION.count("degraded")
+        request.state.outcome = ("degraded", reason)
+        out = ScoreOut(risk=risk, tier=tier, reasons=rule_based_reasons(inp.features), modelVersion="rules", degraded=True)
+        return JSONResponse(out.model_dump(), headers={"X-Degraded": reason})
+    ADMISSION.count("shed")
+    request.state.outcome = ("shed", reason)
+    return JSONResponse({"detail": f"overloaded: {reason}"}, status_code=503, headers={"Retry-After": str(RETRY_AFTER_S)})
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    # Runs on the event loop, before the request queues for a worker thread
+    if request.method != "POST" or request.url.path != "/score":
+        return await call_next(request)
+    t0 = time.monotonic()
+    # Captured on arrival, before admission, so shed traffic is replayed too
+    arrival = CAPTURE.arrival() if CAPTURE is not None else None
+    body = await request.body() if CAPTURE is not None or DEGRADED_SCORING else None
+    budget = parse_deadline(request.headers.get(DEADLINE_HEADER))
+    reason = ADMISSION.admit(budget)
+    if reason is not None:
+        inp = None
+        if DEGRADED_SCORING:
+            try:
+                inp = ScoreIn.model_validate_json(body)
+            except ValidationError:
+                pass
+        response = overloaded(inp, reason, request)
     else:
-        p = float(MODEL.predict(x))  # fallback if calibrated model wrapper
-    tier = "high" if p >= THRESHOLDS["high"] else "med" if p >= THRESHOLDS["med"] else "low"
+        request.state.deadline = t0 + budget if budget is not None else None
+        try:
+            response = await call_next(request)
+        except Exception:
+            ADMISSION.count("failed")
+            raise
+        finally:
+            ADMISSION.release(time.monotonic() - t0)
+    # Shed / degraded answers counted themselves; anything else is counted by how it ended
+    outcome, reason = getattr(request.state, "outcome", (None, None))
+    if outcome is None:
+        outcome = "accepted" if response.status_code < 400 else "failed"
+        ADMISSION.count(outcome)
+    if CAPTURE is not None:
+        CAPTURE.record(arrival, body, request.headers.get("x-tenant-id"), outcome, reason, response.status_code)
+    return response
+
+@app.get("/admission")
+def admission():
+    return ADMISSION.info()
+
+@app.post("/score", response_model=ScoreOut)
+def score(inp: ScoreIn, request: Request, x_tenant_id: str | None = Header(default=None)):
+    # Don't spend model time on an answer the caller has already given up on
+    if deadline_passed(getattr(request.state, "deadline", None)):
+        ADMISSION.expired()
+        return overloaded(inp, "expired", request)
+    resolve_features(inp)
+
+    tenant_id = inp.tenantId or x_tenant_id
+    m = serving_model(tenant_id)  # tenant's own model, else the shared default
+    x = m.vectorize(inp.features).reshape(1, -1)
+    p_raw = m.predict(x, inp.userId)  # incremental, cascade or full model, on one thread
+    p = float(calibrate(p_raw, m.calibration)[0])  # tiers are defined on calibrated risk
+    if m.drift is not None:
+        m.drift.update(x[0])
+    tier = "high" if p >= m.thresholds["high"] else "med" if p >= m.thresholds["med"] else "low"
     reasons = rule_based_reasons(inp.features)
+    if JOURNAL is not None:
+        JOURNAL.record(inp.userId, tenant_id, inp.features, p, tier, m.version)
+
+    return ScoreOut(risk=round(p, 6), tier=tier, reasons=reasons, modelVersion=m.version)
 
-    return ScoreOut(risk=round(p, 6), tier=tier, reasons=reasons, modelVersion=MODEL_VERSION)
\ No newline at end of file
+@app.get("/score/{userId}", response_model=ScoreOut)
+def precomputed_score(userId: str, tenantId: str | None = None, x_tenant_id: str | None = Header(default=None)):
+    # Lookup in the last batch-scored table; no features or model call needed
+    reader = score_table(tenantId or x_tenant_id)
+    hit = reader.lookup(userId)
+    if hit is None:
+        if reader.table is None:
+            raise HTTPException(503, "no score table published yet; run score_all.py")
+        raise HTTPException(404, f"user {userId} is not in score table {reader.table.info['generated_at']}")
+    return ScoreOut(**hit)
@@ -1,25 +1,58 @@
-import os, json, glob, joblib
+import os, re, json, glob
+import numpy as np
 from typing import Tuple, Dict, Any
-from .config import MODEL_DIR
+from .config import MODEL_DIR, TENANTS_SUBDIR, TENANT_ID_PATTERN, COMPACT_SUFFIX
 
-def latest_model_path() -> str:
-    paths = sorted(glob.glob(os.path.join(MODEL_DIR, "*.pkl")))
+def tenant_model_dir(tenant_id: str | None = None) -> str:
+    """Registry namespace for a tenant; `None` is the shared default namespace."""
+    if not tenant_id:
+        return MODEL_DIR
+    if not re.fullmatch(TENANT_ID_PATTERN, tenant_id):
+        raise ValueError(f"Invalid tenant id: {tenant_id!r}")
+    return os.path.join(MODEL_DIR, TENANTS_SUBDIR, tenant_id)
+
+def latest_model_path(model_dir: str | None = None, compact: bool = False) -> str:
+    """Newest full model; with `compact`, its `-compact` sibling if one was saved."""
+    model_dir = model_dir or MODEL_DIR
+    paths = sorted(p for p in glob.glob(os.path.join(model_dir, "*.pkl")) if not p.endswith(COMPACT_SUFFIX + ".pkl"))
     if not paths:
-        raise FileNotFoundError("No models found in model_store/")
+        raise FileNotFoundError(f"No models found in {model_dir}/")
+    if compact and os.path.exists(paths[-1].replace(".pkl", COMPACT_SUFFIX + ".pkl")):
+        return paths[-1].replace(".pkl", COMPACT_SUFFIX + ".pkl")
     return paths[-1]
 
-def load_model(path: str | None = None) -> Tuple[Any, Dict]:
-    p = path or latest_model_path()
+def load_model(path: str | None = None, tenant_id: str | None = None, compact: bool = False) -> Tuple[Any, Dict]:
+    import joblib  # deferred: ~0.2s to import, and only needed once a model is read or written
+    p = path or latest_model_path(tenant_model_dir(tenant_id), compact)
     model = joblib.load(p)
     meta_path = p.replace(".pkl", ".meta.json")
     with open(meta_path, "r") as f:
         meta = json.load(f)
     return model, meta
 
-def save_model(model, meta: Dict, version: str) -> str:
-    os.makedirs(MODEL_DIR, exist_ok=True)
-    pkl = os.path.join(MODEL_DIR, f"{version}.pkl")
+def predict_risk(model, X, **kwargs) -> np.ndarray:
+    """Positive-class probability for an sklearn LGBMClassifier or a raw lightgbm Booster.
+    Extra kwargs (e.g. num_threads) are passed through to LightGBM's predict."""
+    if hasattr(model, "predict_proba"):
+        return model.predict_proba(X, **kwargs)[:, 1]
+    return np.asarray(model.predict(X, **kwargs), dtype=float).reshape(-1)  # Booster (out-of-core training)
+
+def calibrate(p, calibration: Dict | None) -> np.ndarray:
+    """Raw model scores -> calibrated risk through meta's piecewise-linear table (identity if absent)."""
+    if not calibration:
+        return np.asarray(p, dtype=float)
+    return np.interp(p, calibration["x"], calibration["y"])
+
+def save_model(model, meta: Dict, version: str, tenant_id: str | None = None) -> str:
+    import joblib
+    model_dir = tenant_model_dir(tenant_id)
+    os.makedirs(model_dir, exist_ok=True)
+    pkl = os.path.join(model_dir, f"{version}.pkl")
     joblib.dump(model, pkl, compress=3)
-    with open(os.path.join(MODEL_DIR, f"{version}.meta.json"), "w") as f:
-        json.dump(meta, f, indent=2)
-    return pkl
\ No newline at end of file
+    write_meta(meta, version, tenant_id)
+    return pkl
+
+def write_meta(meta: Dict, version: str, tenant_id: str | None = None):
+    """(Re)write `<version>.meta.json`, e.g. to add facts known only after the model was saved."""
+    with open(os.path.join(tenant_model_dir(tenant_id), f"{version}.meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
\ No newline at end of file
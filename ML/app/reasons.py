@@ -1,10 +1,39 @@
-from typing import Dict, List
+from typing import Dict, List, Mapping, Tuple
+import numpy as np
+
+# (reason, feature, default when missing, condition); conditions work on scalars and arrays alike
+RULES = [
+    ("inactive_14d",         "time_since_last_use_days", 0,   lambda v: v >= 14),
+    ("payment_issue_recent", "failed_renewals_30d",      0,   lambda v: v >= 1),
+    ("no_recent_activity",   "activity_7d",              0,   lambda v: v == 0),
+    ("low_feature_usage",    "usage_score",              1.0, lambda v: v < 0.3),
+]
+FALLBACK_REASON = "general_risk_factors"
+MAX_REASONS = 3
+# Provisional risk when the model is skipped (admission control): base + weight per fired rule
+RULE_RISK = {"inactive_14d": 0.3, "payment_issue_recent": 0.3, "no_recent_activity": 0.15, "low_feature_usage": 0.15}
+RULE_BASE_RISK, RULE_MAX_RISK = 0.05, 0.95
+RULE_TIERS = {"high": 0.6, "med": 0.3}
 
 def rule_based_reasons(feat: Dict) -> List[str]:
-    r = []
-    if feat.get("time_since_last_use_days", 0) >= 14: r.append("inactive_14d")
-    if feat.get("failed_renewals_30d", 0) >= 1:       r.append("payment_issue_recent")
-    if feat.get("activity_7d", 0) == 0:               r.append("no_recent_activity")
-    if feat.get("usage_score", 1.0) < 0.3:            r.append("low_feature_usage")
-    if not r: r.append("general_risk_factors")
-    return r[:3]
\ No newline at end of file
+    r = [name for name, f, default, cond in RULES if cond(feat.get(f, default))]
+    if not r: r.append(FALLBACK_REASON)
+    return r[:MAX_REASONS]
+
+def rule_based_score(feat: Dict) -> Tuple[float, str]:
+    """Model-free (risk, tier) from the same rules; coarse, for degraded answers only."""
+    fired = [name for name, f, default, cond in RULES if cond(feat.get(f, default))]
+    risk = min(RULE_BASE_RISK + sum(RULE_RISK[r] for r in fired), RULE_MAX_RISK)
+    tier = "high" if risk >= RULE_TIERS["high"] else "med" if risk >= RULE_TIERS["med"] else "low"
+    return round(risk, 6), tier
+
+def reason_masks(cols: Mapping[str, np.ndarray], n: int) -> Dict[str, np.ndarray]:
+    """Columnar `rule_based_reasons`: one boolean mask per reason over `n` rows."""
+    out, emitted = {}, np.zeros(n, dtype=np.int8)
+    for name, f, default, cond in RULES:
+        v = np.asarray(cols[f], dtype=float) if f in cols else np.full(n, default, dtype=float)
+        fired = np.asarray(cond(v), dtype=bool)
+        out[name] = fired & (emitted < MAX_REASONS)
+        emitted += fired
+    out[FALLBACK_REASON] = emitted == 0
+    return out
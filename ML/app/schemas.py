@@ -1,16 +1,23 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Optional, Literal
+from typing import Any, Dict, List, Optional, Literal
 
 class ScoreIn(BaseModel):
     userId: str
-    features: Dict[str, float | int | str] = Field(default_factory=dict)
+    tenantId: Optional[str] = None  # or X-Tenant-Id header; routes to the tenant's model
+    features: Dict[str, float | int | str] = Field(default_factory=dict)  # empty: read from the feature store
+
+class EventsIn(BaseModel):
+    events: List[Dict[str, Any]] = Field(default_factory=list)     # {userId, name, ts}, as the backend stores them
+    customers: List[Dict[str, Any]] = Field(default_factory=list)  # {id or userId, plan, region}
 
 class ScoreOut(BaseModel):
     risk: float
     tier: Literal["low","med","high"]
     reasons: list[str]
     modelVersion: str
+    degraded: bool = False  # rule-only provisional score, served under overload (see /admission)
 
 class HealthOut(BaseModel):
     ok: bool
+    ready: bool = True  # warm-up finished (see /readyz)
     modelVersion: str
\ No newline at end of file
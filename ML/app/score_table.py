@@ -0,0 +1,173 @@
+import os, json, time, shutil, threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict
+import numpy as np
+from .model_registry import tenant_model_dir
+from .reasons import RULES, FALLBACK_REASON
+
+SCORE_TABLE_SUBDIR = "score_table"   # <registry namespace>/score_table/, next to the tenant's models
+SCORE_TABLE_CHECK_S = float(os.getenv("SCORE_TABLE_CHECK_S", "5"))  # how often to look for a regenerated table
+SCORE_TABLE_KEEP = 2                 # previous table stays on disk for readers that still map it
+SCORE_TABLE_READERS = int(os.getenv("SCORE_TABLE_READERS", "256"))  # namespaces whose reader is kept
+TIERS = ["low", "med", "high"]
+REASON_CODES = [name for name, *_ in RULES] + [FALLBACK_REASON]  # bit i of the reasons array
+CURRENT = "CURRENT"
+
+def score_table_dir(tenant_id: str | None = None) -> str:
+    return os.path.join(tenant_model_dir(tenant_id), SCORE_TABLE_SUBDIR)
+
+def generations(table_dir: str) -> list:
+    """Published generation numbers in `table_dir`, oldest first."""
+    if not os.path.isdir(table_dir):
+        return []
+    return sorted(int(d) for d in os.listdir(table_dir) if d.isdigit() and os.path.isdir(os.path.join(table_dir, d)))
+
+def write_score_table(table_dir: str, user_ids, risk: np.ndarray, tier: np.ndarray,
+                      reason_bits: np.ndarray, info: Dict) -> str:
+    """Write a table generation and publish it by atomically replacing the CURRENT pointer.
+
+    Columns are plain ``.npy`` files sorted by userId (fixed-width UTF-8 bytes), so a
+    reader memory-maps them and looks a user up by binary search without loading the
+    table. `tier` holds indices into TIERS and `reason_bits` a bitmask over REASON_CODES.
+    """
+    ids = np.asarray([str(u).encode() for u in user_ids], dtype=bytes)
+    order = np.argsort(ids, kind="stable")
+    ids = ids[order]
+    if len(ids) > 1 and (ids[1:] == ids[:-1]).any():
+        raise ValueError("duplicate userIds in score table")
+    # Generations are numbered one past the newest, so cleanup order is publish order even
+    # for runs in the same second; a concurrent writer that took the number moves us on
+    os.makedirs(table_dir, exist_ok=True)
+    gen = (generations(table_dir) or [0])[-1] + 1
+    while True:
+        name = f"{gen:010d}"
+        path = os.path.join(table_dir, name)
+        try:
+            os.mkdir(path)
+            break
+        except FileExistsError:
+            gen += 1
+    np.save(os.path.join(path, "user_ids.npy"), ids)
+    np.save(os.path.join(path, "risk.npy"), np.asarray(risk, dtype=np.float32)[order])
+    np.save(os.path.join(path, "tier.npy"), np.asarray(tier, dtype=np.int8)[order])
+    np.save(os.path.join(path, "reasons.npy"), np.asarray(reason_bits, dtype=np.uint8)[order])
+    with open(os.path.join(path, "table.json"), "w") as f:
+        json.dump({**info, "generation": gen, "rows": int(len(ids)), "tiers": TIERS, "reason_codes": REASON_CODES,
+                   "generated_at": datetime.now(timezone.utc).isoformat()}, f, indent=2)
+    pointer = os.path.join(table_dir, CURRENT)
+    with open(pointer + ".tmp", "w") as f:
+        f.write(name)
+    os.replace(pointer + ".tmp", pointer)  # readers see the old or the new table, never a mix
+
+    for old in generations(table_dir)[:-SCORE_TABLE_KEEP]:
+        shutil.rmtree(os.path.join(table_dir, f"{old:010d}"), ignore_errors=True)
+    return path
+
+class ScoreTable:
+    """One memory-mapped table generation."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "table.json")) as f:
+            self.info = json.load(f)
+        load = lambda name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+        self.user_ids, self.risk, self.tier, self.reasons = load("user_ids"), load("risk"), load("tier"), load("reasons")
+        self.width = self.user_ids.dtype.itemsize
+
+    def lookup(self, user_id: str) -> Dict | None:
+        key = user_id.encode()
+        if len(key) > self.width:
+            return None
+        i = int(np.searchsorted(self.user_ids, key))
+        if i == len(self.user_ids) or self.user_ids[i] != key:
+            return None
+        bits = int(self.reasons[i])
+        return {
+            "risk": float(self.risk[i]),
+            "tier": TIERS[self.tier[i]],
+            "reasons": [code for b, code in enumerate(REASON_CODES) if bits >> b & 1],
+            "modelVersion": self.info["modelVersion"]
+        }
+
+class ScoreTableReader:
+    """Serves the current table of one registry namespace and picks up new generations.
+
+    The CURRENT pointer is checked at most every SCORE_TABLE_CHECK_S; a new generation
+    is mapped and swapped in with a single reference assignment, so lookups in flight
+    keep using the table they started with.
+    """
+
+    def __init__(self, table_dir: str, check_s: float = SCORE_TABLE_CHECK_S):
+        self.table_dir = table_dir
+        self.check_s = check_s
+        self.table: ScoreTable | None = None
+        self._checked = -check_s
+        self._mtime = None
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "reloads": 0}
+
+    def current(self) -> ScoreTable | None:
+        now = time.monotonic()
+        if now - self._checked >= self.check_s and self._lock.acquire(blocking=False):
+            try:
+                self._checked = now
+                self._reload()
+            finally:
+                self._lock.release()
+        return self.table
+
+    def _reload(self):
+        pointer = os.path.join(self.table_dir, CURRENT)
+        try:
+            mtime = os.stat(pointer).st_mtime_ns
+            if mtime == self._mtime:
+                return
+            with open(pointer) as f:
+                table = ScoreTable(os.path.join(self.table_dir, f.read().strip()))
+        except (OSError, ValueError, KeyError) as e:
+            if self.table is not None or not isinstance(e, FileNotFoundError):
+                print(f"⚠️  Score table reload from {self.table_dir} failed: {e}")
+            return
+        self.table, self._mtime = table, mtime
+        self.stats["reloads"] += 1
+
+    def lookup(self, user_id: str) -> Dict | None:
+        table = self.current()
+        hit = table.lookup(user_id) if table is not None else None
+        self.stats["hits" if hit else "misses"] += 1
+        return hit
+
+    def info(self) -> Dict:
+        table = self.table
+        return {"dir": self.table_dir, "loaded": table is not None,
+                **({k: table.info.get(k) for k in ("modelVersion", "model_namespace", "generation", "rows", "generated_at")}
+                   if table else {}),
+                **self.stats}
+
+class ScoreTableCache:
+    """One `ScoreTableReader` per registry namespace, in an LRU of at most `max_readers`.
+
+    An evicted reader's table is unmapped once the requests still holding it finish;
+    its namespace gets a fresh reader on the next lookup.
+    """
+
+    def __init__(self, max_readers: int = SCORE_TABLE_READERS):
+        self.max_readers = max_readers
+        self._readers: "OrderedDict[str | None, ScoreTableReader]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, tenant_id: str | None) -> ScoreTableReader:
+        """Reader for the tenant's namespace (default when None); ValueError for an invalid id."""
+        tenant_id = tenant_id or None
+        table_dir = score_table_dir(tenant_id)
+        with self._lock:
+            reader = self._readers.get(tenant_id)
+            if reader is None:
+                reader = self._readers[tenant_id] = ScoreTableReader(table_dir)
+            self._readers.move_to_end(tenant_id)
+            while len(self._readers) > self.max_readers:
+                self._readers.popitem(last=False)
+                self.evictions += 1
+        return reader
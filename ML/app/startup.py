@@ -0,0 +1,168 @@
+import os, sys, time, threading, traceback
+from contextlib import contextmanager
+from typing import Dict, List
+
+STARTUP_REPORT = os.getenv("STARTUP_REPORT", "1") == "1"
+STARTUP_TOP_IMPORTS = int(os.getenv("STARTUP_TOP_IMPORTS", "10"))
+
+def process_age_s() -> float | None:
+    """Seconds since this process was started (Linux /proc; None elsewhere)."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+class _TimedLoader:
+    """Wraps a module loader to time `exec_module`, like ``python -X importtime``."""
+
+    def __init__(self, loader, timer: "ImportTimer"):
+        self._loader, self._timer = loader, timer
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        timer = self._timer
+        stack = timer._stack.__dict__.setdefault("frames", [])
+        stack.append(0.0)
+        t0 = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            # Hand the module back its real loader, so importlib.reload and importlib.resources see it
+            spec = getattr(module, "__spec__", None)
+            if spec is not None and spec.loader is self:
+                spec.loader = self._loader
+            if getattr(module, "__loader__", None) is self:
+                module.__loader__ = self._loader
+            total = time.perf_counter() - t0
+            children = stack.pop()
+            if stack:
+                stack[-1] += total
+            timer.record(module.__name__, total, total - children, len(stack))
+
+class ImportTimer:
+    """Records inclusive and self time of every module imported while installed.
+
+    A finder at the front of ``sys.meta_path`` asks the remaining finders for the spec
+    and wraps its loader, so this needs no interpreter flag and can run in production.
+    """
+
+    def __init__(self):
+        self.records: List[tuple] = []
+        self._stack = threading.local()
+        self._lock = threading.Lock()
+        self._finding = threading.local()
+
+    def find_spec(self, name, path=None, target=None):
+        if getattr(self._finding, "active", False):
+            return None
+        self._finding.active = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = _TimedLoader(spec.loader, self)
+                    return spec
+            return None
+        finally:
+            self._finding.active = False
+
+    def record(self, name: str, total: float, self_time: float, depth: int):
+        with self._lock:
+            self.records.append((name, total, self_time, depth))
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def summary(self, top: int = STARTUP_TOP_IMPORTS) -> Dict:
+        with self._lock:
+            records = list(self.records)
+        roots = [r for r in records if r[3] == 0]
+        # Group self time by top-level package: which dependency the time went to
+        packages: Dict[str, float] = {}
+        for name, _, self_time, _ in records:
+            pkg = name.split(".")[0]
+            packages[pkg] = packages.get(pkg, 0.0) + self_time
+        return {
+            "modules": len(records),
+            "total_s": round(sum(r[1] for r in roots), 4),
+            "by_package_s": {k: round(v, 4) for k, v in sorted(packages.items(), key=lambda kv: -kv[1])[:top]},
+            "slowest_modules": [{"module": n, "cumulative_s": round(t, 4), "self_s": round(s, 4)}
+                                for n, t, s, _ in sorted(records, key=lambda r: -r[2])[:top]]
+        }
+
+class StartupReport:
+    """Phases of service startup: process boot, imports, model loading, time to ready."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.boot_s = process_age_s()   # interpreter start -> this report (imports before app/ included)
+        self.phases: Dict[str, float] = {}
+        self.imports: Dict | None = None
+        self.warm_up: Dict | None = None
+        self.ready_s: float | None = None
+        self.errors: Dict[str, str] = {}  # phase -> exception, for phases that raised
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.t0
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - t0, 4)
+
+    def failed(self, phase: str, exc: BaseException):
+        """Log a startup phase that raised and keep it for `/startup` and `/readyz`."""
+        self.errors[phase] = f"{type(exc).__name__}: {exc}"
+        print(f"❌ Startup phase {phase} failed:")
+        traceback.print_exception(exc)
+
+    def ready(self, timer: ImportTimer | None = None):
+        self.ready_s = round(self.elapsed(), 4)
+        if timer is not None:
+            self.imports = timer.summary()
+            timer.uninstall()
+
+    def info(self) -> Dict:
+        return {
+            "process_age_at_app_import_s": round(self.boot_s, 4) if self.boot_s is not None else None,
+            "app_import_to_ready_s": self.ready_s,
+            "phases_s": self.phases,
+            "warm_up": self.warm_up,
+            "imports": self.imports,
+            "errors": self.errors
+        }
+
+    def print(self):
+        info = self.info()
+        print("🚀 Startup report")
+        if info["process_age_at_app_import_s"] is not None:
+            print(f"   interpreter + pre-app imports: {info['process_age_at_app_import_s']:.3f}s")
+        for name, s in self.phases.items():
+            print(f"   {name}: {s:.3f}s")
+        if self.imports:
+            print(f"   app imports: {self.imports['total_s']:.3f}s over {self.imports['modules']} modules; by package: "
+                  + ", ".join(f"{k} {v:.3f}s" for k, v in list(self.imports["by_package_s"].items())[:5]))
+        if self.warm_up and self.warm_up.get("rows"):
+            print(f"   warm-up: first row {self.warm_up['first_row_us']:.0f}us -> steady {self.warm_up['steady_row_us']:.0f}us")
+        print(f"   ready after {self.ready_s:.3f}s")
@@ -0,0 +1,201 @@
+import os, time, threading
+from collections import OrderedDict
+from typing import Any, Dict
+import numpy as np
+from .model_registry import load_model, latest_model_path, tenant_model_dir, predict_risk
+from .config import SERVE_COMPACT, SERVING_WORKERS, INFERENCE_THREADS, PARALLEL_MIN_ROWS, WARMUP_ROWS
+from .drift import DriftMonitor, sample_reference
+from .cascade import CascadeScorer, CASCADE_SCORING
+from .incremental import IncrementalScorer, INCREMENTAL_SCORING
+
+TENANT_MODEL_CACHE_MB = float(os.getenv("TENANT_MODEL_CACHE_MB", "512"))
+TENANT_MISS_TTL_S = float(os.getenv("TENANT_MISS_TTL_S", "60"))  # re-check tenants without a model after this
+TENANT_MISS_CACHE = int(os.getenv("TENANT_MISS_CACHE", "4096"))  # tenants without a model remembered (LRU)
+
+def estimate_model_bytes(model) -> int:
+    """Approximate in-memory size of a LightGBM model from its text dump."""
+    booster = getattr(model, "booster_", model)
+    if hasattr(booster, "model_to_string"):
+        return len(booster.model_to_string())
+    import pickle
+    return len(pickle.dumps(model))
+
+def inference_thread_budget(workers: int = SERVING_WORKERS) -> int:
+    """LightGBM threads one worker may use: INFERENCE_THREADS, else its share of the usable cores."""
+    if INFERENCE_THREADS > 0:
+        return INFERENCE_THREADS
+    try:
+        cores = len(os.sched_getaffinity(0))  # respects container CPU sets
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    return max(1, cores // max(1, workers))
+
+class ServingModel:
+    """A loaded model plus what `/score` needs from its meta."""
+
+    def __init__(self, model: Any, meta: Dict, tenant_id: str | None = None):
+        self.model = model
+        self.meta = meta
+        self.tenant_id = tenant_id
+        self.feature_order = meta["feature_order"]
+        self.thresholds = meta.get("thresholds", {"med": 0.4, "high": 0.7})
+        # Calibration knots as arrays once, so np.interp does no conversion per request
+        cal = meta.get("calibration")
+        self.calibration = {"x": np.asarray(cal["x"]), "y": np.asarray(cal["y"])} if cal else None
+        self.version = meta["version"]
+        self.nbytes = estimate_model_bytes(model)
+        # Training pickles n_jobs=-1; cap the serving pool so workers don't oversubscribe cores
+        self.thread_budget = inference_thread_budget()
+        if hasattr(model, "set_params"):
+            model.set_params(n_jobs=self.thread_budget)
+        # Live-vs-training drift sketches; models trained before reference stats existed have none
+        ref = meta.get("reference_stats")
+        self.drift = DriftMonitor(ref, self.feature_order) if ref else None
+        # Early-exit scoring near tier boundaries, when enabled and calibrated for this model
+        self.cascade = CascadeScorer(model, meta["cascade"]) if CASCADE_SCORING and (meta.get("cascade") or {}).get("enabled") else None
+        # Per-user leaf cache: re-traverse only the trees a changed feature can affect
+        self.incremental = None
+        if INCREMENTAL_SCORING:
+            try:
+                self.incremental = IncrementalScorer(model, self.version)
+            except ValueError as e:
+                print(f"⚠️  Incremental scoring disabled for {self.version}: {e}")
+
+    def num_threads(self, n_rows: int) -> int:
+        # A single row finishes before an OpenMP team spins up: parallelism only pays off for batches
+        return 1 if n_rows < PARALLEL_MIN_ROWS else self.thread_budget
+
+    def predict(self, x: np.ndarray, user_id: str | None = None) -> np.ndarray:
+        """Uncalibrated risk for the rows of `x` through the configured scoring path."""
+        if self.incremental is not None and user_id is not None:
+            return self.incremental.predict(user_id, x[0])
+        if self.cascade is not None:
+            return self.cascade.predict(x, num_threads=self.num_threads(len(x)))
+        return predict_risk(self.model, x, num_threads=self.num_threads(len(x)))
+
+    def warm_up(self, n_rows: int = WARMUP_ROWS) -> Dict:
+        """Run representative single rows and one batch so the first real request doesn't pay
+        for lazy initialization (LightGBM predictor setup, thread pools, page faults)."""
+        if n_rows <= 0:
+            return {"rows": 0}
+        ref = self.meta.get("reference_stats")
+        X = sample_reference(ref, self.feature_order, n_rows) if ref else np.zeros((n_rows, len(self.feature_order)))
+        times = []
+        for row in X:
+            t0 = time.perf_counter()
+            self.predict(row.reshape(1, -1))
+            times.append(time.perf_counter() - t0)
+        if self.incremental is not None:
+            for row in X[:min(n_rows, 20)]:
+                self.incremental.ensemble.full(row)
+        t0 = time.perf_counter()
+        self.predict(X)
+        batch_s = time.perf_counter() - t0
+        if self.cascade is not None:
+            self.cascade.stats = {k: 0 for k in self.cascade.stats}  # warm-up isn't traffic
+        return {
+            "rows": n_rows,
+            "seconds": round(sum(times) + batch_s, 4),
+            "first_row_us": round(times[0] * 1e6, 1),
+            "steady_row_us": round(float(np.median(times[len(times) // 2:])) * 1e6, 1),
+            "num_threads": {"single_row": self.num_threads(1), "batch": self.num_threads(n_rows)}
+        }
+
+    def vectorize(self, feat: dict) -> np.ndarray:
+        # Basic: numerical passthrough + region one-hot (stored in META)
+        x = []
+        for f in self.feature_order:
+            if f.startswith("region__"):
+                reg = f.split("__", 1)[1]
+                x.append(1.0 if feat.get("region", "US") == reg else 0.0)
+            else:
+                x.append(float(feat.get(f, 0.0)))
+        return np.asarray(x, dtype=float)
+
+class TenantModelCache:
+    """Lazily loaded per-tenant models in a memory-bounded LRU, with a shared default.
+
+    Nothing is scanned at startup; a tenant's namespace is only looked at on its first
+    request, so boot time does not depend on how many tenants exist. Tenants without
+    a model of their own are served by the default and re-checked after TENANT_MISS_TTL_S;
+    at most TENANT_MISS_CACHE of them are remembered, and a tenant's load lock only lives
+    while its load runs, so unknown ids cannot grow the cache.
+    """
+
+    def __init__(self, default: ServingModel, budget_mb: float = TENANT_MODEL_CACHE_MB):
+        self.default = default
+        self.budget_bytes = int(budget_mb * 2**20)
+        self._models: "OrderedDict[str, ServingModel]" = OrderedDict()
+        self._misses: "OrderedDict[str, float]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.stats = {"hits": 0, "loads": 0, "fallbacks": 0, "evictions": 0}
+
+    def get(self, tenant_id: str | None) -> ServingModel:
+        """The tenant's model, else the default; ValueError for an id that isn't a valid namespace."""
+        if not tenant_id:
+            return self.default
+        model_dir = tenant_model_dir(tenant_id)
+        with self._lock:
+            entry = self._models.get(tenant_id)
+            if entry is not None:
+                self._models.move_to_end(tenant_id)
+                self.stats["hits"] += 1
+                return entry
+            if time.monotonic() - self._misses.get(tenant_id, -TENANT_MISS_TTL_S) < TENANT_MISS_TTL_S:
+                self._misses.move_to_end(tenant_id)
+                self.stats["fallbacks"] += 1
+                return self.default
+            load_lock = self._load_locks.setdefault(tenant_id, threading.Lock())
+        with load_lock:  # one loader per tenant; concurrent first requests wait for it
+            try:
+                return self._load(tenant_id, model_dir)
+            finally:
+                with self._lock:
+                    if self._load_locks.get(tenant_id) is load_lock:
+                        del self._load_locks[tenant_id]
+
+    def _load(self, tenant_id: str, model_dir: str) -> ServingModel:
+        with self._lock:  # loaded (or found missing) while this request waited for the lock
+            if tenant_id in self._models:
+                return self._models[tenant_id]
+            if time.monotonic() - self._misses.get(tenant_id, -TENANT_MISS_TTL_S) < TENANT_MISS_TTL_S:
+                self.stats["fallbacks"] += 1
+                return self.default
+        try:
+            model, meta = load_model(latest_model_path(model_dir, SERVE_COMPACT))
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self._misses[tenant_id] = time.monotonic()
+                self._misses.move_to_end(tenant_id)
+                while len(self._misses) > TENANT_MISS_CACHE:
+                    self._misses.popitem(last=False)
+                self.stats["fallbacks"] += 1
+            return self.default
+        entry = ServingModel(model, meta, tenant_id)
+        entry.warm_up(min(WARMUP_ROWS, 20))  # short: this runs on the tenant's first request
+        with self._lock:
+            self._misses.pop(tenant_id, None)
+            self._models[tenant_id] = entry
+            self._bytes += entry.nbytes
+            self.stats["loads"] += 1
+            self._evict()
+        return entry
+
+    def _evict(self):
+        # Keep at least the most recently loaded model even if it alone exceeds the budget
+        while self._bytes > self.budget_bytes and len(self._models) > 1:
+            _, old = self._models.popitem(last=False)
+            self._bytes -= old.nbytes
+            self.stats["evictions"] += 1
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {
+                "default": self.default.version,
+                "budget_mb": round(self.budget_bytes / 2**20, 1),
+                "used_mb": round(self._bytes / 2**20, 3),
+                "tenants": {t: m.version for t, m in self._models.items()},
+                **self.stats
+            }
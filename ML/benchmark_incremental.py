@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Incremental Rescoring Benchmark for the CS-ML Model
+
+Replays an event-stream-like sequence of single-feature updates through the
+incremental scorer (app.incremental) and compares every result with a full
+LightGBM evaluation. It reports parity (max |margin difference|), latency of both
+paths, and how many trees each update had to re-traverse.
+
+Usage:
+    python benchmark_incremental.py [--model=model_store/<version>.pkl] [--users=2000] [--events=20000]
+"""
+
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from app.model_registry import load_model
+from app.incremental import IncrementalScorer
+from app.drift import sample_reference
+
+def apply_event(x: np.ndarray, kind: str, idx: dict):
+    """What one backend event does to a user's feature vector (see backend event.consumer.ts)."""
+    if kind == "activity":
+        x[idx["activity_7d"]] += 1
+        x[idx["activity_30d"]] += 1
+        x[idx["time_since_last_use_days"]] = 0.0
+    elif kind == "ticket":
+        x[idx["tickets_7d"]] += 1
+        x[idx["tickets_30d"]] += 1
+    elif kind == "payment_failed":
+        x[idx["failed_renewals_30d"]] += 1
+    elif kind == "day_passed":
+        x[idx["time_since_last_use_days"]] += 1
+    # "rescore": duplicate call with nothing changed
+
+EVENT_MIX = {"activity": 0.45, "ticket": 0.15, "payment_failed": 0.05, "day_passed": 0.2, "rescore": 0.15}
+
+def base_vectors(meta: dict, n_users: int, rng) -> np.ndarray:
+    """Starting vectors drawn from the model's training reference bins (gamma noise if absent)."""
+    ref = meta.get("reference_stats")
+    if ref:
+        return np.round(sample_reference(ref, meta["feature_order"], n_users, seed=int(rng.integers(2**31))), 2)
+    X = np.round(rng.gamma(2.0, 5.0, (n_users, len(meta["feature_order"]))), 2)
+    X[:, [j for j, f in enumerate(meta["feature_order"]) if f.startswith("region__")]] = 0.0
+    return X
+
+def run(model, meta: dict, n_users: int, n_events: int, seed: int = 42) -> dict:
+    rng = np.random.default_rng(seed)
+    idx = {f: j for j, f in enumerate(meta["feature_order"])}
+    users = base_vectors(meta, n_users, rng)
+    scorer = IncrementalScorer(model, meta["version"])
+    booster = scorer.ensemble.booster
+    kinds = rng.choice(list(EVENT_MIX), size=n_events, p=list(EVENT_MIX.values()))
+    who = (rng.zipf(1.3, size=n_events) - 1) % n_users   # a few very active users, a long tail
+
+    t_inc = {"hit": [], "miss": []}
+    t_full, max_diff = [], 0.0
+    for u, kind in zip(who, kinds):
+        x = users[u]
+        apply_event(x, kind, idx)
+        misses = scorer.stats["misses"]
+        t0 = time.perf_counter()
+        m_inc = scorer.margin(str(u), x)
+        t1 = time.perf_counter()
+        m_full = booster.predict(x.reshape(1, -1), raw_score=True, num_threads=1)[0]
+        t2 = time.perf_counter()
+        t_inc["miss" if scorer.stats["misses"] > misses else "hit"].append(t1 - t0)
+        t_full.append(t2 - t1)
+        max_diff = max(max_diff, abs(m_inc - m_full))
+
+    us = lambda v: {"mean": float(np.mean(v) * 1e6), "p50": float(np.median(v) * 1e6),
+                    "p99": float(np.percentile(v, 99) * 1e6)} if v else None
+    all_inc = t_inc["hit"] + t_inc["miss"]
+    return {
+        "model": meta["version"],
+        "users": n_users,
+        "events": n_events,
+        "event_mix": EVENT_MIX,
+        "parity_max_abs_margin_diff": max_diff,
+        "latency_us": {
+            "incremental": us(all_inc),
+            "incremental_hit": us(t_inc["hit"]),
+            "incremental_miss": us(t_inc["miss"]),
+            "full_lightgbm": us(t_full)
+        },
+        "speedup_mean": float(np.mean(t_full) / np.mean(all_inc)),
+        "cache": scorer.info()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark incremental rescoring against full scoring')
+    parser.add_argument('--model', type=str, default=None,
+                       help='Model .pkl to benchmark (default: latest in MODEL_DIR)')
+    parser.add_argument('--users', type=int, default=2000,
+                       help='Distinct users in the simulated stream (default: 2000)')
+    parser.add_argument('--events', type=int, default=20000,
+                       help='Events to replay (default: 20000)')
+    parser.add_argument('--output', type=str, default=None,
+                       help='Write the report to this JSON file')
+
+    args = parser.parse_args()
+    model, meta = load_model(args.model)
+
+    print("=" * 60)
+    print("CS-ML Incremental Rescoring Benchmark")
+    print("=" * 60)
+    print(f"Model: {meta['version']}, {args.users} users, {args.events} events")
+    print()
+
+    report = run(model, meta, args.users, args.events)
+    lat = report["latency_us"]
+    ok = report["parity_max_abs_margin_diff"] < 1e-9
+    print(f"{'✅' if ok else '❌'} Parity: max |margin diff| = {report['parity_max_abs_margin_diff']:.2e}")
+    print(f"⏱️  Incremental: {lat['incremental']['mean']:.1f}us mean "
+          f"(hit {lat['incremental_hit']['mean']:.1f}us, miss "
+          f"{lat['incremental_miss']['mean'] if lat['incremental_miss'] else 0:.1f}us)")
+    print(f"⏱️  Full LightGBM: {lat['full_lightgbm']['mean']:.1f}us mean -> {report['speedup_mean']:.2f}x speedup")
+    print(f"🌲 Trees re-traversed per hit: {report['cache']['avg_trees_per_hit']:.1f} of {report['cache']['trees']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved to {args.output}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
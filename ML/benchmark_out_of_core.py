@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Out-of-core Training Check: data several times larger than the memory ceiling
+
+Generates synthetic weekly snapshot partitions (train.synthetic) until training
+them in memory would need `--factor` times `--max_rss_mb`, then trains on them
+with `train_model_chunked` in a fresh process under
+TRAIN_MAX_RSS_MB=`--max_rss_mb`. The run fails if training raises MemoryError
+or if the peak RSS of the run (profiler samples, per-chunk checks and the
+process's maximum RSS) is above the ceiling. The in-memory need is the peak RSS
+of the in-memory steps (frame, `prepare`, split, fit), measured in a fresh
+process after the first and second generated blocks and extended linearly to
+the rows written.
+tests/test_out_of_core.py runs the same check at a smaller scale. The ceiling covers the training process; the
+bootstrap's worker processes, when it spawns any, are not counted.
+
+Usage:
+    python benchmark_out_of_core.py [--max_rss_mb=1024] [--factor=3] [--out=./ooc_check] [--output=ooc.json]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import subprocess
+import tempfile
+
+# Peak RSS of the snippet's own process: VmHWM restarts at exec, unlike ru_maxrss, which a child
+# inherits from a larger parent
+HWM_HELPER = """
+def hwm_rss_mb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+"""
+
+TRAIN_SNIPPET = HWM_HELPER + """
+import json, sys
+from train.chunked import train_model_chunked
+from train.training import LGBM_PARAMS
+params = {**LGBM_PARAMS, **json.loads(sys.argv[2])}
+meta = train_model_chunked(sys.argv[1], params=params)
+print("OOC_RESULT " + json.dumps({"out_of_core": meta["out_of_core"], "metrics": meta["metrics"],
+                                  "training_samples": meta["training_samples"],
+                                  "peak_rss_mb": meta["training_profile"]["peak_rss_mb"],
+                                  "hwm_rss_mb": hwm_rss_mb()}))
+"""
+
+IN_MEMORY_SNIPPET = HWM_HELPER + """
+import glob, os, sys
+import pandas as pd
+from lightgbm import LGBMClassifier
+from train.training import prepare, time_split, LGBM_PARAMS
+paths = sorted(glob.glob(os.path.join(sys.argv[1], "**", "*.parquet"), recursive=True))
+df = pd.concat([pd.read_parquet(p) for p in paths], ignore_index=True)
+n = len(df)
+X, y, groups, _ = prepare(df)
+del df
+tr, va = time_split(X, y, groups)
+Xtr, Xva, ytr = X[tr], X[va], y[tr]
+LGBMClassifier(**{**LGBM_PARAMS, "n_estimators": 20, "verbose": -1}).fit(Xtr, ytr)
+print("IN_MEMORY_PEAK", n, hwm_rss_mb())
+"""
+
+def in_memory_peak(snapshots_dir: str) -> tuple:
+    """(rows, peak RSS in MB) of the in-memory path (frame, `prepare`, split, fit) on `snapshots_dir`."""
+    proc = subprocess.run([sys.executable, "-c", IN_MEMORY_SNIPPET, snapshots_dir], capture_output=True,
+                          text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    line = next(line for line in proc.stdout.splitlines() if line.startswith("IN_MEMORY_PEAK"))
+    return int(line.split()[1]), float(line.split()[2])
+
+def generate(out_dir: str, target_mb: float, users_json: str, seed: int) -> dict:
+    """Write snapshot partitions until training them in memory would need `target_mb`."""
+    import pandas as pd
+    from train.synthetic import load_profile, iter_chunks
+    from train.chunked import write_snapshot_partitions
+    from train.training import prepare
+
+    profile = load_profile(users_json)
+    dates = pd.date_range("2025-01-06", "2025-08-18", freq="W-MON")
+    rows, frame_mb, x_mb, n_users, t0 = 0, 0.0, 0.0, 0, time.perf_counter()
+    x_row_bytes = None  # one featurized row, float64
+    probes = []         # in-memory (rows, peak MB) after the first two blocks
+    need_mb = lambda: probes[1][1] + (probes[1][1] - probes[0][1]) / (probes[1][0] - probes[0][0]) * (rows - probes[1][0])
+    # Chunks continue one stream: each block of users gets its own seed, so nothing repeats
+    while len(probes) < 2 or need_mb() < target_mb:
+        for _, _, snaps in iter_chunks(profile, 20_000, dates, seed=seed + n_users, chunk_users=20_000):
+            snaps["userId"] = snaps["userId"].astype(str) + f"-{n_users}"
+            write_snapshot_partitions(snaps, out_dir)
+            rows += len(snaps)
+            frame_mb += snaps.memory_usage(deep=True).sum() / 2**20
+            x_row_bytes = x_row_bytes or prepare(snaps.head(1))[0].nbytes
+            x_mb += x_row_bytes * len(snaps) / 2**20
+        n_users += 20_000
+        if len(probes) < 2:
+            probes.append(in_memory_peak(out_dir))
+            if len(probes) < 2:
+                continue
+        print(f"   {rows} rows, {need_mb():.0f}/{target_mb:.0f} MB to train in memory "
+              f"({frame_mb + x_mb:.0f} MB as DataFrame + X), {time.perf_counter() - t0:.1f}s")
+    return {"rows": rows, "users": n_users, "dataframe_mb": round(frame_mb, 1), "x_mb": round(x_mb, 1),
+            "in_memory_probes": probes, "in_memory_mb": round(need_mb(), 1),
+            "seconds": round(time.perf_counter() - t0, 3)}
+
+def train_out_of_core(snapshots_dir: str, max_rss_mb: float, params: dict | None = None):
+    """Run `train_model_chunked` in a fresh process under TRAIN_MAX_RSS_MB=`max_rss_mb`.
+
+    `params` override LGBM_PARAMS. Returns (result or None if training failed, seconds, stderr);
+    the result's `peak_rss_mb` is the highest of the profiler's samples, the per-chunk checks
+    and the process's own maximum RSS.
+    """
+    model_dir = tempfile.mkdtemp(prefix="ooc-models-")
+    try:
+        env = {**os.environ, "TRAIN_MAX_RSS_MB": str(max_rss_mb), "MODEL_DIR": model_dir}
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", TRAIN_SNIPPET, snapshots_dir, json.dumps(params or {})],
+                              env=env, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        elapsed = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(model_dir, ignore_errors=True)
+    result = next((json.loads(line[len("OOC_RESULT "):]) for line in proc.stdout.splitlines()
+                   if line.startswith("OOC_RESULT ")), None)
+    if proc.returncode != 0 or result is None:
+        return None, elapsed, proc.stderr
+    result["peak_rss_mb"] = max(result["peak_rss_mb"], result["out_of_core"]["peak_rss_mb"], result.pop("hwm_rss_mb"))
+    return result, elapsed, proc.stderr
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that out-of-core training holds its RSS ceiling on data larger than it')
+    parser.add_argument('--max_rss_mb', type=float, default=1024, help='RSS ceiling for training (default: 1024)')
+    parser.add_argument('--factor', type=float, default=3.0,
+                       help='Data size as a multiple of the ceiling, measured as the memory in-memory training needs (default: 3)')
+    parser.add_argument('--users_json', type=str, default='../mock/users.json',
+                       help='Mock users to learn the synthetic profile from (default: ../mock/users.json)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--out', type=str, default=None,
+                       help='Snapshot directory to generate into / reuse (default: a temp dir, removed afterwards)')
+    parser.add_argument('--output', type=str, default=None, help='Write the report to this JSON file')
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CS-ML Out-of-core Training Check")
+    print("=" * 60)
+
+    out = args.out or tempfile.mkdtemp(prefix="ooc-snapshots-")
+    try:
+        if os.path.isdir(out) and os.listdir(out):
+            print(f"📂 Reusing snapshots in {out}")
+            data = {"reused": out}
+        else:
+            print(f"🧪 Generating ~{args.factor * args.max_rss_mb:.0f} MB of snapshots into {out}")
+            data = generate(out, args.factor * args.max_rss_mb, args.users_json, args.seed)
+
+        print(f"🏋️  Training out-of-core with TRAIN_MAX_RSS_MB={args.max_rss_mb:.0f}")
+        result, elapsed, stderr = train_out_of_core(out, args.max_rss_mb)
+        if result is None:
+            print(stderr[-2000:])
+            print("❌ Training failed" + (" (RSS ceiling exceeded)" if "MemoryError" in stderr else ""))
+            return 1
+    finally:
+        if args.out is None:
+            shutil.rmtree(out, ignore_errors=True)
+
+    peak = result["peak_rss_mb"]
+    report = {"max_rss_mb": args.max_rss_mb, "data": data, "training_seconds": round(elapsed, 3),
+              "peak_rss_mb": peak, "ceiling_held": peak <= args.max_rss_mb, **result}
+    print(f"📊 {result['training_samples']} rows trained in {elapsed:.1f}s, AUC-ROC {result['metrics']['auc_roc']:.3f}")
+    print(f"{'✅' if report['ceiling_held'] else '❌'} Peak RSS {peak:.0f} MB against a ceiling of {args.max_rss_mb:.0f} MB")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved to {args.output}")
+    return 0 if report["ceiling_held"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Cold-start Benchmark for the CS-ML Service and CLIs
+
+Starts `uvicorn app.main:app` in a fresh process repeatedly and measures time to
+the first successful `GET /healthz` (model loaded) and `GET /readyz` (warm-up
+done), then collects the service's own startup report from `GET /startup`. It
+also times `--help` of the CLI scripts, which is pure import cost.
+
+Usage:
+    python benchmark_startup.py [--runs=5] [--port=8765] [--output=startup.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import numpy as np
+import requests
+
+CLIS = ["train_model.py", "test_model.py", "validate_data.py", "predict_new_value.py", "score_all.py"]
+
+def time_to_healthy(port: int, timeout: float = 60.0) -> dict:
+    """Seconds from process start to the first 200 from /healthz (live) and /readyz (warmed up)."""
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    out = {}
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+            for key, path in (("healthy_s", "/healthz"), ("ready_s", "/readyz")):
+                if key in out:
+                    continue
+                try:
+                    if requests.get(f"http://127.0.0.1:{port}{path}", timeout=0.5).ok:
+                        out[key] = time.perf_counter() - t0
+                except requests.ConnectionError:
+                    break
+            if "ready_s" in out:
+                out["report"] = requests.get(f"http://127.0.0.1:{port}/startup", timeout=2).json()
+                return out
+            time.sleep(0.01)
+        raise TimeoutError(f"/readyz not ready after {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+def time_cli(script: str) -> float:
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, script, "--help"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark service time-to-first-healthy and CLI cold starts')
+    parser.add_argument('--runs', type=int, default=5, help='Cold starts per measurement (default: 5)')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the benchmarked server (default: 8765)')
+    parser.add_argument('--output', type=str, default=None, help='Write the report to this JSON file')
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CS-ML Cold-start Benchmark")
+    print("=" * 60)
+
+    runs = [time_to_healthy(args.port) for _ in range(args.runs)]
+    stats = lambda v: {"median": float(np.median(v)), "min": float(np.min(v)), "max": float(np.max(v)), "runs": v}
+    last = runs[-1]["report"]
+    report = {
+        "time_to_healthy_s": stats([r["healthy_s"] for r in runs]),
+        "time_to_ready_s": stats([r["ready_s"] for r in runs]),
+        "startup_report": last,
+        "cli_help_s": {s: float(np.median([time_cli(s) for _ in range(args.runs)])) for s in CLIS if os.path.exists(s)}
+    }
+    print(f"⏱️  Time to first healthy /healthz: {report['time_to_healthy_s']['median']:.3f}s median "
+          f"(min {report['time_to_healthy_s']['min']:.3f}s, {args.runs} runs)")
+    print(f"⏱️  Time to ready /readyz (after warm-up): {report['time_to_ready_s']['median']:.3f}s median")
+    for phase, s in last["phases_s"].items():
+        print(f"   {phase}: {s:.3f}s")
+    if last.get("imports"):
+        print("   slowest import packages: " + ", ".join(f"{k} {v:.3f}s" for k, v in list(last["imports"]["by_package_s"].items())[:5]))
+    for script, s in report["cli_help_s"].items():
+        print(f"⏱️  {script} --help: {s:.3f}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
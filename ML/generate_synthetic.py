@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Synthetic Dataset Generator for the CS-ML Pipeline
+
+Learns segment, plan, region and signup distributions from the mock users and writes
+any number of labeled weekly snapshots (the layout `train_model.py --snapshots_dir`
+reads), plus the users and, optionally, the raw events (train.synthetic). Output
+is streamed to Parquet chunk by chunk and is deterministic for a given seed and
+chunk size.
+
+Usage:
+    python generate_synthetic.py --rows=10000000 --out=./synthetic [--events] [--seed=42]
+    python train_model.py --snapshots_dir=./synthetic/snapshots
+    python validate_data.py --input=./synthetic/snapshots
+    python score_all.py --input=./synthetic/snapshots/week=2025-08-18
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic users / events / snapshots dataset')
+    parser.add_argument('--users_json', type=str, default='../mock/users.json',
+                       help='Mock users (or a saved profile.json) to learn distributions from (default: ../mock/users.json)')
+    parser.add_argument('--users', type=int, default=100000, help='Number of users (default: 100000)')
+    parser.add_argument('--rows', type=int, default=None,
+                       help='Approximate snapshot rows instead of --users')
+    parser.add_argument('--start', type=str, default='2025-05-05', help='First snapshot date')
+    parser.add_argument('--end', type=str, default='2025-08-18', help='Last snapshot date')
+    parser.add_argument('--freq', type=str, default='W-MON', help='Snapshot frequency (default: W-MON, weekly)')
+    parser.add_argument('--label', type=str, default='backend', choices=['backend', 'inactive_next_30d'],
+                       help='Label rule (default: backend, the CS API feature rule)')
+    parser.add_argument('--events', action='store_true', help='Also write the raw events to events.parquet')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--chunk_users', type=int, default=None,
+                       help='Users generated per chunk; bounds memory (default: 50000)')
+    parser.add_argument('--out', type=str, required=True, help='Output directory')
+
+    args = parser.parse_args()
+    # Deferred so --help doesn't pay for pandas / pyarrow
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from train.synthetic import load_profile, users_for_rows, iter_chunks, CHUNK_USERS
+    from train.chunked import write_snapshot_partitions
+
+    dates = pd.date_range(args.start, args.end, freq=args.freq)
+    if len(dates) == 0:
+        print("❌ No snapshot dates in range")
+        return 1
+    profile = load_profile(args.users_json)
+    n_users = users_for_rows(profile, args.rows, dates) if args.rows else args.users
+    chunk_users = args.chunk_users or CHUNK_USERS
+
+    print("=" * 60)
+    print("CS-ML Synthetic Dataset Generator")
+    print("=" * 60)
+    print(f"Profile from {args.users_json}: segments {profile['segments']}")
+    print(f"Generating {n_users} users x {len(dates)} snapshot dates, seed {args.seed}")
+
+    snapshots_dir = os.path.join(args.out, "snapshots")
+    if os.path.isdir(snapshots_dir) and os.listdir(snapshots_dir):
+        # Partitions are appended part by part; a second run would duplicate rows
+        print(f"❌ {snapshots_dir} is not empty; choose a new --out")
+        return 1
+    os.makedirs(args.out, exist_ok=True)
+    with open(os.path.join(args.out, "profile.json"), "w") as f:
+        json.dump(profile, f, indent=2)
+    writers = {}
+    totals = {"users": 0, "events": 0, "rows": 0, "positives": 0}
+
+    def append(name: str, df):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if name not in writers:
+            writers[name] = pq.ParquetWriter(os.path.join(args.out, f"{name}.parquet"), table.schema)
+        writers[name].write_table(table)
+
+    t0 = time.perf_counter()
+    try:
+        for users, events, snaps in iter_chunks(profile, n_users, dates, seed=args.seed, label=args.label,
+                                                chunk_users=chunk_users):
+            append("users", users)
+            if args.events:
+                append("events", events)
+            if len(snaps):
+                write_snapshot_partitions(snaps, snapshots_dir)
+            totals["users"] += len(users)
+            totals["events"] += len(events)
+            totals["rows"] += len(snaps)
+            totals["positives"] += int(snaps["label"].sum()) if len(snaps) else 0
+            print(f"   {totals['users']}/{n_users} users, {totals['rows']} rows, {time.perf_counter() - t0:.1f}s")
+    finally:
+        for w in writers.values():
+            w.close()
+
+    elapsed = time.perf_counter() - t0
+    manifest = {
+        "seed": args.seed, "chunk_users": chunk_users, "label": args.label,
+        "snapshot_dates": [d.strftime("%Y-%m-%d") for d in dates],
+        **totals,
+        "positive_rate": round(totals["positives"] / max(totals["rows"], 1), 6),
+        "events_written": args.events,
+        "seconds": round(elapsed, 3)
+    }
+    with open(os.path.join(args.out, "dataset.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"📊 {totals['rows']} snapshot rows ({totals['rows'] / max(elapsed, 1e-9):.0f}/s), "
+          f"{totals['events']} events, positive rate {manifest['positive_rate']:.3f}")
+    print(f"💾 Dataset written to {args.out} in {elapsed:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
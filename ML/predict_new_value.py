@@ -15,7 +15,7 @@ import argparse
 import json
 import pandas as pd
 import numpy as np
-from app.model_registry import load_model
+from app.model_registry import load_model, calibrate
 from app.reasons import rule_based_reasons
 
 def prepare_features(raw_features: dict, feature_order: list, encoders: dict) -> np.ndarray:
@@ -185,6 +185,7 @@ def main():
         
         # Make prediction
         risk_score = model.predict_proba(feature_vector)[0][1]  # Probability of churn
+        risk_score = float(calibrate(risk_score, meta.get("calibration")))
         risk_tier = get_risk_tier(risk_score, meta["thresholds"])
         
         # Get explanation using rule-based reasoning
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Traffic Replay Harness for the CS-ML Scoring Service
+
+Replays `/score` traffic captured with CAPTURE_PATH against a running service. The
+original inter-arrival times are kept (scaled by --speed) so repeated users and
+bursts from the event consumer look like production. Reports latency percentiles,
+throughput and how far the replay fell behind schedule.
+
+Usage:
+    CAPTURE_PATH=capture.jsonl uvicorn app.main:app --port 8000   # capture real traffic
+    python replay_traffic.py --capture=capture.jsonl                 # 1x, original timing
+    python replay_traffic.py --capture=capture.jsonl --speed=10 --concurrency=32
+    python replay_traffic.py --capture=capture.jsonl --speed=max --loops=5 --output=replay.json
+"""
+
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import numpy as np
+import requests
+
+def load_capture(path: str, limit: int | None = None) -> list:
+    """Captured requests in arrival order, as dicts with `offset` = seconds since the first request.
+
+    Lines are written as responses finish, so they are sorted by arrival time (`ts`) first.
+    """
+    with open(path) as f:
+        records = sorted((json.loads(line) for line in f if line.strip()), key=lambda rec: rec["ts"])
+    records = records[:limit] if limit else records
+    for rec in records:
+        rec["offset"] = rec["ts"] - records[0]["ts"]
+    return records
+
+def replay(records: list, url: str, speed: float | None = 1.0, concurrency: int = 8,
+           loops: int = 1, timeout: float = 10.0) -> dict:
+    """Send `records` to `url`; `speed=None` fires as fast as `concurrency` allows."""
+    span = records[-1]["ts"] - records[0]["ts"] if records else 0.0
+    # Loops follow each other one mean inter-arrival gap apart, so the captured rate holds across them
+    period = span * len(records) / (len(records) - 1) if len(records) > 1 else 0.0
+    jobs = queue.Queue()
+    for loop in range(loops):
+        for rec in records:
+            due = None if speed is None else (loop * period + rec["offset"]) / speed
+            jobs.put((due, rec))
+
+    latencies, lags, statuses = [], [], {}
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def worker():
+        session = requests.Session()
+        while True:
+            try:
+                due, rec = jobs.get_nowait()
+            except queue.Empty:
+                return
+            if due is not None:
+                wait = start + due - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            headers = {"X-Tenant-Id": rec["tenant_header"]} if rec.get("tenant_header") else {}
+            sent = time.perf_counter()
+            try:
+                status = session.post(url, json=rec["body"], headers=headers, timeout=timeout).status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            done = time.perf_counter()
+            with lock:
+                latencies.append(done - sent)
+                lags.append(0.0 if due is None else sent - start - due)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    lat_ms = np.asarray(latencies) * 1000
+    lag_ms = np.asarray(lags) * 1000
+    ok = statuses.get(200, 0)
+    return {
+        "requests": len(latencies),
+        "speed": "max" if speed is None else speed,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else None,
+        "ok": ok,
+        "errors": len(latencies) - ok,
+        "status_counts": {str(k): v for k, v in statuses.items()},
+        "latency_ms": {
+            "mean": float(lat_ms.mean()),
+            **{f"p{q}": float(np.percentile(lat_ms, q)) for q in (50, 90, 95, 99, 99.9)},
+            "max": float(lat_ms.max())
+        } if len(lat_ms) else {},
+        # How late requests went out vs. the scaled schedule; large values mean the client, not the server, is the limit
+        "schedule_lag_ms": {"p50": float(np.percentile(lag_ms, 50)), "p99": float(np.percentile(lag_ms, 99))}
+        if len(lag_ms) and speed is not None else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay captured /score traffic against the ML service')
+    parser.add_argument('--capture', type=str, required=True,
+                       help='Capture file written by the service with CAPTURE_PATH set')
+    parser.add_argument('--url', type=str, default='http://localhost:8000/score',
+                       help='Scoring endpoint (default: http://localhost:8000/score)')
+    parser.add_argument('--speed', type=str, default='1',
+                       help='Time compression: 1 = real time, 10 = 10x faster, max = no waiting (default: 1)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                       help='Concurrent client connections (default: 8)')
+    parser.add_argument('--loops', type=int, default=1,
+                       help='Replay the capture this many times back to back (default: 1)')
+    parser.add_argument('--limit', type=int, default=None,
+                       help='Only replay the first N captured requests')
+    parser.add_argument('--output', type=str, default=None,
+                       help='Write the report to this JSON file')
+
+    args = parser.parse_args()
+    speed = None if args.speed == 'max' else float(args.speed)
+
+    records = load_capture(args.capture, args.limit)
+    if not records:
+        print(f"❌ Error: No requests in {args.capture}")
+        return 1
+
+    print("=" * 60)
+    print("CS-ML Traffic Replay")
+    print("=" * 60)
+    print(f"Requests: {len(records)} x {args.loops} loop(s), captured span {records[-1]['offset']:.1f}s")
+    print(f"Target: {args.url} at {args.speed}x, concurrency {args.concurrency}")
+    print()
+
+    report = replay(records, args.url, speed, args.concurrency, args.loops)
+    # What the service did with these requests when they were captured (older captures lack it)
+    outcomes = [rec["outcome"] for rec in records if "outcome" in rec]
+    report["captured_outcomes"] = {k: outcomes.count(k) for k in sorted(set(outcomes))} or None
+    lat = report["latency_ms"]
+    print(f"✅ {report['requests']} requests in {report['wall_seconds']:.2f}s "
+          f"({report['throughput_rps']} req/s), {report['errors']} errors")
+    print(f"⏱️  Latency ms: p50 {lat['p50']:.2f}  p90 {lat['p90']:.2f}  p99 {lat['p99']:.2f}  max {lat['max']:.2f}")
+    if report["captured_outcomes"]:
+        print(f"📼 Captured outcomes: {report['captured_outcomes']}")
+    if report["schedule_lag_ms"]:
+        print(f"🕒 Schedule lag ms: p50 {report['schedule_lag_ms']['p50']:.2f}  p99 {report['schedule_lag_ms']['p99']:.2f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved to {args.output}")
+    return 0 if report["errors"] == 0 else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Batch Scoring Job for the CS-ML Model
+
+Scores every customer with the current model and publishes a memory-mappable
+score table (app.score_table) that `GET /score/{userId}` serves without a live
+model call. Run it on a schedule; each run swaps the table atomically.
+
+Usage:
+    python score_all.py [--days=30] [--backend_url=http://localhost:3000] [--tenant_id=...]
+    python score_all.py --input=snapshots.parquet        # features from a file instead of the CS API
+    # e.g. cron: */15 * * * * cd /app && python score_all.py
+"""
+
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from app.model_registry import load_model, latest_model_path, tenant_model_dir, predict_risk, calibrate
+from app.config import SERVE_COMPACT
+from app.reasons import reason_masks
+from app.score_table import write_score_table, score_table_dir, TIERS, REASON_CODES
+from train.data_sources import load_snapshots_from_cs
+
+def latest_per_user(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per userId: the most recent snapshot."""
+    if "snapshot_ts" in df.columns:
+        df = df.assign(snapshot_ts=pd.to_datetime(df["snapshot_ts"])).sort_values("snapshot_ts", kind="stable")
+    return df.drop_duplicates("userId", keep="last")
+
+def feature_matrix(df: pd.DataFrame, feature_order: list) -> np.ndarray:
+    """Columnar version of ServingModel.vectorize over `features__<name>` columns."""
+    region = df["features__region"].fillna("US") if "features__region" in df.columns else pd.Series("US", index=df.index)
+    cols = []
+    for f in feature_order:
+        if f.startswith("region__"):
+            cols.append((region == f.split("__", 1)[1]).to_numpy(dtype=float))
+        elif f"features__{f}" in df.columns:
+            cols.append(pd.to_numeric(df[f"features__{f}"], errors="coerce").fillna(0.0).to_numpy(dtype=float))
+        else:
+            cols.append(np.zeros(len(df)))
+    return np.column_stack(cols) if cols else np.zeros((len(df), 0))
+
+def score_frame(df: pd.DataFrame, model, meta: dict):
+    """(risk, tier index, reason bitmask) per row, with the same rules as POST /score."""
+    X = feature_matrix(df, meta["feature_order"])
+    cal = meta.get("calibration")
+    risk = calibrate(predict_risk(model, X), {"x": cal["x"], "y": cal["y"]} if cal else None)
+    th = meta.get("thresholds", {"med": 0.4, "high": 0.7})
+    tier = (risk >= th["med"]).astype(np.int8) + (risk >= th["high"])
+    cols = {c.replace("features__", ""): pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float)
+            for c in df.columns if c.startswith("features__") and c != "features__region"}
+    masks = reason_masks(cols, len(df))
+    bits = np.zeros(len(df), dtype=np.uint8)
+    for b, code in enumerate(REASON_CODES):
+        bits |= masks[code].astype(np.uint8) << b
+    return risk, tier, bits
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch-score all customers into the served score table')
+    parser.add_argument('--days', type=int, default=30,
+                       help='Feature window in days ending at --as_of (default: 30)')
+    parser.add_argument('--as_of', type=str, default=None,
+                       help='End of the feature window (default: now)')
+    parser.add_argument('--backend_url', type=str, default='http://localhost:3000',
+                       help='Backend API URL (default: http://localhost:3000)')
+    parser.add_argument('--tenant_id', type=str, default=None,
+                       help='Tenant to score (default: TENANT_ID); uses its registry namespace if it has models')
+    parser.add_argument('--input', type=str, default=None,
+                       help='Parquet/CSV snapshots (userId, features__<name>) instead of the CS API')
+    parser.add_argument('--model', type=str, default=None,
+                       help='Model .pkl to score with (default: latest for the tenant, else shared)')
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CS-ML Batch Scoring")
+    print("=" * 60)
+
+    t0 = time.perf_counter()
+    if args.input:
+        df = pd.read_parquet(args.input) if args.input.endswith(".parquet") else pd.read_csv(args.input)
+    else:
+        end = pd.Timestamp(args.as_of) if args.as_of else pd.Timestamp.utcnow().tz_localize(None)
+        start = end - pd.Timedelta(days=args.days)
+        df = load_snapshots_from_cs(start.isoformat(), end.isoformat(), tenant_id=args.tenant_id,
+                                    features_url=f"{args.backend_url}/customers/features/public")
+    if df.empty:
+        print("❌ No customers to score")
+        return 1
+    df = latest_per_user(df)
+
+    # The tenant's own model when it has one (as /score routes), else the shared one. The
+    # table always goes to the tenant's namespace, where GET /score/{userId} looks for it
+    model_namespace = "tenant" if args.tenant_id else "shared"
+    model_path = args.model
+    if model_path is None:
+        try:
+            model_path = latest_model_path(tenant_model_dir(args.tenant_id), SERVE_COMPACT)
+        except FileNotFoundError:
+            model_namespace, model_path = "shared", latest_model_path(compact=SERVE_COMPACT)
+    model, meta = load_model(model_path)
+    print(f"Model: {meta['version']} ({model_namespace}), {len(df)} customers")
+
+    risk, tier, bits = score_frame(df, model, meta)
+    path = write_score_table(score_table_dir(args.tenant_id), df["userId"].astype(str), risk, tier, bits,
+                             {"modelVersion": meta["version"], "model_namespace": model_namespace,
+                              "tenant_id": args.tenant_id})
+    counts = np.bincount(tier, minlength=len(TIERS))
+    print(f"📊 Tiers: " + ", ".join(f"{t}={c}" for t, c in zip(TIERS, counts)))
+    print(f"💾 Published {path} in {time.perf_counter() - t0:.2f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,9 +12,7 @@ Usage:
 import os
 import sys
 import argparse
-import pandas as pd
 import json
-from train.testing import run_comprehensive_test
 
 def main():
     parser = argparse.ArgumentParser(description='Test Customer Success ML Model')
@@ -29,8 +27,13 @@ def main():
                        help='Path to specific model file (default: use latest)')
     parser.add_argument('--save_report', action='store_true',
                        help='Save detailed test report to JSON file')
+    parser.add_argument('--n_jobs', type=int, default=None,
+                       help='Cores for the suite, split between the bootstrap and permutation-importance workers (default: all)')
     
     args = parser.parse_args()
+    # Deferred so --help and argument errors don't pay for pandas / LightGBM / scikit-learn
+    import pandas as pd
+    from train.testing import run_comprehensive_test
     
     # Set environment variables for the testing process
     os.environ['CS_FEATURES_URL'] = f"{args.backend_url}/customers/features/public"
@@ -57,7 +60,8 @@ def main():
         results = run_comprehensive_test(
             start.isoformat(), 
             end.isoformat(), 
-            args.model_path
+            args.model_path,
+            args.n_jobs
         )
         
         if 'error' in results:
@@ -0,0 +1,27 @@
+"""The compiled calibration table stays invertible when the calibrator saturates.
+
+Run from ML/: python -m pytest tests
+"""
+
+import numpy as np
+from app.model_registry import calibrate
+from train.calibration import compile_table, fit_calibration
+
+def _assert_invertible(table):
+    x, y = np.asarray(table["x"]), np.asarray(table["y"])
+    assert np.all(np.diff(y) > 0) and y[0] >= 0.0 and y[-1] <= 1.0
+    # fit_cascade maps calibrated thresholds back to raw scores with this inverse
+    q = np.linspace(0.5, 0.9, 9)
+    assert np.allclose(calibrate(np.interp(q, y, x), table), q, atol=1e-6)
+
+def test_table_with_plateaus_at_zero_and_one():
+    p = np.random.default_rng(0).random(5000)
+    _assert_invertible(compile_table(lambda s: np.clip(3 * s - 1, 0.0, 1.0), p))
+
+def test_isotonic_fit_saturating_at_one():
+    rng = np.random.default_rng(1)
+    p = rng.random(5000)
+    y = (p > 0.5) | (rng.random(5000) < 0.2)   # every score above 0.5 is a positive
+    table = fit_calibration(y, p, method="isotonic")
+    assert max(table["y"]) > 1 - 1e-5
+    _assert_invertible(table)
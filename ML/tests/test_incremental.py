@@ -0,0 +1,96 @@
+"""Parity of app.incremental against LightGBM's own raw scores.
+
+Run from ML/: python -m pytest tests
+"""
+
+import numpy as np
+import lightgbm as lgb
+import pytest
+from app.incremental import CompiledEnsemble, IncrementalScorer
+
+N_FEATURES = 5
+
+def _data(seed: int, n: int = 4000, nan_rate: float = 0.0, zero_rate: float = 0.0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, N_FEATURES))
+    X[:, 0] = rng.integers(0, 8, n)   # small integer ids, used as a categorical in some models
+    y = ((X[:, 0] % 3 == 0) ^ (X[:, 1] + 0.5 * X[:, 2] > 0.3)).astype(int)
+    flip = rng.random(n) < 0.1
+    y[flip] = 1 - y[flip]
+    X[:, 1:][rng.random((n, N_FEATURES - 1)) < nan_rate] = np.nan
+    X[:, 1:][rng.random((n, N_FEATURES - 1)) < zero_rate] = 0.0
+    return X, y
+
+def _fit(X, y, rounds: int = 40, categorical: bool = False, **params):
+    ds = lgb.Dataset(X, y, categorical_feature=[0] if categorical else "auto")
+    return lgb.train(dict(objective="binary", num_leaves=15, min_data_in_leaf=10, min_data_per_group=5,
+                          cat_smooth=1, verbose=-1, **params), ds, num_boost_round=rounds)
+
+def _probe_rows(seed: int, n: int = 300) -> np.ndarray:
+    """Rows that hit the edge cases: NaN, exact zeros, negative / fractional / unseen category ids."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, N_FEATURES))
+    X[:, 0] = rng.choice([-1.0, -0.5, 0.0, 1.0, 2.7, 3.0, 6.0, 7.0, 42.0, np.nan], n)
+    X[:, 1:][rng.random((n, N_FEATURES - 1)) < 0.2] = np.nan
+    X[:, 1:][rng.random((n, N_FEATURES - 1)) < 0.2] = 0.0
+    return X
+
+MODELS = {
+    "nan_missing": lambda: _fit(*_data(1, nan_rate=0.15)),
+    "zero_as_missing": lambda: _fit(*_data(2, zero_rate=0.2), zero_as_missing=True),
+    "categorical": lambda: _fit(*_data(3, nan_rate=0.1), categorical=True),
+}
+
+@pytest.fixture(scope="module", params=list(MODELS))
+def booster(request):
+    return MODELS[request.param]()
+
+def test_split_kinds_are_covered():
+    """The fixtures really produce NaN-missing, zero-missing and categorical splits."""
+    def kinds(b):
+        out = set()
+        def walk(node):
+            if "split_feature" in node:
+                out.add((node["decision_type"], node["missing_type"]))
+                walk(node["left_child"]); walk(node["right_child"])
+        for t in b.dump_model()["tree_info"]:
+            walk(t["tree_structure"])
+        return out
+    assert ("<=", "NaN") in kinds(MODELS["nan_missing"]())
+    assert ("<=", "Zero") in kinds(MODELS["zero_as_missing"]())
+    assert any(d == "==" for d, _ in kinds(MODELS["categorical"]()))
+
+def test_traverse_matches_lightgbm_leaves(booster):
+    ens = CompiledEnsemble(booster)
+    X = _probe_rows(10)
+    expected = booster.predict(X, raw_score=True)
+    for x, raw in zip(X, expected):
+        leaves, margin = ens.full(x)
+        assert np.array_equal(ens.traverse(x, np.arange(ens.n_trees)), leaves)
+        assert margin == pytest.approx(raw, abs=1e-9)
+
+def test_incremental_updates_match_full_evaluation(booster):
+    scorer = IncrementalScorer(booster, "v1")
+    scorer.ensemble.max_retraverse = scorer.ensemble.n_trees   # always walk in Python, never fall back
+    rng = np.random.default_rng(11)
+    X = _probe_rows(12, n=50)
+    for u, x in enumerate(X):
+        x = x.copy()
+        for _ in range(20):
+            assert scorer.margin(f"u{u}", x) == pytest.approx(booster.predict(x[None], raw_score=True)[0], abs=1e-9)
+            j = rng.integers(N_FEATURES)
+            x[j] = _probe_rows(int(rng.integers(2**31)), n=1)[0, j]   # next value of one feature
+    assert scorer.stats["hits"] == 50 * 19 and scorer.stats["misses"] == 50
+
+def test_cache_after_model_version_change():
+    old, new = MODELS["nan_missing"](), MODELS["categorical"]()
+    x = _probe_rows(13, n=1)[0]
+    first = IncrementalScorer(old, "v1")
+    first.margin("u", x)
+    # The reloaded model gets its own scorer: the user's cached leaves from v1 are never reused
+    second = IncrementalScorer(new, "v2")
+    assert second.margin("u", x) == pytest.approx(new.predict(x[None], raw_score=True)[0], abs=1e-9)
+    x2 = x.copy()
+    x2[0] = 3.0 if x[0] != 3.0 else 6.0
+    assert second.margin("u", x2) == pytest.approx(new.predict(x2[None], raw_score=True)[0], abs=1e-9)
+    assert (second.stats["misses"], second.stats["hits"]) == (1, 1)
@@ -0,0 +1,20 @@
+"""Out-of-core training holds its RSS ceiling on data several times larger than it.
+
+Run from ML/: python -m pytest tests
+"""
+
+import os
+from benchmark_out_of_core import generate, train_out_of_core
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAX_RSS_MB = 512
+FACTOR = 3
+
+def test_chunked_training_stays_under_ceiling(tmp_path, monkeypatch):
+    data = generate(str(tmp_path), FACTOR * MAX_RSS_MB, os.path.join(ML_DIR, "..", "mock", "users.json"), seed=7)
+    assert data["in_memory_mb"] >= FACTOR * MAX_RSS_MB
+    monkeypatch.setenv("BOOTSTRAP_RESAMPLES", "200")
+    result, _, stderr = train_out_of_core(str(tmp_path), MAX_RSS_MB, params={"n_estimators": 20})
+    assert result is not None, stderr[-2000:]
+    assert result["training_samples"] == data["rows"]
+    assert result["peak_rss_mb"] <= MAX_RSS_MB
@@ -0,0 +1,125 @@
+"""
+Probability calibration compiled into a piecewise-linear lookup table.
+
+Isotonic regression (or Platt scaling on the log-odds) is fitted on a held-out
+CALIBRATION_SHARE of the validation scores and then sampled at up to MAX_KNOTS
+score quantiles. The knots are stored in meta as
+``calibration = {"x": [...], "y": [...]}``, and serving applies them with a
+single ``np.interp`` (``app.model_registry.calibrate``). This keeps predict
+cost unchanged and needs no calibrator object at serving time. A tiny ramp keeps
+the table strictly increasing, so ranking metrics are unaffected by isotonic
+plateaus. Metrics, the holdout Brier and the tier rates come from the other
+validation rows, which the calibrator never saw.
+"""
+
+import os
+import numpy as np
+from app.model_registry import calibrate
+from .bootstrap import bootstrap_metrics
+from .utils import evaluate, choose_thresholds, tier_rates
+
+CALIBRATION_METHOD = os.getenv("CALIBRATION_METHOD", "auto")  # auto | isotonic | platt | none
+CALIBRATION_SHARE = float(os.getenv("CALIBRATION_SHARE", "0.3"))  # validation rows kept for the calibrator
+MAX_KNOTS = 128
+ISOTONIC_MIN_SAMPLES = 1000  # below this `auto` uses Platt; isotonic overfits small sets
+RAMP = 1e-6
+
+def _fitter(method: str):
+    """Returns fit(p, y, w) -> callable mapping raw scores to calibrated probabilities."""
+    if method == "isotonic":
+        from sklearn.isotonic import IsotonicRegression
+        def fit(p, y, w=None):
+            return IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(p, y, sample_weight=w).predict
+        return fit
+    from sklearn.linear_model import LogisticRegression
+    def logit(p):
+        p = np.clip(p, 1e-7, 1 - 1e-7)
+        return (np.log(p) - np.log1p(-p)).reshape(-1, 1)
+    def fit(p, y, w=None):
+        lr = LogisticRegression(C=1e6).fit(logit(p), y, sample_weight=w)
+        return lambda q: lr.predict_proba(logit(q))[:, 1]
+    return fit
+
+def compile_table(f, p: np.ndarray, max_knots: int = MAX_KNOTS) -> dict:
+    """Sample calibrator `f` at score quantiles (plus 0 and 1) into strictly increasing knots."""
+    x = np.unique(np.r_[0.0, np.quantile(p, np.linspace(0, 1, max_knots - 2)), 1.0])
+    y = np.maximum.accumulate(np.clip(f(x), 0.0, 1.0))
+    # Scaled into [0, 1 - RAMP] first, so plateaus (also one at 1.0) stay strictly increasing within [0, 1]
+    y = y * (1.0 - RAMP) + np.linspace(0, RAMP, len(y))
+    assert np.all(np.diff(y) > 0), "calibration table is not strictly increasing"
+    return {"x": x.tolist(), "y": y.tolist()}
+
+def fit_calibration(y_true, y_prob, method: str = CALIBRATION_METHOD, max_knots: int = MAX_KNOTS,
+                    sample_weight=None) -> dict | None:
+    """Fit and compile a calibration table; None when disabled or only one class is present.
+
+    `sample_weight` reweights a sampled validation set back to the label rate of the full data.
+    """
+    y, p = np.asarray(y_true, dtype=int), np.asarray(y_prob, dtype=float)
+    w = np.ones(len(y)) if sample_weight is None else np.asarray(sample_weight, dtype=float)
+    if method == "none" or len(np.unique(y)) < 2:
+        return None
+    if method == "auto":
+        method = "isotonic" if len(y) >= ISOTONIC_MIN_SAMPLES else "platt"
+    fit = _fitter(method)
+
+    f = fit(p, y, w)
+    table = compile_table(f, p, max_knots)
+    p_cal = calibrate(p, table)
+
+    # Out-of-sample Brier via 2-fold cross-fitting; the in-sample value would flatter the calibrator
+    rng = np.random.default_rng(42)
+    fold = rng.permutation(len(y)) % 2
+    p_cross = np.empty_like(p)
+    for k in (0, 1):
+        tr, te = fold != k, fold == k
+        if len(np.unique(y[tr])) < 2:
+            p_cross[te] = p[te]
+            continue
+        p_cross[te] = calibrate(p[te], compile_table(fit(p[tr], y[tr], w[tr]), p[tr], max_knots))
+
+    return {
+        "method": method,
+        "knots": len(table["x"]),
+        **table,
+        "max_table_error": float(np.max(np.abs(p_cal - f(p)))),  # compiled table vs. exact calibrator
+        "fitted_on": int(len(y)),
+        "brier_raw": float(np.average((p - y) ** 2, weights=w)),
+        "brier_calibrated_cv": float(np.average((p_cross - y) ** 2, weights=w))
+    }
+
+def holdout_split(n: int, share: float = CALIBRATION_SHARE, seed: int = 42):
+    """Seeded split of `n` validation rows into (calibration rows, evaluation rows)."""
+    if CALIBRATION_METHOD == "none":
+        share = 0.0
+    perm = np.random.default_rng(seed).permutation(n)
+    k = int(round(n * share))
+    return np.sort(perm[:k]), np.sort(perm[k:])
+
+def evaluate_calibrated(y_val, p_val, sample_weight=None, n_jobs: int | None = None) -> dict:
+    """Calibration, metrics and tiers for raw validation scores `p_val`, without reusing rows.
+
+    The calibrator is fitted on `holdout_split`'s calibration rows; metrics, bootstrap CIs,
+    the calibrated Brier and the tier rates are computed on the remaining rows only.
+    Returns the meta fields ``metrics``, ``metrics_ci``, ``calibration``, ``thresholds``
+    and ``tier_rates``.
+    """
+    y, p = np.asarray(y_val), np.asarray(p_val, dtype=float)
+    w = None if sample_weight is None else np.asarray(sample_weight, dtype=float)
+    cal, ev = holdout_split(len(y))
+    if not len(ev):  # too few rows to hold any out
+        cal, ev = np.arange(0), np.arange(len(y))
+    w_cal, w_ev = (None, None) if w is None else (w[cal], w[ev])
+    calibration = fit_calibration(y[cal], p[cal], sample_weight=w_cal) if len(cal) else None
+    p_cal = calibrate(p[ev], calibration)
+    if calibration is not None:
+        calibration["brier_holdout"] = float(np.average((p_cal - y[ev]) ** 2, weights=w_ev))
+        calibration["evaluated_on"] = int(len(ev))
+    thresholds = choose_thresholds()
+    return {
+        "metrics": evaluate(y[ev], p[ev], sample_weight=w_ev),
+        "metrics_ci": bootstrap_metrics(y[ev], p[ev], sample_weight=w_ev, cpu_count=n_jobs),
+        "calibration": calibration,
+        "thresholds": thresholds,
+        "tier_rates": tier_rates(p_cal, thresholds, w_ev)
+    }
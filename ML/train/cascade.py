@@ -0,0 +1,103 @@
+"""
+Offline calibration of cascaded early-exit scoring (served by ``app.cascade``).
+
+For each candidate stage-1 size ``K`` (first K trees) on the validation fold:
+
+1. the full-model margin is regressed on the K-tree margin (``a * m_K + b``);
+2. each row gets its distance, in logit units, from that estimate to the nearest
+   tier boundary (the calibrated thresholds mapped back to raw margins);
+3. the exit margin is the smallest distance at which exiting every row beyond it
+   keeps overall tier agreement with the full model at CASCADE_TARGET_AGREEMENT
+   (the largest such margin over the whole fold and each of its halves).
+
+The K with the lowest expected measured single-row latency
+(stage 1 + non-exit rate x remaining trees) is stored as ``meta["cascade"]``. It
+is marked ``enabled`` only if that beats the measured full-model latency.
+"""
+
+import os, time
+import numpy as np
+from app.cascade import logit
+
+TARGET_AGREEMENT = float(os.getenv("CASCADE_TARGET_AGREEMENT", "0.995"))
+STAGE_TREES = [10, 25, 50, 100, 200]
+
+def _tiers(m: np.ndarray, boundaries: np.ndarray) -> np.ndarray:
+    return np.searchsorted(boundaries, m, side="right")  # boundaries ascending: med, high
+
+def _exit_margin(dist: np.ndarray, wrong: np.ndarray, target: float) -> float:
+    """Smallest distance such that exiting every row beyond it keeps agreement >= target."""
+    if len(dist) == 0:
+        return 0.0
+    # Exit the rows farthest from a boundary first; stop before mismatches exceed the budget
+    order = np.argsort(-dist, kind="mergesort")
+    exits = int(np.searchsorted(np.cumsum(wrong[order]), int((1 - target) * len(dist)), side="right"))
+    return float(dist[order[exits]]) if exits < len(order) else 0.0
+
+def _latency_us(fn, X: np.ndarray, repeats: int = 200) -> float:
+    times = []
+    for i in range(repeats):
+        x = X[i % len(X)].reshape(1, -1)
+        t0 = time.perf_counter()
+        fn(x)
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times) * 1e6)
+
+def fit_cascade(model, Xva: np.ndarray, thresholds: dict, calibration: dict | None,
+                target: float = TARGET_AGREEMENT) -> dict | None:
+    """Choose stage-1 size and exit margin on validation data; None if the model is too small."""
+    booster = getattr(model, "booster_", model)
+    n_trees = booster.num_trees()
+    Xva = np.asarray(Xva, dtype=float)
+    if len(Xva) == 0:
+        return None
+    # Calibrated tier thresholds -> raw probabilities (inverse of the increasing table) -> margins
+    raw = {k: float(np.interp(v, calibration["y"], calibration["x"])) if calibration else float(v)
+           for k, v in sorted(thresholds.items(), key=lambda kv: kv[1])}
+    boundaries = logit(list(raw.values()))
+    m_full = booster.predict(Xva, raw_score=True)
+    tiers_full = _tiers(m_full, boundaries)
+    full_us = _latency_us(lambda x: booster.predict(x, raw_score=True, num_threads=1), Xva)
+
+    grid = []
+    for k in [k for k in STAGE_TREES if k < n_trees]:
+        m_k = booster.predict(Xva, num_iteration=k, raw_score=True)
+        a, b = np.polyfit(m_k, m_full, 1) if np.ptp(m_k) > 0 else (1.0, float(np.mean(m_full - m_k)))
+        est = a * m_k + b
+        dist = np.min(np.abs(est[:, None] - boundaries[None, :]), axis=1)
+        wrong = _tiers(est, boundaries) != tiers_full
+
+        # Largest of the margins chosen on the full fold and on each half, so it holds out of sample
+        halves = np.arange(len(dist)) % 2
+        margin = max(_exit_margin(dist, wrong, target), _exit_margin(dist[halves == 0], wrong[halves == 0], target),
+                     _exit_margin(dist[halves == 1], wrong[halves == 1], target))
+        exit_mask = dist > margin
+        agreement = 1.0 - float(np.mean(wrong & exit_mask))
+
+        stage1_us = _latency_us(lambda x: booster.predict(x, num_iteration=k, raw_score=True, num_threads=1), Xva)
+        rest_us = _latency_us(lambda x: booster.predict(x, start_iteration=k, raw_score=True, num_threads=1), Xva)
+        grid.append({
+            "trees": k, "a": float(a), "b": float(b), "margin": margin,
+            "early_exit_rate": float(exit_mask.mean()),
+            "tier_agreement": agreement,
+            "expected_latency_us": float(stage1_us + (1 - exit_mask.mean()) * rest_us),
+            "stage1_latency_us": stage1_us,
+            "rest_latency_us": rest_us
+        })
+    if not grid:
+        return None
+    best = min(grid, key=lambda g: g["expected_latency_us"])
+    return {
+        "enabled": bool(best["expected_latency_us"] < full_us),
+        "trees": best["trees"], "a": best["a"], "b": best["b"], "margin": best["margin"],
+        "threshold_margins": dict(zip(raw, boundaries.tolist())),
+        "target_agreement": target,
+        "validation": {
+            "rows": int(len(Xva)),
+            "tier_agreement": best["tier_agreement"],
+            "early_exit_rate": best["early_exit_rate"],
+            "expected_latency_us": round(best["expected_latency_us"], 2),
+            "full_latency_us": round(full_us, 2)
+        },
+        "grid": grid
+    }
@@ -0,0 +1,207 @@
+"""
+Out-of-core training for tenants whose snapshots do not fit in RAM.
+
+Snapshots are read from a directory of Parquet files laid out by week
+(``<dir>/week=2025-W30/part-0.parquet``, one partition per weekly group) with the
+same flat columns `load_snapshots_from_cs` returns. Rows are featurized one row
+group at a time and streamed into LightGBM's binned ``Dataset`` through the
+``lightgbm.Sequence`` interface: LightGBM draws its bin-construction sample first,
+then pushes the rows batch by batch, so the float64 ``X`` never exists in full.
+"""
+
+import os, glob
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+import pyarrow.parquet as pq
+from sklearn.model_selection import GroupShuffleSplit
+from .training import prepare, build_meta, record_profile, LGBM_PARAMS
+from .utils import check_rss
+from .profiling import stage, profiled
+from app.model_registry import save_model
+
+MAX_RSS_MB = float(os.getenv("TRAIN_MAX_RSS_MB", "0"))  # 0 disables the ceiling
+CHUNK_ROWS = int(os.getenv("TRAIN_CHUNK_ROWS", "65536"))
+
+def booster_params(params: dict = LGBM_PARAMS):
+    """Translate sklearn-style LGBM_PARAMS into native `lightgbm.train` params and a round count."""
+    native = {k: v for k, v in params.items() if k != "n_estimators"}
+    # Col-wise histograms: skips LightGBM's row-wise trial, which builds a second copy of the binned rows
+    native.update(objective="binary", verbose=-1, force_col_wise=True)
+    return native, params["n_estimators"]
+
+def list_partitions(snapshots_dir: str):
+    """Return (paths, week groups) for every Parquet file under `snapshots_dir`."""
+    paths = sorted(glob.glob(os.path.join(snapshots_dir, "**", "*.parquet"), recursive=True))
+    if not paths:
+        raise FileNotFoundError(f"No Parquet snapshot files found under {snapshots_dir}")
+    groups = []
+    for p in paths:
+        week = [part.split("=", 1)[1] for part in p.split(os.sep) if part.startswith("week=")]
+        groups.append(week[-1] if week else os.path.splitext(os.path.basename(p))[0])
+    return paths, groups
+
+def write_snapshot_partitions(df: pd.DataFrame, out_dir: str, row_group_rows: int = CHUNK_ROWS) -> list:
+    """Write a snapshot frame as one Parquet file per weekly group, in the layout read above."""
+    weeks = pd.to_datetime(df["snapshot_ts"]).dt.to_period("W").dt.start_time.dt.strftime("%Y-%m-%d")
+    written = []
+    for week, part in df.groupby(weeks, sort=True):
+        part_dir = os.path.join(out_dir, f"week={week}")
+        os.makedirs(part_dir, exist_ok=True)
+        path = os.path.join(part_dir, f"part-{len(glob.glob(os.path.join(part_dir, '*.parquet')))}.parquet")
+        part.to_parquet(path, index=False, row_group_size=row_group_rows)
+        written.append(path)
+    return written
+
+class RowGroupCache:
+    """The one decoded row group held at a time: ``key`` = (path, row group), ``X``."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.key, self.X = None, None
+
+class ParquetSnapshotSequence(lgb.Sequence):
+    """Featurized view over one Parquet file, decoded one row group at a time.
+
+    LightGBM walks its sequences in order (sorted sample indices, then sequential
+    batches), so the sequences of one Dataset can share a single decoded row group:
+    pass them the same `cache`. By default each sequence has its own.
+    """
+
+    def __init__(self, path: str, batch_size: int = CHUNK_ROWS, max_rss_mb: float = MAX_RSS_MB,
+                 cache: RowGroupCache | None = None):
+        self.path = path
+        self.batch_size = batch_size
+        self.max_rss_mb = max_rss_mb
+        self.peak_rss_mb = 0.0
+        self._cache = cache if cache is not None else RowGroupCache()
+        md = pq.read_metadata(path)  # no reader kept open: each holds its decode buffers until closed
+        sizes = [md.row_group(i).num_rows for i in range(md.num_row_groups)]
+        self._offsets = np.cumsum([0] + sizes)
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    def _row_group(self, i: int) -> np.ndarray:
+        cache = self._cache
+        if cache.key != (self.path, i):
+            cache.clear()  # drop the previous group before decoding the next one
+            with pq.ParquetFile(self.path) as pf:
+                X, _, _, _ = prepare(pf.read_row_group(i).to_pandas())
+            cache.key, cache.X = (self.path, i), X
+            self.peak_rss_mb = max(self.peak_rss_mb, check_rss(self.max_rss_mb))
+        return cache.X
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, _ = idx.indices(len(self))
+            parts = []
+            while start < stop:
+                g = int(np.searchsorted(self._offsets, start, side="right") - 1)
+                end = min(stop, int(self._offsets[g + 1]))
+                parts.append(self._row_group(g)[start - self._offsets[g]:end - self._offsets[g]])
+                start = end
+            return np.vstack(parts) if parts else np.empty((0, 0))
+        g = int(np.searchsorted(self._offsets, idx, side="right") - 1)
+        return self._row_group(g)[idx - self._offsets[g]].copy()  # a view would pin the whole group
+
+    def iter_chunks(self):
+        for g in range(len(self._offsets) - 1):
+            yield self._row_group(g)
+        self._cache.clear()
+
+def partition_sample(paths, rows: int, max_rss_mb: float = MAX_RSS_MB) -> np.ndarray:
+    """Featurized rows from the first row group of every partition, about `rows` in total."""
+    per_file = max(1, rows // max(len(paths), 1))
+    parts = []
+    for p in paths:
+        X = next(ParquetSnapshotSequence(p, per_file, max_rss_mb).iter_chunks())
+        parts.append(X[np.linspace(0, len(X) - 1, min(per_file, len(X))).astype(int)])
+        del X  # last reference to the decoded group
+    return np.concatenate(parts)
+
+def _read_labels(paths):
+    """One cheap pass over the label/timestamp columns only."""
+    labels, ts_min, ts_max = [], None, None
+    for p in paths:
+        t = pq.read_table(p, columns=["label", "snapshot_ts"]).to_pandas()
+        labels.append(t["label"].to_numpy(dtype=np.int8))
+        ts = pd.to_datetime(t["snapshot_ts"])
+        ts_min = ts.min() if ts_min is None else min(ts_min, ts.min())
+        ts_max = ts.max() if ts_max is None else max(ts_max, ts.max())
+    y = np.concatenate(labels) if labels else np.empty(0, dtype=np.int8)
+    return y, ts_min, ts_max
+
+@profiled
+def train_model_chunked(snapshots_dir: str, max_rss_mb: float = MAX_RSS_MB, chunk_rows: int = CHUNK_ROWS,
+                        params: dict = LGBM_PARAMS):
+    """Train from weekly Parquet partitions with bounded memory; mirrors `train_model`'s meta.
+
+    `params` are sklearn-style LightGBM params (default: `LGBM_PARAMS`, as in `train_model`).
+    """
+    with stage("list_partitions"):
+        paths, groups = list_partitions(snapshots_dir)
+    feature_order = prepare(pq.read_table(paths[0]).slice(0, 1).to_pandas())[3]
+
+    # Time-aware split over whole weekly partitions, same policy as `time_split`
+    if len(set(groups)) > 1:
+        gss = GroupShuffleSplit(n_splits=1, train_size=0.8, random_state=42)
+        train_idx, val_idx = next(gss.split(paths, groups=groups))
+    else:
+        train_idx, val_idx = np.arange(len(paths)), np.arange(0)
+        print("⚠️  Warning: only one weekly partition; validating on the training data")
+    train_paths = [paths[i] for i in train_idx]
+    val_paths = [paths[i] for i in val_idx] or train_paths
+
+    with stage("read_labels"):
+        ytr, ts_min, ts_max = _read_labels(train_paths)
+        yva, _, _ = _read_labels(val_paths)
+    print(f"📊 Class Distribution: {dict(zip(*np.unique(ytr, return_counts=True)))}")
+    check_rss(max_rss_mb)
+
+    native, rounds = booster_params(params)
+    cache = RowGroupCache()  # shared: one decoded row group across all training partitions
+    seqs = [ParquetSnapshotSequence(p, chunk_rows, max_rss_mb, cache) for p in train_paths]
+    train_ds = lgb.Dataset(seqs, label=ytr, params=native, free_raw_data=True)
+    with stage("dataset_construct"):
+        train_ds.construct()
+    seq_peaks = [s.peak_rss_mb for s in seqs]
+    del seqs
+    cache.clear()
+    seq_peaks.append(check_rss(max_rss_mb))
+    with stage("fit"):
+        booster = lgb.train(native, train_ds, num_boost_round=rounds)
+    del train_ds
+    seq_peaks.append(check_rss(max_rss_mb))
+
+    # Stream validation predictions chunk by chunk
+    with stage("predict_validation"):
+        p_va = np.concatenate([
+            booster.predict(X) for p in val_paths
+            for X in ParquetSnapshotSequence(p, chunk_rows, max_rss_mb).iter_chunks()
+        ])
+    # Drift reference and cascade calibration on about `chunk_rows` rows spread evenly over the
+    # training / validation partitions (bounded memory, every week represented)
+    Xref, Xva_sample = partition_sample(train_paths, chunk_rows, max_rss_mb), partition_sample(val_paths, chunk_rows, max_rss_mb)
+    peak_rss = max(seq_peaks + [check_rss(max_rss_mb)])
+
+    meta = build_meta(booster, yva, p_va, Xva_sample, Xref, feature_order, params,
+                      tenant_id=None,
+                      trained_from=ts_min.isoformat() if ts_min is not None else None,
+                      trained_to=ts_max.isoformat() if ts_max is not None else None,
+                      training_samples=int(len(ytr) + (len(yva) if len(val_idx) else 0)),
+                      validation_samples=int(len(yva)))
+    del Xref, Xva_sample
+    meta["out_of_core"] = {
+        "snapshots_dir": snapshots_dir,
+        "partitions": {"train": len(train_paths), "validation": len(val_idx)},
+        "chunk_rows": chunk_rows,
+        "max_rss_mb": max_rss_mb or None,
+        "peak_rss_mb": round(max(peak_rss, check_rss(max_rss_mb)), 1)
+    }
+    version = meta["version"]
+    with stage("save_model"):
+        save_model(booster, meta, version)
+    return record_profile(meta)
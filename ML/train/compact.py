@@ -0,0 +1,137 @@
+"""
+Serving-size optimizer: trade a little accuracy for a much cheaper ensemble.
+
+After training, three families of smaller models are built from the full one:
+
+- truncation: the first ``k`` trees (what early stopping would have kept);
+- pruning: the full ensemble minus its lowest total-split-gain trees (tree 0,
+  which carries the base score, is always kept);
+- distillation: a shallow LightGBM student fitted with a cross-entropy objective
+  on the full model's training-set probabilities (weighted like the full fit).
+
+Every candidate is scored on the validation fold (AUC, raw Brier and
+cross-fitted calibrated Brier, weighted when the training rows were sampled) and
+timed single-row and in batch. The result is
+an accuracy-vs-latency curve. The fastest candidate within COMPACT_MAX_AUC_LOSS /
+COMPACT_MAX_BRIER_LOSS of the full model is saved next to it as ``<version>-compact``.
+"""
+
+import os, re, time
+import numpy as np
+import lightgbm as lgb
+from app.config import COMPACT_SUFFIX
+from app.model_registry import predict_risk
+from .calibration import fit_calibration, evaluate_calibrated
+from .cascade import fit_cascade
+from .utils import evaluate
+
+MAX_AUC_LOSS = float(os.getenv("COMPACT_MAX_AUC_LOSS", "0.005"))
+MAX_BRIER_LOSS = float(os.getenv("COMPACT_MAX_BRIER_LOSS", "0.002"))
+TRUNCATE_AT = [25, 50, 100, 150, 200, 300, 400]
+PRUNE_KEEP = [0.25, 0.5, 0.75]
+DISTILL_PARAMS = dict(objective="cross_entropy", learning_rate=0.1, num_leaves=15, max_depth=5,
+                      min_data_in_leaf=20, feature_fraction=1.0, verbose=-1)
+DISTILL_ROUNDS = [100, 200]
+BATCH_ROWS = 1000
+
+def select_trees(booster: lgb.Booster, keep: list) -> lgb.Booster:
+    """A new Booster holding only trees `keep` (in that order), built by editing the text model."""
+    text = booster.model_to_string()
+    head, rest = text.split("\nTree=0\n", 1)
+    body, tail = rest.split("end of trees", 1)
+    trees = re.split(r"(?m)^Tree=\d+\n", "Tree=0\n" + body)[1:]
+    new = [f"Tree={i}\n" + trees[k] for i, k in enumerate(keep)]
+    head = re.sub(r"(?m)^tree_sizes=.*$", "tree_sizes=" + " ".join(str(len(t)) for t in new), head + "\n")
+    return lgb.Booster(model_str=head + "".join(new) + "end of trees" + tail)
+
+def tree_gains(booster: lgb.Booster) -> np.ndarray:
+    """Total split gain per tree."""
+    def gain(node):
+        if "split_gain" not in node:
+            return 0.0
+        return node["split_gain"] + gain(node["left_child"]) + gain(node["right_child"])
+    return np.array([gain(t["tree_structure"]) for t in booster.dump_model()["tree_info"]])
+
+def measure_latency(model, X: np.ndarray, repeats: int = 300) -> dict:
+    """Median single-row latency and per-row batch latency, single thread, in microseconds."""
+    times = []
+    for i in range(repeats):
+        x = X[i % len(X)].reshape(1, -1)
+        t0 = time.perf_counter()
+        predict_risk(model, x, num_threads=1)
+        times.append(time.perf_counter() - t0)
+    batch = X[:BATCH_ROWS]
+    t0 = time.perf_counter()
+    predict_risk(model, batch, num_threads=1)
+    return {"single_row_us": round(float(np.median(times)) * 1e6, 2),
+            "batch_us_per_row": round((time.perf_counter() - t0) / len(batch) * 1e6, 3)}
+
+def _candidates(booster: lgb.Booster, Xtr: np.ndarray, wtr: np.ndarray | None = None, threads: int = 0):
+    n = booster.num_trees()
+    yield "full", {"trees": n}, booster
+    for k in TRUNCATE_AT:
+        if k < n:
+            yield f"truncate_{k}", {"trees": k}, select_trees(booster, list(range(k)))
+    order = np.argsort(-tree_gains(booster)[1:]) + 1   # tree 0 holds the base score
+    for frac in PRUNE_KEEP:
+        keep = sorted([0] + order[:max(1, int(frac * n)) - 1].tolist())
+        yield f"prune_keep_{int(frac * 100)}pct", {"trees": len(keep)}, select_trees(booster, keep)
+    soft = booster.predict(Xtr, num_threads=threads)
+    for rounds in DISTILL_ROUNDS:
+        student = lgb.train({**DISTILL_PARAMS, "num_threads": threads}, lgb.Dataset(Xtr, label=soft, weight=wtr),
+                            num_boost_round=rounds)
+        yield f"distill_{rounds}", {"trees": rounds, "num_leaves": DISTILL_PARAMS["num_leaves"]}, student
+
+def compact_model(model, Xtr: np.ndarray, Xva: np.ndarray, yva: np.ndarray,
+                  wtr: np.ndarray | None = None, wva: np.ndarray | None = None, n_jobs: int | None = None):
+    """Build the size/latency curve and pick the compact model. Returns (model or None, report).
+
+    `n_jobs` caps LightGBM's threads (default: all cores).
+    """
+    t0 = time.perf_counter()
+    booster = getattr(model, "booster_", model)
+    curve, models = [], {}
+    for name, shape, cand in _candidates(booster, Xtr, wtr, n_jobs or 0):
+        p = predict_risk(cand, Xva, num_threads=n_jobs or 0)
+        cal = fit_calibration(yva, p, sample_weight=wva)
+        curve.append({
+            "name": name, **shape,
+            "metrics": evaluate(yva, p, sample_weight=wva),
+            "brier_calibrated_cv": cal["brier_calibrated_cv"] if cal else None,
+            "latency": measure_latency(cand, Xva)
+        })
+        models[name] = cand
+
+    full = curve[0]
+    def within(c):
+        ok = c["metrics"]["auc_roc"] >= full["metrics"]["auc_roc"] - MAX_AUC_LOSS
+        if c["brier_calibrated_cv"] is not None and full["brier_calibrated_cv"] is not None:
+            ok &= c["brier_calibrated_cv"] <= full["brier_calibrated_cv"] + MAX_BRIER_LOSS
+        return ok
+    chosen = min((c for c in curve if within(c)), key=lambda c: (c["latency"]["single_row_us"], c["trees"]))
+    report = {
+        "max_auc_loss": MAX_AUC_LOSS,
+        "max_brier_loss": MAX_BRIER_LOSS,
+        "chosen": chosen["name"],
+        "latency": {"full": full["latency"], "compact": chosen["latency"]},
+        "curve": curve,
+        "seconds": round(time.perf_counter() - t0, 3)
+    }
+    return (None if chosen is full else models[chosen["name"]]), report
+
+def compact_meta(meta: dict, model, Xva: np.ndarray, yva: np.ndarray, wva: np.ndarray | None = None,
+                 n_jobs: int | None = None) -> dict:
+    """Meta for the compact model: the full model's meta re-evaluated and re-calibrated."""
+    p = predict_risk(model, Xva, num_threads=n_jobs or 0)
+    evaluation = evaluate_calibrated(yva, p, wva, n_jobs=n_jobs)
+    report = meta["compaction"]
+    out = {k: v for k, v in meta.items() if k not in ("hyperparameter_search", "cross_validation", "compaction")}
+    out.update(
+        version=meta["version"] + COMPACT_SUFFIX,
+        compacted_from=meta["version"],
+        **evaluation,
+        cascade=fit_cascade(model, Xva, evaluation["thresholds"], evaluation["calibration"]),
+        model_params={"compaction": report["chosen"], "trees": model.num_trees()},
+        compaction={k: v for k, v in report.items() if k != "curve"}
+    )
+    return out
@@ -1,64 +1,141 @@
-import os, requests, pandas as pd
-from typing import Literal
+import os, random, requests, pandas as pd
+from typing import Iterable, Iterator, Literal
+from .profiling import stage
 
 CS_FEATURES_URL = os.getenv("CS_FEATURES_URL", "http://localhost:3000/customers/features/public")
 TENANT_ID = os.getenv("TENANT_ID", "e0028c9a-8c0b-48a9-889a-9420c0e62662")
 
-def load_snapshots_from_cs(start_iso: str, end_iso: str) -> pd.DataFrame:
-    """Pull labeled snapshots from CS API features endpoint."""
+LOAD_CHUNK_ROWS = int(os.getenv("TRAIN_LOAD_CHUNK_ROWS", "100000"))
+
+def iter_snapshots_from_cs(start_iso: str, end_iso: str, tenant_id: str | None = None,
+                           features_url: str | None = None, chunk_rows: int = LOAD_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Pull labeled snapshots from CS API features endpoint, as DataFrames of `chunk_rows` rows.
+
+    The endpoint has no paging, so the parsed response is held once; rows are flattened
+    chunk by chunk and each item is released once converted, so a consumer that samples
+    (train.sampling) never holds the full frame.
+    """
     # Convert to the date format expected by the backend endpoint
     start_date = pd.to_datetime(start_iso).strftime('%Y-%m-%d')
     end_date = pd.to_datetime(end_iso).strftime('%Y-%m-%d')
     
-    url = f"{CS_FEATURES_URL}?startDate={start_date}&endDate={end_date}&tenantId={TENANT_ID}"
-    resp = requests.get(url, timeout=60)
-    resp.raise_for_status()
-    
-    response_data = resp.json()
+    url = f"{features_url or CS_FEATURES_URL}?startDate={start_date}&endDate={end_date}&tenantId={tenant_id or TENANT_ID}"
+    with stage("fetch"):
+        resp = requests.get(url, timeout=60)
+        resp.raise_for_status()
+        response_data = resp.json()
     if not response_data.get('success', False):
         raise RuntimeError(f"API Error: {response_data.get('message', 'Unknown error')}")
     
-    features_data = response_data.get('data', [])
+    features_data = response_data.pop('data', None) or []
     if not features_data:
         print(f"Warning: No data returned for date range {start_date} to {end_date}")
-        return pd.DataFrame()
+        return
     
     # Convert to expected format for training
-    import random
-    random.seed(42)  # Set seed for reproducible training data splits
-    rows = []
-    
+    rng = random.Random(42)  # Set seed for reproducible training data splits
+
     # Create more diverse snapshot timestamps to enable proper train/test grouping
     # Distribute samples across the date range to create multiple weekly groups
     start_ts = pd.to_datetime(start_date)
     end_ts = pd.to_datetime(end_date)
     date_range_days = (end_ts - start_ts).days
-    
-    for i, item in enumerate(features_data):
-        user_features = item['features']
-        
-        # Distribute snapshots across the date range to create multiple groups
-        # This creates more realistic temporal diversity for time-aware splitting
-        random_offset_days = random.randint(0, max(1, date_range_days - 1))
-        snapshot_date = start_ts + pd.Timedelta(days=random_offset_days)
-        
-        row = {
-            'userId': item['userId'],
-            'snapshot_ts': snapshot_date.strftime('%Y-%m-%d'),
-            'label': item['label'],
-            # Flatten features with features__ prefix
-            'features__activity_7d': user_features['activity_7d'],
-            'features__activity_30d': user_features['activity_30d'],
-            'features__time_since_last_use_days': user_features['time_since_last_use_days'],
-            'features__failed_renewals_30d': user_features['failed_renewals_30d'],
-            'features__tickets_7d': user_features['tickets_7d'],
-            'features__tickets_30d': user_features['tickets_30d'],
-            'features__plan_value': user_features['plan_value'],
-            'features__usage_score': user_features['usage_score'],
-            'features__region': user_features['region']
-        }
-        rows.append(row)
-    
-    df = pd.DataFrame(rows)
+
+    for lo in range(0, len(features_data), chunk_rows):
+        with stage("dataframe"):
+            rows = []
+            for i in range(lo, min(lo + chunk_rows, len(features_data))):
+                item, features_data[i] = features_data[i], None
+                user_features = item['features']
+
+                # Distribute snapshots across the date range to create multiple groups
+                # This creates more realistic temporal diversity for time-aware splitting
+                random_offset_days = rng.randint(0, max(1, date_range_days - 1))
+                snapshot_date = start_ts + pd.Timedelta(days=random_offset_days)
+
+                row = {
+                    'userId': item['userId'],
+                    'snapshot_ts': snapshot_date.strftime('%Y-%m-%d'),
+                    'label': item['label'],
+                    # Flatten features with features__ prefix
+                    'features__activity_7d': user_features['activity_7d'],
+                    'features__activity_30d': user_features['activity_30d'],
+                    'features__time_since_last_use_days': user_features['time_since_last_use_days'],
+                    'features__failed_renewals_30d': user_features['failed_renewals_30d'],
+                    'features__tickets_7d': user_features['tickets_7d'],
+                    'features__tickets_30d': user_features['tickets_30d'],
+                    'features__plan_value': user_features['plan_value'],
+                    'features__usage_score': user_features['usage_score'],
+                    'features__region': user_features['region']
+                }
+                rows.append(row)
+            chunk = pd.DataFrame(rows)
+        yield chunk
+
+def load_snapshots_from_cs(start_iso: str, end_iso: str, tenant_id: str | None = None,
+                           features_url: str | None = None, journal_dir: str | None = None) -> pd.DataFrame:
+    """Pull labeled snapshots from CS API features endpoint.
+
+    `tenant_id` / `features_url` default to the TENANT_ID / CS_FEATURES_URL environment values.
+    With `journal_dir`, the window's scored requests are appended (`with_scored_requests`).
+    """
+    chunks = iter_snapshots_from_cs(start_iso, end_iso, tenant_id, features_url)
+    if journal_dir:
+        chunks = with_scored_requests(chunks, journal_dir, start_iso, end_iso, tenant_id)
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame()
+    df = pd.concat(chunks, ignore_index=True)
     print(f"Loaded {len(df)} training samples from CS API")
-    return df
\ No newline at end of file
+    return df
+
+def _utc(ts: str) -> pd.Timestamp:
+    """ISO timestamp as UTC; naive strings are taken to be UTC already."""
+    t = pd.Timestamp(ts)
+    return t.tz_localize("UTC") if t.tzinfo is None else t.tz_convert("UTC")
+
+def load_scored_requests(journal_dir: str, start_iso: str | None = None, end_iso: str | None = None) -> pd.DataFrame:
+    """Read the serving journal (``JOURNAL_DIR``) of scored requests.
+
+    Rows have the snapshot layout (``snapshot_ts``, ``userId``, ``features__<name>``) plus
+    ``tenantId``, ``risk``, ``tier`` and ``modelVersion``; labels have to be joined on later.
+    Only closed ``*.parquet`` files are read; the file still being written is skipped.
+    """
+    import glob
+    import pyarrow.dataset as ds
+    paths = sorted(glob.glob(os.path.join(journal_dir, "*.parquet")))
+    if not paths:
+        return pd.DataFrame()
+    dataset = ds.dataset(paths, format="parquet")
+    cond = None
+    if start_iso:
+        cond = ds.field("snapshot_ts") >= _utc(start_iso)
+    if end_iso:
+        upper = ds.field("snapshot_ts") < _utc(end_iso)
+        cond = upper if cond is None else cond & upper
+    return dataset.to_table(filter=cond).to_pandas()
+
+def with_scored_requests(chunks: Iterable[pd.DataFrame], journal_dir: str, start_iso: str, end_iso: str,
+                         tenant_id: str | None = None) -> Iterator[pd.DataFrame]:
+    """CS snapshot chunks, then the window's scored requests from the serving journal.
+
+    A scored request becomes a snapshot of the features the service actually saw,
+    labeled with its user's label from the CS pull; users the pull has no label for
+    are skipped. Requests are the tenant's (`tenant_id`, default TENANT_ID); without a
+    tenant, requests that named none are included too.
+    """
+    labels = {}
+    for chunk in chunks:
+        labels.update(zip(chunk["userId"], chunk["label"]))
+        yield chunk
+    served = load_scored_requests(journal_dir, start_iso, end_iso)
+    if served.empty:
+        return
+    mine = served["tenantId"] == (tenant_id or TENANT_ID)
+    if tenant_id is None:
+        mine |= served["tenantId"].isna()
+    served = served[mine].assign(label=lambda d: d["userId"].map(labels)).dropna(subset=["label"])
+    print(f"📓 Adding {len(served)} scored requests from {journal_dir}")
+    if len(served):
+        served["snapshot_ts"] = served["snapshot_ts"].dt.strftime("%Y-%m-%d")   # same format as the CS pull
+        yield served.drop(columns=["tenantId", "risk", "tier", "modelVersion"]).astype({"label": int})
@@ -0,0 +1,121 @@
+"""
+Permutation importance: how much validation AUC drops when a feature is shuffled.
+
+The ``region__*`` one-hots are permuted together as one ``region`` group so every
+row stays a valid one-hot. For each task, all permuted copies of the evaluation
+matrix are stacked and scored with a single batched predict. If the stack would
+exceed MAX_BATCH_BYTES, it is built and scored in row slices instead. Tasks
+(feature group x slice of repeats) are spread over worker processes that share
+``X`` through memory-mapped arrays and receive the model once, at worker start.
+"""
+
+import os, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from app.model_registry import predict_risk
+from .utils import split_threads, shared_arrays, load_shared
+
+N_REPEATS = int(os.getenv("PERMUTATION_REPEATS", "5"))
+MAX_BATCH_BYTES = 128 * 2**20
+
+def feature_groups(feature_order: list) -> dict:
+    """Group name -> column indices; region one-hots collapse into one group."""
+    groups = {}
+    for i, f in enumerate(feature_order):
+        groups.setdefault("region" if f.startswith("region__") else f, []).append(i)
+    return groups
+
+def average_ranks(scores: np.ndarray) -> np.ndarray:
+    """1-based ranks within each row of `scores`, ties sharing their average rank."""
+    ranks = np.empty(scores.shape, dtype=float)
+    for i, row in enumerate(scores):
+        order = np.argsort(row, kind="stable")
+        s = row[order]
+        starts = np.flatnonzero(np.r_[True, s[1:] != s[:-1]])     # first position of each run of ties
+        ends = np.r_[starts[1:], len(s)]
+        ranks[i, order] = np.repeat((starts + ends + 1) / 2, ends - starts)
+    return ranks
+
+def rank_auc(y: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """Mann-Whitney AUC for each row of `scores` (copies x rows) against labels `y`."""
+    pos = y == 1
+    n1, n0 = pos.sum(), (~pos).sum()
+    if n1 == 0 or n0 == 0:
+        return np.full(scores.shape[0], np.nan)
+    ranks = average_ranks(scores)
+    return (ranks[:, pos].sum(axis=1) - n1 * (n1 + 1) / 2) / (n1 * n0)
+
+def permuted_scores(model, X: np.ndarray, cols: list, perms: np.ndarray, threads: int = 1,
+                    max_batch_bytes: int = MAX_BATCH_BYTES) -> np.ndarray:
+    """Scores for every permuted copy (one row per permutation in `perms`), batched."""
+    k, (n, d) = len(perms), X.shape
+    rows = max(1, min(n, max_batch_bytes // (8 * d * k)))
+    out = np.empty((k, n))
+    for a in range(0, n, rows):
+        b = min(n, a + rows)
+        block = np.repeat(np.asarray(X[a:b])[None], k, axis=0)          # k copies of the row slice
+        block[:, :, cols] = np.asarray(X)[perms[:, a:b]][:, :, cols]     # swap in permuted columns
+        out[:, a:b] = predict_risk(model, block.reshape(k * (b - a), d), num_threads=threads).reshape(k, b - a)
+    return out
+
+def _group_aucs(model, X, y, cols: list, seeds: list, threads: int) -> list:
+    perms = np.stack([np.random.default_rng(s).permutation(len(y)) for s in seeds])
+    return rank_auc(y, permuted_scores(model, X, cols, perms, threads)).tolist()
+
+_MODEL = None
+
+def _init_worker(model):
+    global _MODEL
+    _MODEL = model
+
+def _task(data_dir: str, group: str, cols: list, seeds: list, threads: int):
+    X, y = load_shared(data_dir, "X"), np.asarray(load_shared(data_dir, "y"))
+    return group, _group_aucs(_MODEL, X, y, cols, seeds, threads)
+
+def permutation_importance(model, X: np.ndarray, y: np.ndarray, feature_order: list,
+                           n_repeats: int = N_REPEATS, seed: int = 42, cpu_count: int | None = None) -> dict:
+    """AUC drop per feature group, mean and std over `n_repeats` shuffles."""
+    t0 = time.perf_counter()
+    X, y = np.asarray(X, dtype=np.float64), np.asarray(y)
+    baseline = float(rank_auc(y, predict_risk(model, X)[None])[0])
+    if np.isnan(baseline):
+        return {"metric": "auc_roc", "note": "Only one class present; permutation importance skipped"}
+    groups = feature_groups(feature_order)
+
+    # Spread repeats of every group across workers; seeds make results independent of the split
+    seeds = {g: np.random.SeedSequence([seed, i]).generate_state(n_repeats).tolist()
+             for i, g in enumerate(groups)}
+    workers, threads = split_threads(len(groups) * n_repeats, cpu_count)
+    per_task = min(n_repeats, max(1, -(-n_repeats * len(groups) // workers)))
+    tasks = [(g, groups[g], seeds[g][i:i + per_task]) for g in groups for i in range(0, n_repeats, per_task)]
+
+    drops = {g: [] for g in groups}
+    if workers == 1:
+        for g, cols, s in tasks:
+            drops[g] += _group_aucs(model, X, y, cols, s, threads)
+    else:
+        with shared_arrays(X=X, y=y) as data_dir:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(model,)) as pool:
+                futures = [pool.submit(_task, data_dir, g, cols, s, threads) for g, cols, s in tasks]
+                for fut in futures:
+                    g, aucs = fut.result()
+                    drops[g] += aucs
+
+    features = {}
+    for g, aucs in drops.items():
+        d = baseline - np.asarray(aucs, dtype=float)
+        features[g] = {"auc_drop_mean": float(np.nanmean(d)) if len(d) else None,
+                       "auc_drop_std": float(np.nanstd(d)) if len(d) else None}
+    ranking = sorted(features, key=lambda g: features[g]["auc_drop_mean"] or 0.0, reverse=True)
+    return {
+        "metric": "auc_roc",
+        "baseline_auc": baseline,
+        "n_repeats": n_repeats,
+        "evaluation_samples": int(len(y)),
+        "features": {g: features[g] for g in ranking},
+        "ranking": ranking,
+        "workers": workers,
+        "seconds": round(time.perf_counter() - t0, 3)
+    }
@@ -0,0 +1,94 @@
+"""
+Multi-tenant training orchestrator.
+
+Trains one model per tenant in a process pool under a global CPU and memory budget.
+Tenant config travels explicitly with each job (no environment mutation), and every
+model lands in its tenant's registry namespace (``MODEL_DIR/tenants/<tenant_id>/``).
+Each tenant gets its share of the cores for every parallel step (fit, search, CV,
+bootstrap, compaction). With a memory budget, a tenant whose RSS goes above its
+allowance between training stages fails with MemoryError instead of crowding out the
+others; without one, the allowance only sizes the pool and flags tenants over it.
+"""
+
+import os, json, time, resource
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from .data_sources import CS_FEATURES_URL
+from .utils import split_threads
+from app.config import MODEL_DIR, TENANTS_SUBDIR
+
+MEM_PER_TENANT_MB = float(os.getenv("TRAIN_MEM_PER_TENANT_MB", "1024"))
+
+def plan_workers(n_tenants: int, cpu_budget: int | None = None, mem_budget_mb: float | None = None,
+                 mem_per_tenant_mb: float = MEM_PER_TENANT_MB):
+    """Concurrent tenants and LightGBM threads per tenant that fit both budgets."""
+    cpus = cpu_budget or os.cpu_count() or 1
+    workers, _ = split_threads(n_tenants, cpus)
+    if mem_budget_mb:
+        workers = max(1, min(workers, int(mem_budget_mb // mem_per_tenant_mb)))
+    return workers, max(1, cpus // workers)
+
+def _train_tenant(job: dict) -> dict:
+    """Worker: train one tenant end to end; never raises so one bad tenant can't sink the batch."""
+    from .training import train_model
+    t0 = time.perf_counter()
+    result = {"tenant_id": job["tenant_id"]}
+    try:
+        meta = train_model(job["start_iso"], job["end_iso"], tenant_id=job["tenant_id"],
+                           features_url=job["features_url"], n_jobs=job["n_jobs"], tenant_registry=True,
+                           max_rss_mb=job["max_rss_mb"])
+        result.update(status="ok", version=meta["version"],
+                      training_samples=meta["training_samples"],
+                      validation_samples=meta["validation_samples"], metrics=meta["metrics"])
+    except Exception as e:
+        result.update(status="failed", error=f"{type(e).__name__}: {e}")
+    result["duration_seconds"] = round(time.perf_counter() - t0, 3)
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return result
+
+def train_tenants(tenants: list, start_iso: str, end_iso: str, cpu_budget: int | None = None,
+                  mem_budget_mb: float | None = None, mem_per_tenant_mb: float = MEM_PER_TENANT_MB) -> dict:
+    """Train every tenant concurrently. `tenants` holds tenant ids or dicts with
+    `tenant_id` and optional `features_url`. Returns (and saves) a run summary."""
+    jobs = [t if isinstance(t, dict) else {"tenant_id": t} for t in tenants]
+    workers, threads = plan_workers(len(jobs), cpu_budget, mem_budget_mb, mem_per_tenant_mb)
+    for job in jobs:
+        job.setdefault("features_url", CS_FEATURES_URL)
+        job.update(start_iso=start_iso, end_iso=end_iso, n_jobs=threads,
+                   max_rss_mb=mem_per_tenant_mb if mem_budget_mb else 0)
+    print(f"🏭 Training {len(jobs)} tenants: {workers} concurrent x {threads} threads")
+
+    started_at, start = pd.Timestamp.utcnow(), time.perf_counter()
+    results = []
+    # One fresh process per tenant: memory is returned between tenants and peak RSS is per tenant
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                             max_tasks_per_child=1) as pool:
+        futures = [pool.submit(_train_tenant, job) for job in jobs]
+        for fut in as_completed(futures):
+            r = fut.result()
+            if r["peak_rss_mb"] > mem_per_tenant_mb:
+                r["over_memory_allowance"] = True
+            results.append(r)
+            status = "✅" if r["status"] == "ok" else "❌"
+            print(f"   {status} {r['tenant_id']}: {r['duration_seconds']:.1f}s, "
+                  f"{r.get('training_samples', 0)} samples, AUC {r.get('metrics', {}).get('auc_roc', float('nan')):.3f}")
+
+    results.sort(key=lambda r: r["tenant_id"])
+    summary = {
+        "started_at": started_at.isoformat(),
+        "window": {"start": start_iso, "end": end_iso},
+        "budget": {"cpu": cpu_budget or os.cpu_count(), "mem_mb": mem_budget_mb,
+                   "mem_per_tenant_mb": mem_per_tenant_mb, "workers": workers, "threads_per_tenant": threads},
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        "succeeded": sum(r["status"] == "ok" for r in results),
+        "failed": sum(r["status"] != "ok" for r in results),
+        "tenants": results
+    }
+    out_dir = os.path.join(MODEL_DIR, TENANTS_SUBDIR)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"training_summary_{started_at.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2)
+    summary["summary_path"] = path
+    return summary
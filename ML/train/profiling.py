@@ -0,0 +1,166 @@
+"""
+Per-stage wall time, CPU time and memory of a training run.
+
+``with StageProfiler() as prof:`` makes `prof` the active profiler, and every
+``with stage("fit"):`` inside the block is measured, including stages inside
+helpers such as `data_sources` that don't know about the profiler. Outside an
+active profiler `stage` does nothing. Per stage it records:
+
+- wall and CPU seconds;
+- RSS at the start and end, and the peak RSS sampled by a background thread
+  every ``TRAIN_PROFILE_SAMPLE_MS``, which covers native allocations (LightGBM,
+  Arrow) that tracemalloc cannot see;
+- with ``TRAIN_TRACEMALLOC=1``, the peak of Python/numpy allocations (slower);
+- with ``TRAIN_CPROFILE_DIR`` set, a ``<run>-<stage>.prof`` cProfile dump (slower).
+
+`report` goes into the model's meta.json; `append_run_log` adds it to a JSONL run
+log next to the models, so training cost can be compared across versions.
+"""
+
+import os, json, time, threading, functools
+from contextlib import contextmanager
+from typing import Dict
+
+TRAIN_TRACEMALLOC = os.getenv("TRAIN_TRACEMALLOC", "0") == "1"
+TRAIN_CPROFILE_DIR = os.getenv("TRAIN_CPROFILE_DIR", "")
+SAMPLE_MS = float(os.getenv("TRAIN_PROFILE_SAMPLE_MS", "20"))
+RUN_LOG_NAME = "training_runs.jsonl"
+
+_ACTIVE: "StageProfiler | None" = None
+
+class StageProfiler:
+    def __init__(self, run_id: str | None = None, tracemalloc: bool = TRAIN_TRACEMALLOC,
+                 cprofile_dir: str = TRAIN_CPROFILE_DIR):
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+        self.tracemalloc, self.cprofile_dir = tracemalloc, cprofile_dir
+        self.stages: Dict[str, Dict] = {}
+        self._peak = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(SAMPLE_MS / 1000):
+            rss = self._rss()
+            with self._lock:
+                self._peak = max(self._peak, rss)
+
+    def __enter__(self):
+        global _ACTIVE
+        from .utils import current_rss_mb   # deferred: train.utils imports scikit-learn
+        self._rss = current_rss_mb
+        self.t0, self.cpu0 = time.perf_counter(), time.process_time()
+        self.rss0 = self._peak = current_rss_mb()
+        if self.tracemalloc:
+            import tracemalloc
+            tracemalloc.start()
+        self._sampler = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+        self._sampler.start()
+        _ACTIVE = self
+        return self
+
+    def __exit__(self, *exc):
+        global _ACTIVE
+        _ACTIVE = None
+        self._stop.set()
+        self._sampler.join()
+        self.total_s, self.total_cpu_s = time.perf_counter() - self.t0, time.process_time() - self.cpu0
+        if self.tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+        return False
+
+    @contextmanager
+    def stage(self, name: str):
+        rss0 = self._rss()
+        with self._lock:
+            outer_peak, self._peak = self._peak, rss0   # stage peak starts from its own baseline
+        if self.tracemalloc:
+            import tracemalloc
+            tracemalloc.reset_peak()
+            traced0 = tracemalloc.get_traced_memory()[0]
+        prof = None
+        if self.cprofile_dir:
+            import cProfile
+            prof = cProfile.Profile()
+            prof.enable()
+        t0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+            if prof is not None:
+                prof.disable()
+                os.makedirs(self.cprofile_dir, exist_ok=True)
+                prof.dump_stats(os.path.join(self.cprofile_dir, f"{self.run_id}-{name}.prof"))
+            rss1 = self._rss()
+            with self._lock:
+                peak = max(self._peak, rss1)
+                self._peak = max(outer_peak, peak)
+            rec = {"wall_s": round(wall, 4), "cpu_s": round(cpu, 4), "rss_start_mb": round(rss0, 1),
+                   "rss_end_mb": round(rss1, 1), "peak_rss_mb": round(peak, 1)}
+            if self.tracemalloc:
+                rec["traced_peak_mb"] = round((tracemalloc.get_traced_memory()[1] - traced0) / 2**20, 1)
+            prev = self.stages.get(name)
+            if prev:   # a stage entered more than once accumulates
+                rec.update(wall_s=round(prev["wall_s"] + wall, 4), cpu_s=round(prev["cpu_s"] + cpu, 4),
+                           rss_start_mb=prev["rss_start_mb"], peak_rss_mb=max(prev["peak_rss_mb"], rec["peak_rss_mb"]))
+                if "traced_peak_mb" in prev:
+                    rec["traced_peak_mb"] = max(prev["traced_peak_mb"], rec["traced_peak_mb"])
+            self.stages[name] = rec
+
+    def report(self) -> Dict:
+        running = _ACTIVE is self
+        total = time.perf_counter() - self.t0 if running else self.total_s
+        with self._lock:
+            peak = self._peak
+        return {
+            "run_id": self.run_id,
+            "total_s": round(total, 4),
+            "total_cpu_s": round(time.process_time() - self.cpu0 if running else self.total_cpu_s, 4),
+            "unstaged_s": round(total - sum(s["wall_s"] for s in self.stages.values()), 4),
+            "rss_start_mb": round(self.rss0, 1),
+            "peak_rss_mb": round(max([peak] + [s["peak_rss_mb"] for s in self.stages.values()]), 1),
+            "tracemalloc": self.tracemalloc,
+            "cprofile_dir": self.cprofile_dir or None,
+            "stages": dict(self.stages),
+        }
+
+@contextmanager
+def stage(name: str):
+    """Measure a block under the active StageProfiler; no-op when none is active."""
+    prof = _ACTIVE
+    if prof is None:
+        yield
+    else:
+        with prof.stage(name):
+            yield
+
+def current() -> StageProfiler | None:
+    return _ACTIVE
+
+def profiled(fn):
+    """Run `fn` under a fresh StageProfiler unless one is already active (nested runs share it)."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _ACTIVE is not None:
+            return fn(*args, **kwargs)
+        with StageProfiler():
+            return fn(*args, **kwargs)
+    return wrapper
+
+def append_run_log(model_dir: str, meta: Dict, profile: Dict) -> str:
+    """Append one JSON line per training run to `<model_dir>/training_runs.jsonl`."""
+    path = os.path.join(model_dir, RUN_LOG_NAME)
+    os.makedirs(model_dir, exist_ok=True)
+    record = {
+        "version": meta["version"],
+        "tenant_id": meta.get("tenant_id"),
+        "finished_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "training_samples": meta.get("training_samples"),
+        "validation_samples": meta.get("validation_samples"),
+        "auc_roc": (meta.get("metrics") or {}).get("auc_roc"),
+        **profile,
+    }
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    return path
@@ -0,0 +1,111 @@
+"""
+Stratified reservoir sampling of training snapshots down to a row budget.
+
+Rows are stratified by (label, snapshot week). Each stratum keeps the rows with the
+smallest uniform random keys (bottom-k reservoir sampling), up to a common cap chosen
+by water-filling: strata smaller than the cap are kept whole, larger ones are cut to
+the cap, and the kept rows add up to the budget. Rare labels and quiet weeks
+therefore survive intact while the bulk is thinned out. The cap only shrinks as
+more rows are seen, so rows dropped from a chunk are never needed later. Chunks
+can be streamed through `StratifiedReservoir.add` in one pass, holding at most
+``budget + chunk`` rows.
+
+Every kept row gets ``sample_weight = rows seen in its stratum / rows kept``, so
+weighted fits and metrics estimate the same quantities as on the full data.
+"""
+
+import os
+from typing import Dict, Iterable
+import numpy as np
+import pandas as pd
+from .profiling import stage
+
+TRAIN_MAX_ROWS = int(os.getenv("TRAIN_MAX_ROWS", "0"))   # 0 disables sampling
+SAMPLE_SEED = 42
+
+def stratum_codes(df: pd.DataFrame) -> np.ndarray:
+    """``2 * week + label`` per row; weeks start on Monday, as `prepare`'s ``to_period("W")`` groups."""
+    days = pd.to_datetime(df["snapshot_ts"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+    return ((days + 3) // 7) * 2 + df["label"].to_numpy().astype(np.int64)   # 1970-01-01 was a Thursday
+
+def water_fill(counts: np.ndarray, budget: int) -> int:
+    """Largest per-stratum cap c with sum(min(counts, c)) <= budget."""
+    if counts.sum() <= budget:
+        return int(counts.max()) if len(counts) else 0
+    c = np.sort(counts)
+    # Kept rows if the cap sits at each sorted count: strata below keep all, the rest keep c[i]
+    kept = np.cumsum(c) - c + c * (len(c) - np.arange(len(c)))
+    i = int(np.searchsorted(kept, budget, side="right"))
+    below = c[:i].sum()
+    return int((budget - below) // (len(c) - i))
+
+class StratifiedReservoir:
+    """One-pass stratified sample of DataFrame chunks to at most `budget` rows."""
+
+    def __init__(self, budget: int, seed: int = SAMPLE_SEED):
+        if budget <= 0:
+            raise ValueError("budget must be positive")
+        self.budget, self.seed = budget, seed
+        self.rng = np.random.default_rng(seed)
+        self.counts: Dict[int, int] = {}
+        self.kept: pd.DataFrame | None = None
+        self.kept_cols: Dict[str, np.ndarray] = {}
+        self.cap = 0
+        self.seen = 0
+
+    def add(self, chunk: pd.DataFrame):
+        strata = stratum_codes(chunk)
+        cols = {"stratum": strata, "key": self.rng.random(len(chunk)),
+                "seq": np.arange(self.seen, self.seen + len(chunk))}
+        self.seen += len(chunk)
+        for s, n in zip(*np.unique(strata, return_counts=True)):
+            self.counts[int(s)] = self.counts.get(int(s), 0) + int(n)
+        self.cap = water_fill(np.fromiter(self.counts.values(), dtype=np.int64), self.budget)
+        chunk = chunk.reset_index(drop=True)
+        if self.kept is not None:
+            chunk = pd.concat([self.kept, chunk], ignore_index=True)
+            cols = {k: np.concatenate([self.kept_cols[k], v]) for k, v in cols.items()}
+        # Bottom-k keys per stratum: sort by (stratum, key), keep each stratum's first `cap` rows
+        order = np.lexsort((cols["key"], cols["stratum"]))
+        s = cols["stratum"][order]
+        starts = np.flatnonzero(np.r_[True, s[1:] != s[:-1]])
+        rank = np.arange(len(s)) - np.repeat(starts, np.diff(np.r_[starts, len(s)]))
+        keep = np.sort(order[rank < self.cap])
+        self.kept = chunk.iloc[keep].reset_index(drop=True)
+        self.kept_cols = {k: v[keep] for k, v in cols.items()}
+
+    def result(self) -> pd.DataFrame:
+        """Kept rows in their original relative order, with a `sample_weight` column."""
+        if self.kept is None:
+            return pd.DataFrame()
+        order = np.argsort(self.kept_cols["seq"], kind="stable")
+        strata = self.kept_cols["stratum"][order]
+        codes, inverse, kept = np.unique(strata, return_inverse=True, return_counts=True)
+        seen = np.array([self.counts[int(c)] for c in codes], dtype=float)
+        return self.kept.iloc[order].reset_index(drop=True).assign(sample_weight=(seen / kept)[inverse])
+
+    def info(self) -> Dict:
+        kept = 0 if self.kept is None else len(self.kept)
+        return {"budget": self.budget, "rows_seen": self.seen, "rows_kept": kept,
+                "ratio": round(kept / self.seen, 6) if self.seen else None, "strata": len(self.counts),
+                "stratum_cap": self.cap, "seed": self.seed}
+
+def sample_stream(chunks: Iterable[pd.DataFrame], budget: int, seed: int = SAMPLE_SEED):
+    """`sample_snapshots` over a stream of chunks, holding at most ``budget + chunk`` rows."""
+    reservoir = StratifiedReservoir(budget, seed)
+    for chunk in chunks:
+        if len(chunk):
+            with stage("sample"):
+                reservoir.add(chunk)
+    df = reservoir.result()
+    if reservoir.seen <= budget:
+        return df.drop(columns="sample_weight", errors="ignore"), None
+    return df, reservoir.info()
+
+def sample_snapshots(df: pd.DataFrame, budget: int, seed: int = SAMPLE_SEED):
+    """(sampled frame with sample_weight, sampling info); frames within budget pass through unweighted."""
+    if len(df) <= budget:
+        return df, None
+    reservoir = StratifiedReservoir(budget, seed)
+    reservoir.add(df)
+    return reservoir.result(), reservoir.info()
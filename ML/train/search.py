@@ -0,0 +1,124 @@
+"""
+Budgeted hyperparameter search (successive halving) for the churn model.
+
+Candidates are sampled from SEARCH_SPACE and trained in parallel worker processes
+on a fit/selection split, with early stopping on the selection fold. `train_model`
+carves that split out of the training weeks, so the winner is never chosen on the
+rows its reported metrics come from. Sampling weights (train.sampling), when given,
+weight the fits, the early-stopping metric and the ranking AUC, so the search
+optimizes for the unsampled data. Each rung multiplies the tree budget by ``eta``
+and keeps the best ``1/eta`` of candidates. Candidates are ranked by validation AUC
+minus a penalty on measured single-row inference latency, since serving cost grows
+with tree count and depth.
+"""
+
+import os, time, math, random
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import lightgbm as lgb
+from lightgbm import LGBMClassifier
+from .training import LGBM_PARAMS
+from .utils import evaluate, split_threads, shared_arrays, load_shared
+
+SEARCH_SPACE = {
+    "learning_rate": [0.03, 0.05, 0.1],
+    "num_leaves": [15, 31, 63],
+    "max_depth": [-1, 6, 8],
+    "min_child_samples": [20, 50, 100],
+    "colsample_bytree": [0.6, 0.8, 1.0],
+    "reg_lambda": [0.0, 0.2, 1.0],
+}
+LATENCY_WEIGHT = float(os.getenv("SEARCH_LATENCY_WEIGHT", "0.05"))  # AUC points per ms of single-row latency
+EARLY_STOPPING_ROUNDS = 30
+
+def sample_candidates(n: int, seed: int = 42) -> list:
+    """Draw `n` distinct configs; the first one is always the current LGBM_PARAMS baseline."""
+    rng = random.Random(seed)
+    baseline = {k: LGBM_PARAMS[k] for k in SEARCH_SPACE if k in LGBM_PARAMS}
+    seen, out = set(), [baseline]
+    seen.add(tuple(sorted(baseline.items())))
+    space = math.prod(len(v) for v in SEARCH_SPACE.values())
+    while len(out) < min(n, space):
+        cand = {k: rng.choice(v) for k, v in SEARCH_SPACE.items()}
+        key = tuple(sorted(cand.items()))
+        if key not in seen:
+            seen.add(key)
+            out.append(cand)
+    return out
+
+def measure_latency_ms(booster, rows: np.ndarray, num_iteration: int | None = None, repeats: int = 200) -> float:
+    """Median wall time of a single-row, single-thread predict, as `/score` does it."""
+    times = []
+    for i in range(repeats):
+        x = rows[i % len(rows)].reshape(1, -1)
+        t0 = time.perf_counter()
+        booster.predict(x, num_iteration=num_iteration, num_threads=1)
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times) * 1000)
+
+def _evaluate_candidate(data_dir: str, cand_id: int, params: dict, rounds: int, n_jobs: int) -> dict:
+    """Worker: fit with early stopping on the validation fold, then time inference."""
+    Xtr, ytr = load_shared(data_dir, "Xtr"), load_shared(data_dir, "ytr")
+    Xva, yva = load_shared(data_dir, "Xva"), load_shared(data_dir, "yva")
+    wtr, wva = load_shared(data_dir, "wtr", optional=True), load_shared(data_dir, "wva", optional=True)
+    t0 = time.perf_counter()
+    clf = LGBMClassifier(**{**LGBM_PARAMS, **params, "n_estimators": rounds, "n_jobs": n_jobs, "verbose": -1})
+    clf.fit(Xtr, ytr, sample_weight=wtr, eval_set=[(Xva, yva)], eval_metric="auc",
+            eval_sample_weight=None if wva is None else [wva],
+            callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+    fit_seconds = time.perf_counter() - t0
+    best_iter = clf.best_iteration_ or rounds
+    p = clf.predict_proba(Xva, num_iteration=best_iter)[:, 1]
+    metrics = evaluate(np.asarray(yva), p, sample_weight=wva)
+    latency = measure_latency_ms(clf.booster_, np.asarray(Xva[:200]), best_iter)
+    return {
+        "candidate": cand_id,
+        "params": params,
+        "rounds_budget": rounds,
+        "best_iteration": int(best_iter),
+        "metrics": metrics,
+        "latency_ms": round(latency, 4),
+        "objective": metrics["auc_roc"] - LATENCY_WEIGHT * latency,
+        "fit_seconds": round(fit_seconds, 3)
+    }
+
+def successive_halving(Xtr, ytr, Xva, yva, n_candidates: int = 16, eta: int = 3,
+                       max_rounds: int = LGBM_PARAMS["n_estimators"], cpu_count: int | None = None,
+                       wtr=None, wva=None) -> dict:
+    """Run the search and return {"winner": ..., "trace": [...], ...} for the model meta."""
+    start = time.perf_counter()
+    candidates = dict(enumerate(sample_candidates(n_candidates)))
+    n_rungs = max(1, int(math.log(len(candidates), eta)) + 1) if len(candidates) > 1 else 1
+    trace = []
+    with shared_arrays(Xtr=np.asarray(Xtr, dtype=np.float64), ytr=np.asarray(ytr),
+                       Xva=np.asarray(Xva, dtype=np.float64), yva=np.asarray(yva),
+                       wtr=wtr, wva=wva) as data_dir:
+        for rung in range(n_rungs):
+            rounds = max(EARLY_STOPPING_ROUNDS, int(max_rounds / eta ** (n_rungs - 1 - rung)))
+            ids = list(candidates)
+            workers, threads = split_threads(len(ids), cpu_count)
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+                results = list(pool.map(_evaluate_candidate, [data_dir] * len(ids), ids,
+                                        [candidates[i] for i in ids], [rounds] * len(ids), [threads] * len(ids)))
+            for r in results:
+                r["rung"] = rung
+            trace.extend(results)
+            results.sort(key=lambda r: r["objective"], reverse=True)
+            keep = max(1, math.ceil(len(results) / eta)) if rung < n_rungs - 1 else 1
+            candidates = {r["candidate"]: r["params"] for r in results[:keep]}
+            print(f"   rung {rung}: {len(results)} candidates x {rounds} trees -> kept {keep} "
+                  f"(best objective {results[0]['objective']:.4f})")
+
+    best = results[0]
+    winner = {**LGBM_PARAMS, **best["params"], "n_estimators": best["best_iteration"]}
+    return {
+        "scheme": "successive_halving",
+        "eta": eta,
+        "n_candidates": n_candidates,
+        "latency_weight_per_ms": LATENCY_WEIGHT,
+        "winner": {"params": winner, "metrics": best["metrics"], "latency_ms": best["latency_ms"],
+                   "objective": best["objective"]},
+        "trace": trace,
+        "wall_seconds": round(time.perf_counter() - start, 3)
+    }
@@ -0,0 +1,139 @@
+"""
+Point-in-time training snapshots built from a raw event log.
+
+Given events (``userId``, ``name``, ``ts``) and customers (``userId``, ``plan``,
+``region``, optional ``createdAt``), every customer gets a feature row at every
+snapshot date ``T`` using only events with ``ts <= T``: the 7d/30d windows are
+``(T - w, T]``, as the backend FeatureService defines them for "now".
+
+Events are sorted once into one int64 key per event (user code, then seconds), for
+each counter (all events, ``ticket_opened``, failed renewals). A window count for
+all users at one ``T`` is then two ``searchsorted`` calls over the sorted keys, so
+the cost is O(events log events) once plus O(users log events) per snapshot date.
+Snapshots are produced one date at a time, which bounds memory by the event arrays
+plus one date's rows.
+"""
+
+import json
+import numpy as np
+import pandas as pd
+
+DAY_S = 86400
+TICKET_EVENTS = ["ticket_opened"]
+FAILED_RENEWAL_EVENTS = ["plan_renewal_failed", "pre_renewal_card_decline"]
+PLAN_VALUES = {"Basic": 9, "Pro": 29, "Enterprise": 99}   # as in the backend FeatureService
+MAX_EXPECTED_ACTIVITY = 10
+NO_ACTIVITY_DAYS = 30      # time_since_last_use_days for users without any event yet
+LABEL_HORIZON_DAYS = 30
+
+def load_event_log(path: str) -> pd.DataFrame:
+    """Events from Parquet, CSV or JSONL (one backend/mock event per line)."""
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path, columns=["userId", "name", "ts"])
+    elif path.endswith(".csv"):
+        df = pd.read_csv(path, usecols=["userId", "name", "ts"])
+    else:
+        df = pd.read_json(path, lines=True)[["userId", "name", "ts"]]
+    return df
+
+def load_customers(path: str) -> pd.DataFrame:
+    """Customers from a ``{"users": [...]}`` JSON file (mock/users.json) or a CSV/Parquet table."""
+    if path.endswith(".json"):
+        with open(path) as f:
+            df = pd.DataFrame(json.load(f)["users"]).rename(columns={"id": "userId"})
+    else:
+        df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    return df
+
+def _seconds(ts) -> np.ndarray:
+    # Unit-agnostic: timestamps may be datetime64[s], [ms], [us] or [ns] depending on the source
+    return np.asarray((pd.to_datetime(ts, utc=True) - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1), dtype=np.int64)
+
+class EventIndex:
+    """Sorted (user, time) keys per counter, for window counts at arbitrary times."""
+
+    def __init__(self, events: pd.DataFrame, user_codes: pd.Index):
+        codes = user_codes.get_indexer(events["userId"].astype(str))
+        keep = codes >= 0                      # events of unknown customers are ignored
+        secs = _seconds(events["ts"])[keep]
+        codes, names = codes[keep].astype(np.int64), events["name"].to_numpy()[keep]
+        self.t0 = int(secs.min()) - 1 if len(secs) else 0
+        self.span = int(secs.max()) - self.t0 + 400 * DAY_S if len(secs) else 1   # room for window look-backs/aheads
+        keys = codes * self.span + (secs - self.t0)
+        self.keys = {
+            "activity": np.sort(keys),
+            "tickets": np.sort(keys[np.isin(names, TICKET_EVENTS)]),
+            "failed_renewals": np.sort(keys[np.isin(names, FAILED_RENEWAL_EVENTS)]),
+        }
+        self.n_events = int(keep.sum())
+        self.dropped = int((~keep).sum())
+
+    def _key(self, users: np.ndarray, t: int) -> np.ndarray:
+        return users * self.span + min(max(t - self.t0, 0), self.span - 1)
+
+    def count(self, counter: str, users: np.ndarray, end: int, days: int) -> np.ndarray:
+        """Events per user with ``end - days < ts <= end``."""
+        keys = self.keys[counter]
+        hi = np.searchsorted(keys, self._key(users, end), side="right")
+        lo = np.searchsorted(keys, self._key(users, end - days * DAY_S), side="right")
+        return hi - lo
+
+    def last_before(self, users: np.ndarray, end: int) -> np.ndarray:
+        """Time of each user's last event with ``ts <= end`` (NaN if none)."""
+        keys = self.keys["activity"]
+        i = np.searchsorted(keys, self._key(users, end), side="right") - 1
+        prev = keys[np.maximum(i, 0)] if len(keys) else np.zeros(len(users), dtype=np.int64)
+        own = (i >= 0) & (prev // self.span == users)
+        return np.where(own, (prev % self.span) + self.t0, np.nan)
+
+def backend_labels(f: dict) -> np.ndarray:
+    """Vectorized FeatureService.getLabel (the rule the CS API labels snapshots with)."""
+    score = (0.5 + np.minimum(f["activity_30d"] / 5, 0.2) + np.minimum(f["activity_7d"] / 5, 0.15)
+             + f["usage_score"] * 0.15 - np.minimum(f["failed_renewals_30d"] / 2, 0.15)
+             - np.minimum(f["tickets_7d"] / 5, 0.1) - np.minimum(f["tickets_30d"] / 5, 0.1))
+    return (np.clip(score, 0, 1) > 0.55).astype(int)
+
+def iter_snapshots(events: pd.DataFrame, customers: pd.DataFrame, snapshot_dates, label: str = "backend"):
+    """Yield one snapshot frame per date, in the layout `load_snapshots_from_cs` returns.
+
+    `label` is ``backend`` (the CS API's feature rule) or ``inactive_next_30d`` (no event in
+    ``(T, T + 30d]``; needs events after the last snapshot date to be meaningful).
+    """
+    customers = customers.drop_duplicates("userId", keep="last").reset_index(drop=True)
+    user_ids = pd.Index(customers["userId"].astype(str))
+    index = EventIndex(events, user_ids)
+    users = np.arange(len(user_ids), dtype=np.int64)
+    plan_value = customers["plan"].map(PLAN_VALUES).fillna(0).to_numpy(dtype=float) if "plan" in customers else np.zeros(len(users))
+    region = customers["region"].fillna("US").to_numpy() if "region" in customers else np.full(len(users), "US")
+    created = _seconds(customers["createdAt"]) if "createdAt" in customers else np.full(len(users), np.iinfo(np.int64).min)
+
+    for date in pd.to_datetime(list(snapshot_dates), utc=True):
+        t = int(date.timestamp())
+        live = users[created <= t]             # customers that existed at T
+        f = {
+            "activity_7d": index.count("activity", live, t, 7),
+            "activity_30d": index.count("activity", live, t, 30),
+            "failed_renewals_30d": index.count("failed_renewals", live, t, 30),
+            "tickets_7d": index.count("tickets", live, t, 7),
+            "tickets_30d": index.count("tickets", live, t, 30),
+        }
+        last = index.last_before(live, t)
+        f["time_since_last_use_days"] = np.where(np.isnan(last), NO_ACTIVITY_DAYS, (t - last) // DAY_S).astype(int)
+        f["plan_value"] = plan_value[live]
+        f["usage_score"] = np.minimum(f["activity_30d"] / MAX_EXPECTED_ACTIVITY, 1.0)
+        if label == "inactive_next_30d":
+            y = (index.count("activity", live, t + LABEL_HORIZON_DAYS * DAY_S, LABEL_HORIZON_DAYS) == 0).astype(int)
+        else:
+            y = backend_labels(f)
+        yield pd.DataFrame({
+            "userId": user_ids.to_numpy()[live],
+            "snapshot_ts": date.tz_localize(None).strftime("%Y-%m-%d"),
+            "label": y,
+            **{f"features__{k}": v for k, v in f.items()},
+            "features__region": region[live],
+        })
+
+def build_snapshots(events: pd.DataFrame, customers: pd.DataFrame, snapshot_dates, label: str = "backend") -> pd.DataFrame:
+    """All snapshot dates in one frame (use `iter_snapshots` to stream them instead)."""
+    parts = list(iter_snapshots(events, customers, snapshot_dates, label))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
@@ -0,0 +1,142 @@
+"""
+Synthetic customers, events and labeled snapshots at any scale, for offline benchmarks.
+
+`learn_profile` reads the mock users (mock/users.json): segment shares, plan and
+region mix per segment, and the spread of signup dates. Behaviour per segment
+(activity and ticket rates, renewal-issue odds, churn) is set by the constants
+below. The renewal-issue odds are the ones the Node mock generator uses.
+
+Users are generated in fixed-size chunks, each from its own seeded stream
+``(seed, chunk index)``. The output therefore depends only on the seed and the chunk
+size, and any chunk can be reproduced on its own. Each chunk's raw events go through
+`train.snapshots.iter_snapshots`, so snapshot features and labels follow exactly
+from the events, as they would from the CS API. Memory is bounded by one chunk.
+"""
+
+import json
+from typing import Dict, Iterator
+import numpy as np
+import pandas as pd
+from .snapshots import iter_snapshots, _seconds, DAY_S, FAILED_RENEWAL_EVENTS, LABEL_HORIZON_DAYS
+
+SEGMENTS = ["power", "casual", "at_risk"]
+ACTIVITY_PER_DAY = {"power": 1.0, "casual": 0.3, "at_risk": 0.1}   # segment mean of the per-user rate
+ACTIVITY_SHAPE = 2.0                                                # gamma shape of per-user rates
+TICKETS_PER_DAY = {"power": 0.02, "casual": 0.03, "at_risk": 0.08}
+RENEWAL_ISSUE = {"power": 0.1, "casual": 0.25, "at_risk": 0.55}     # as in mock/src/index.ts
+CHURN_PROB = {"power": 0.05, "casual": 0.2, "at_risk": 0.6}         # goes silent at a random time
+RENEWAL_DAYS = 30
+HISTORY_DAYS = 30                        # events before the first snapshot, to fill its windows
+PRODUCT_EVENTS = ["session_start", "feature_used", "session_end"]
+TICKET_EVENTS = ["ticket_opened", "ticket_replied"]
+RENEWAL_OK_EVENTS = ["plan_renewed", "invoice_paid"]
+CHUNK_USERS = 50_000
+
+def learn_profile(users: pd.DataFrame) -> Dict:
+    """Segment shares, plan / region mix per segment and signup spread of the mock users."""
+    created = pd.to_datetime(users["createdAt"], utc=True)
+    mix = lambda col: {seg: g[col].value_counts(normalize=True).round(6).to_dict()
+                       for seg, g in users.groupby("segment")}
+    return {
+        "source_users": len(users),
+        "segments": users["segment"].value_counts(normalize=True).round(6).to_dict(),
+        "plan": mix("plan"),
+        "region": mix("region"),
+        "signup_span_days": round((created.max() - created.min()).total_seconds() / DAY_S, 3),
+    }
+
+def load_profile(path: str) -> Dict:
+    """Profile from a users.json-style file, or a saved profile JSON."""
+    with open(path) as f:
+        data = json.load(f)
+    return learn_profile(pd.DataFrame(data["users"])) if "users" in data else data
+
+def _choice(rng, probs: Dict[str, float], n: int) -> np.ndarray:
+    keys = list(probs)
+    p = np.array([probs[k] for k in keys], dtype=float)
+    return np.array(keys, dtype=object)[rng.choice(len(keys), size=n, p=p / p.sum())]
+
+def generate_users(profile: Dict, first: int, n: int, start_s: int, end_s: int, rng) -> pd.DataFrame:
+    """Users ``first .. first + n - 1``: signups spread over the profile's span before `start_s` up to `end_s`."""
+    segment = _choice(rng, profile["segments"], n)
+    plan, region = np.empty(n, dtype=object), np.empty(n, dtype=object)
+    for seg in np.unique(segment):
+        m = segment == seg
+        plan[m] = _choice(rng, profile["plan"][seg], int(m.sum()))
+        region[m] = _choice(rng, profile["region"][seg], int(m.sum()))
+    lo = start_s - int(profile["signup_span_days"] * DAY_S)
+    created = rng.integers(lo, end_s, size=n)
+    ids = np.char.add("U", np.char.zfill(np.arange(first, first + n).astype(str), 10)).astype(object)
+    return pd.DataFrame({
+        "userId": ids,
+        "email": np.char.add(np.char.add("user_", np.char.lower(ids.astype(str))), "@example.com").astype(object),
+        "region": region, "plan": plan,
+        "createdAt": pd.to_datetime(created, unit="s", utc=True),
+        "segment": segment,
+    })
+
+def generate_events(users: pd.DataFrame, start_s: int, end_s: int, rng) -> pd.DataFrame:
+    """Product, ticket and renewal events for `users` in ``[start_s - HISTORY_DAYS, end_s)``."""
+    n = len(users)
+    seg = users["segment"].to_numpy()
+    per_seg = lambda table: np.array([table[s] for s in SEGMENTS])[pd.Index(SEGMENTS).get_indexer(seg)]
+    created = _seconds(users["createdAt"])
+    begin = np.maximum(created, start_s - HISTORY_DAYS * DAY_S)
+    churned = rng.random(n) < per_seg(CHURN_PROB)
+    stop = np.where(churned, rng.integers(begin, end_s + 1), end_s).clip(begin, end_s)
+    days = (stop - begin) / DAY_S
+
+    def spread(counts, lo, hi):
+        user = np.repeat(np.arange(n), counts)
+        return user, lo[user] + (rng.random(len(user)) * (hi - lo)[user]).astype(np.int64)
+
+    # Product usage and tickets while active; per-user rates vary around the segment mean
+    rate = rng.gamma(ACTIVITY_SHAPE, per_seg(ACTIVITY_PER_DAY) / ACTIVITY_SHAPE)
+    u_a, t_a = spread(rng.poisson(rate * days), begin, stop)
+    u_t, t_t = spread(rng.poisson(per_seg(TICKETS_PER_DAY) * days), begin, stop)
+    # Renewals every RENEWAL_DAYS from signup; after churn the next one fails and the plan lapses
+    period = RENEWAL_DAYS * DAY_S
+    first = created + np.maximum(np.ceil((begin - created) / period), 1).astype(np.int64) * period
+    last = np.where(churned, np.minimum(stop + period, end_s), end_s)
+    n_ren = np.maximum((last - first) // period + 1, 0)
+    u_r = np.repeat(np.arange(n), n_ren)
+    k = np.arange(len(u_r)) - np.repeat(np.cumsum(n_ren) - n_ren, n_ren)
+    t_r = first[u_r] + k * period
+    issue = (rng.random(len(u_r)) < per_seg(RENEWAL_ISSUE)[u_r]) | (t_r > stop[u_r])
+
+    names = np.concatenate([
+        np.array(PRODUCT_EVENTS, dtype=object)[rng.integers(0, len(PRODUCT_EVENTS), len(u_a))],
+        np.array(TICKET_EVENTS, dtype=object)[rng.integers(0, len(TICKET_EVENTS), len(u_t))],
+        np.where(issue, np.array(FAILED_RENEWAL_EVENTS, dtype=object)[rng.integers(0, len(FAILED_RENEWAL_EVENTS), len(u_r))],
+                 np.array(RENEWAL_OK_EVENTS, dtype=object)[rng.integers(0, len(RENEWAL_OK_EVENTS), len(u_r))]),
+    ])
+    user = np.concatenate([u_a, u_t, u_r])
+    ts = np.concatenate([t_a, t_t, t_r])
+    order = np.argsort(ts, kind="stable")
+    return pd.DataFrame({
+        "userId": users["userId"].to_numpy()[user[order]],
+        "name": names[order],
+        "ts": pd.to_datetime(ts[order], unit="s", utc=True),
+    })
+
+def users_for_rows(profile: Dict, rows: int, snapshot_dates) -> int:
+    """Users giving about `rows` snapshot rows, given that signups spread up to the last date."""
+    dates = pd.to_datetime(list(snapshot_dates), utc=True)
+    t = np.array([d.timestamp() for d in dates])
+    lo = t.min() - profile["signup_span_days"] * DAY_S
+    live = (t - lo) / (t.max() - lo)          # share of users signed up by each date
+    return int(np.ceil(rows / live.sum()))
+
+def iter_chunks(profile: Dict, n_users: int, snapshot_dates, seed: int = 42, label: str = "backend",
+                chunk_users: int = CHUNK_USERS) -> Iterator[tuple]:
+    """Yield (users, events, snapshots) per chunk of `chunk_users` users."""
+    dates = pd.to_datetime(list(snapshot_dates), utc=True)
+    start_s, end_s = int(dates.min().timestamp()), int(dates.max().timestamp())
+    # The inactive_next_30d label looks at the 30 days after each snapshot
+    events_end = end_s + (LABEL_HORIZON_DAYS * DAY_S if label == "inactive_next_30d" else 0)
+    for i, first in enumerate(range(0, n_users, chunk_users)):
+        rng = np.random.default_rng([seed, i])
+        users = generate_users(profile, first, min(chunk_users, n_users - first), start_s, end_s, rng)
+        events = generate_events(users, start_s, events_end, rng)
+        snaps = list(iter_snapshots(events, users, dates, label=label))
+        yield users, events, pd.concat(snaps, ignore_index=True) if snaps else pd.DataFrame()
@@ -9,7 +9,8 @@ Provides comprehensive testing for trained churn prediction models including:
 - Integration testing with live data
 """
 
-import os, json
+import os, json, time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
 from typing import Dict, Tuple, List
@@ -17,19 +18,20 @@ from sklearn.metrics import (
     roc_auc_score, average_precision_score, accuracy_score, precision_score, 
     recall_score, f1_score, confusion_matrix, classification_report
 )
-import matplotlib.pyplot as plt
-import seaborn as sns
 from .data_sources import load_snapshots_from_cs
 from .training import prepare, time_split
-from app.model_registry import load_model
-from app.reasons import rule_based_reasons
+from .bootstrap import bootstrap_metrics
+from .importance import permutation_importance
+from .utils import split_threads
+from app.model_registry import load_model, predict_risk, calibrate
+from app.reasons import rule_based_reasons, reason_masks
 
-def test_model_performance(model, meta: Dict, test_data: pd.DataFrame) -> Dict:
+def test_model_performance(model, meta: Dict, test_data: pd.DataFrame, n_jobs: int = None) -> Dict:
     """Test model performance on held-out data."""
     X, y, _, feature_order = prepare(test_data)
     
-    # Get predictions
-    y_proba = model.predict_proba(X)[:, 1]
+    # Get predictions (calibrated, as served)
+    y_proba = calibrate(predict_risk(model, X), meta.get('calibration'))
     y_pred = (y_proba >= 0.5).astype(int)
     
     # Calculate comprehensive metrics
@@ -40,7 +42,8 @@ def test_model_performance(model, meta: Dict, test_data: pd.DataFrame) -> Dict:
         'precision': float(precision_score(y, y_pred, zero_division=0)),
         'recall': float(recall_score(y, y_pred, zero_division=0)),
         'f1_score': float(f1_score(y, y_pred, zero_division=0)),
-        'confusion_matrix': confusion_matrix(y, y_pred).tolist()
+        'confusion_matrix': confusion_matrix(y, y_pred).tolist(),
+        'confidence_intervals': bootstrap_metrics(y, y_proba, cpu_count=n_jobs)
     }
     
     # Test thresholds from metadata
@@ -75,66 +78,65 @@ def test_feature_importance(model, feature_order: List[str]) -> Dict:
     else:
         return {'feature_importance': {}, 'note': 'Model does not support feature importance'}
 
+def test_permutation_importance(model, test_data: pd.DataFrame, n_jobs: int = None) -> Dict:
+    """AUC drop per feature (region one-hots grouped) when its values are shuffled."""
+    X, y, _, feature_order = prepare(test_data)
+    return permutation_importance(model, X, y, feature_order, cpu_count=n_jobs)
+
+# Expected condition per reason, independent of app.reasons (column, default, check)
+RULE_EXPECTATIONS = {
+    'inactive_14d': ('time_since_last_use_days', 0, lambda v: v >= 14, 'time_since_last_use_days >= 14'),
+    'payment_issue_recent': ('failed_renewals_30d', 0, lambda v: v >= 1, 'failed_renewals_30d >= 1'),
+    'no_recent_activity': ('activity_7d', 0, lambda v: v == 0, 'activity_7d == 0'),
+}
+
+def _feature_columns(test_data: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Numeric `features__*` columns as float arrays keyed by feature name."""
+    return {
+        col.replace('features__', ''): pd.to_numeric(test_data[col], errors='coerce').to_numpy(dtype=float)
+        for col in test_data.columns if col.startswith('features__') and col != 'features__region'
+    }
+
 def test_business_rules(test_data: pd.DataFrame) -> Dict:
-    """Test business rules and reason generation."""
-    results = {'rules_tested': 0, 'rules_passed': 0, 'failed_cases': []}
-    
-    for _, row in test_data.iterrows():
-        # Extract features
-        features = {}
-        for col in test_data.columns:
-            if col.startswith('features__'):
-                feature_name = col.replace('features__', '')
-                features[feature_name] = row[col]
-        
-        # Test rule logic
-        reasons = rule_based_reasons(features)
-        results['rules_tested'] += 1
-        
-        # Check if reasons make sense
-        valid_reasons = True
-        
-        # Test inactive_14d rule
-        if 'inactive_14d' in reasons:
-            if features.get('time_since_last_use_days', 0) < 14:
-                valid_reasons = False
-                results['failed_cases'].append({
-                    'userId': row.get('userId', 'unknown'),
-                    'rule': 'inactive_14d',
-                    'expected': 'time_since_last_use_days >= 14',
-                    'actual': features.get('time_since_last_use_days', 0)
-                })
-        
-        # Test payment_issue_recent rule
-        if 'payment_issue_recent' in reasons:
-            if features.get('failed_renewals_30d', 0) < 1:
-                valid_reasons = False
-                results['failed_cases'].append({
-                    'userId': row.get('userId', 'unknown'),
-                    'rule': 'payment_issue_recent',
-                    'expected': 'failed_renewals_30d >= 1',
-                    'actual': features.get('failed_renewals_30d', 0)
-                })
-        
-        # Test no_recent_activity rule
-        if 'no_recent_activity' in reasons:
-            if features.get('activity_7d', 0) != 0:
-                valid_reasons = False
-                results['failed_cases'].append({
-                    'userId': row.get('userId', 'unknown'),
-                    'rule': 'no_recent_activity',
-                    'expected': 'activity_7d == 0',
-                    'actual': features.get('activity_7d', 0)
-                })
-        
-        if valid_reasons:
-            results['rules_passed'] += 1
-    
+    """Test business rules and reason generation (columnar: one mask per rule)."""
+    n = len(test_data)
+    cols = _feature_columns(test_data)
+    emitted = reason_masks(cols, n)
+    user_ids = test_data['userId'].to_numpy() if 'userId' in test_data.columns else np.full(n, 'unknown')
+
+    invalid = np.zeros(n, dtype=bool)
+    failed = []
+    for order, (rule, (feature, default, check, expected)) in enumerate(RULE_EXPECTATIONS.items()):
+        values = cols.get(feature, np.full(n, default, dtype=float))
+        bad = emitted[rule] & ~check(values)
+        invalid |= bad
+        for i in np.flatnonzero(bad):
+            failed.append((i, order, {'userId': user_ids[i], 'rule': rule,
+                                      'expected': expected, 'actual': float(values[i])}))
+    failed.sort(key=lambda c: (c[0], c[1]))  # row order, then rule order, as the per-row loop reported them
+
+    # Spot-check the columnar reasons against the per-request implementation
+    sample = test_data.head(256)
+    sample_cols = {k: v[:len(sample)] for k, v in cols.items()}
+    sample_masks = reason_masks(sample_cols, len(sample))
+    parity = all(
+        set(rule_based_reasons({k: v[i] for k, v in sample_cols.items()})) ==
+        {r for r, m in sample_masks.items() if m[i]}
+        for i in range(len(sample))
+    )
+
+    results = {
+        'rules_tested': n,
+        'rules_passed': int(n - invalid.sum()),
+        'failed_cases': [c for _, _, c in failed],
+        'reason_counts': {r: int(m.sum()) for r, m in emitted.items()},
+        'vectorized_parity': parity
+    }
     results['rules_pass_rate'] = results['rules_passed'] / results['rules_tested'] if results['rules_tested'] > 0 else 0
     return results
 
 def test_data_quality(test_data: pd.DataFrame) -> Dict:
-    """Test data quality and consistency."""
+    """Test data quality and consistency (single aggregated pass over numeric features)."""
     quality_report = {
         'total_samples': len(test_data),
         'missing_data': {},
@@ -144,23 +146,18 @@ def test_data_quality(test_data: pd.DataFrame) -> Dict:
     }
     
     # Check missing data
-    for col in test_data.columns:
-        missing_count = test_data[col].isna().sum()
-        if missing_count > 0:
-            quality_report['missing_data'][col] = int(missing_count)
+    missing = test_data.isna().sum()
+    quality_report['missing_data'] = {col: int(c) for col, c in missing.items() if c > 0}
     
-    # Check data types
-    for col in test_data.columns:
-        if col.startswith('features__'):
-            feature_name = col.replace('features__', '')
-            if feature_name != 'region':  # region is categorical
-                values = pd.to_numeric(test_data[col], errors='coerce')
-                quality_report['data_types'][feature_name] = {
-                    'mean': float(values.mean()) if not values.isna().all() else None,
-                    'std': float(values.std()) if not values.isna().all() else None,
-                    'min': float(values.min()) if not values.isna().all() else None,
-                    'max': float(values.max()) if not values.isna().all() else None
-                }
+    # Mean/std/min/max for every numeric feature at once
+    numeric = pd.DataFrame(_feature_columns(test_data))
+    if not numeric.empty:
+        stats = numeric.agg(['mean', 'std', 'min', 'max'])
+        for feature_name in stats.columns:
+            col = stats[feature_name]
+            quality_report['data_types'][feature_name] = {
+                k: (float(col[k]) if pd.notna(col[k]) else None) for k in ('mean', 'std', 'min', 'max')
+            }
     
     # Check label distribution
     if 'label' in test_data.columns:
@@ -173,20 +170,28 @@ def test_data_quality(test_data: pd.DataFrame) -> Dict:
     
     return quality_report
 
-def run_comprehensive_test(start_iso: str, end_iso: str, model_path: str = None) -> Dict:
-    """Run comprehensive model testing suite."""
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, round(time.perf_counter() - t0, 4)
+
+def run_comprehensive_test(start_iso: str, end_iso: str, model_path: str = None, n_jobs: int = None) -> Dict:
+    """Run comprehensive model testing suite (`n_jobs` caps the cores of the whole suite)."""
     print("=" * 50)
     print("ML Model Testing Suite")
     print("=" * 50)
     
+    suite_start = time.perf_counter()
+    timings = {}
+
     # Load model
     print("Loading model...")
-    model, meta = load_model(model_path)
+    (model, meta), timings['load_model'] = _timed(load_model, model_path)
     print(f"Loaded model version: {meta.get('version', 'unknown')}")
     
     # Load test data
     print("Loading test data...")
-    test_data = load_snapshots_from_cs(start_iso, end_iso)
+    test_data, timings['load_data'] = _timed(load_snapshots_from_cs, start_iso, end_iso)
     if test_data.empty:
         return {'error': 'No test data available for the specified date range'}
     
@@ -200,29 +205,50 @@ def run_comprehensive_test(start_iso: str, end_iso: str, model_path: str = None)
         'timestamp': pd.Timestamp.utcnow().isoformat()
     }
     
+    # The stages are independent; run them concurrently (numpy, pandas and LightGBM release the GIL).
+    # The bootstrap and permutation stages each open a process pool, so they split the cores
+    _, pool_jobs = split_threads(2, n_jobs)
+    stages = {
+        'data_quality': (test_data_quality, test_data),
+        'performance': (test_model_performance, model, meta, test_data, pool_jobs),
+        'feature_analysis': (test_feature_importance, model, meta.get('feature_order', [])),
+        'permutation_importance': (test_permutation_importance, model, test_data, pool_jobs),
+        'business_rules': (test_business_rules, test_data),
+    }
+    stages_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(stages)) as pool:
+        futures = {name: pool.submit(_timed, *stage) for name, stage in stages.items()}
+        for name, fut in futures.items():
+            results[name], timings[name] = fut.result()
+    timings['stages_wall'] = round(time.perf_counter() - stages_start, 4)
+    
     # Test 1: Data Quality
     print("\n1. Testing data quality...")
-    results['data_quality'] = test_data_quality(test_data)
     print(f"   ✓ {results['data_quality']['total_samples']} samples analyzed")
     
     # Test 2: Model Performance
     print("\n2. Testing model performance...")
-    results['performance'] = test_model_performance(model, meta, test_data)
-    print(f"   ✓ AUC-ROC: {results['performance']['auc_roc']:.3f}")
+    ci = results['performance']['confidence_intervals']['auc_roc']
+    print(f"   ✓ AUC-ROC: {results['performance']['auc_roc']:.3f}"
+          + (f" (95% CI {ci['lo']:.3f}-{ci['hi']:.3f})" if ci['lo'] is not None else ""))
     print(f"   ✓ AUC-PR: {results['performance']['auc_pr']:.3f}")
     print(f"   ✓ F1-Score: {results['performance']['f1_score']:.3f}")
     
     # Test 3: Feature Importance
     print("\n3. Testing feature importance...")
-    results['feature_analysis'] = test_feature_importance(model, meta.get('feature_order', []))
     if 'top_5_features' in results['feature_analysis']:
         print(f"   ✓ Top 5 features: {', '.join(results['feature_analysis']['top_5_features'])}")
+    if 'ranking' in results['permutation_importance']:
+        print(f"   ✓ Top 5 by permutation (AUC drop): {', '.join(results['permutation_importance']['ranking'][:5])}")
     
     # Test 4: Business Rules
     print("\n4. Testing business rules...")
-    results['business_rules'] = test_business_rules(test_data)
     print(f"   ✓ Rules pass rate: {results['business_rules']['rules_pass_rate']:.2%}")
     
+    timings['total'] = round(time.perf_counter() - suite_start, 4)
+    results['timings'] = timings
+    print(f"\n⏱  Stage timings (s): " + ", ".join(f"{k}={v}" for k, v in timings.items()))
+    
     # Overall assessment
     print("\n" + "=" * 50)
     print("TEST SUMMARY")
@@ -1,13 +1,16 @@
-import os, json, time
+import os, json
 import pandas as pd
 import numpy as np
-from dateutil import parser as dtp
 from sklearn.model_selection import GroupShuffleSplit
 from lightgbm import LGBMClassifier
-from joblib import dump
-from .data_sources import load_snapshots_from_cs
-from .utils import evaluate, choose_thresholds
-from app.model_registry import save_model
+from .data_sources import load_snapshots_from_cs, iter_snapshots_from_cs, with_scored_requests
+from .utils import check_rss
+from .calibration import evaluate_calibrated
+from .cascade import fit_cascade
+from .sampling import sample_stream, TRAIN_MAX_ROWS
+from .profiling import stage, profiled, current, append_run_log
+from app.model_registry import save_model, write_meta, tenant_model_dir
+from app.drift import reference_statistics
 
 MODEL_DIR = os.getenv("MODEL_DIR", "./model_store")
 
@@ -18,6 +21,15 @@ BASE_FEATURES = [
 ]
 REGION_VOCAB = ["IN","SG","US","EU"]
 
+# LightGBM hyperparameters (sklearn API names) shared by the in-memory and out-of-core paths
+LGBM_PARAMS = dict(
+    n_estimators=600, learning_rate=0.03,
+    max_depth=-1, num_leaves=63,
+    subsample=0.9, colsample_bytree=0.8,
+    reg_alpha=0.1, reg_lambda=0.2,
+    random_state=42, n_jobs=-1
+)
+
 def prepare(df: pd.DataFrame):
     # Expect columns: snapshot_ts, label, features__<name>, features__region
     df = df.copy()
@@ -44,12 +56,91 @@ def time_split(X, y, groups):
     train_idx, val_idx = next(gss.split(X, y, groups))
     return train_idx, val_idx
 
-def train_model(start_iso: str, end_iso: str):
-    df = load_snapshots_from_cs(start_iso, end_iso)
+def build_meta(model, yva, p_va, Xva, Xref, feature_order: list, params: dict, wva=None,
+               n_jobs: int | None = None, **fields) -> dict:
+    """Model meta shared by the in-memory and out-of-core paths.
+
+    Fits calibration on part of the validation rows and evaluates the raw scores
+    `p_va` on the rest (`evaluate_calibrated`), calibrates the cascade on validation
+    rows `Xva` (a bounded sample is enough) and summarizes `Xref` as the drift
+    reference. `fields` (tenant, window, sample counts) go in after the version.
+    `n_jobs` caps the bootstrap's worker processes.
+    """
+    with stage("evaluate"):
+        evaluation = evaluate_calibrated(yva, p_va, wva, n_jobs=n_jobs)
+    with stage("cascade"):
+        cascade = fit_cascade(model, Xva, evaluation["thresholds"], evaluation["calibration"])
+    with stage("reference_stats"):
+        reference_stats = reference_statistics(Xref, feature_order)
+    return {
+        "version": f"risk-lgbm-{pd.Timestamp.utcnow().strftime('%Y-%m-%d-%H%M')}",
+        **fields,
+        "feature_order": feature_order,
+        "encoders": {"region_vocab": REGION_VOCAB},
+        "thresholds": evaluation["thresholds"],
+        "tier_rates": evaluation["tier_rates"],
+        "calibration": evaluation["calibration"],
+        "cascade": cascade,
+        "metrics": evaluation["metrics"],
+        "metrics_ci": evaluation["metrics_ci"],
+        "model_params": params,
+        "reference_stats": reference_stats
+    }
+
+def record_profile(meta: dict, tenant_id: str | None = None) -> dict:
+    """Put the run's stage profile into the saved meta.json and the registry's training run log."""
+    prof = current()
+    if prof is None:
+        return meta
+    meta["training_profile"] = prof.report()
+    write_meta(meta, meta["version"], tenant_id)
+    append_run_log(tenant_model_dir(tenant_id), meta, meta["training_profile"])
+    print(f"⏱️  Training took {meta['training_profile']['total_s']:.1f}s, peak RSS "
+          f"{meta['training_profile']['peak_rss_mb']:.0f}MB: " + ", ".join(
+              f"{k} {v['wall_s']:.1f}s" for k, v in meta["training_profile"]["stages"].items()))
+    return meta
+
+@profiled
+def train_model(start_iso: str, end_iso: str, cv_folds: int = 0, search: bool = False,
+                tenant_id: str | None = None, features_url: str | None = None, n_jobs: int | None = None,
+                tenant_registry: bool = False, compact: bool = False, max_rows: int = TRAIN_MAX_ROWS,
+                max_rss_mb: float = 0, journal_dir: str | None = None):
+    """Train and register a model.
+
+    `tenant_id` / `features_url` override the env-configured data source; with
+    `tenant_registry` the model is saved under the tenant's registry namespace
+    instead of the shared one. With `compact`, a size/latency-optimized sibling
+    (`<version>-compact`) is saved next to the full model. Windows with more than
+    `max_rows` snapshots are sampled down to it by label and week (train.sampling),
+    and the fit and validation metrics are weighted back to the full window.
+    Per-stage time and memory (train.profiling) go into meta and the run log.
+    `n_jobs` caps the threads and worker processes of every step; `max_rss_mb`
+    (0 = off) raises MemoryError when RSS is above it between stages. With
+    `journal_dir` (the service's JOURNAL_DIR), requests scored in the window are
+    added as snapshots, labeled from the CS pull (`with_scored_requests`).
+    """
+    sampling = None
+    if max_rows:
+        # Sampled while the response is flattened, so the full window never exists as a frame
+        chunks = iter_snapshots_from_cs(start_iso, end_iso, tenant_id=tenant_id, features_url=features_url)
+        if journal_dir:
+            chunks = with_scored_requests(chunks, journal_dir, start_iso, end_iso, tenant_id)
+        df, sampling = sample_stream(chunks, max_rows)
+        if sampling:
+            print(f"🎲 Sampled {sampling['rows_kept']} of {sampling['rows_seen']} snapshots "
+                  f"(ratio {sampling['ratio']:.3f}, {sampling['strata']} label x week strata)")
+    else:
+        df = load_snapshots_from_cs(start_iso, end_iso, tenant_id=tenant_id, features_url=features_url,
+                                    journal_dir=journal_dir)
     if df.empty:
         raise RuntimeError("No snapshots returned for training window")
+    w = df["sample_weight"].to_numpy(dtype=float) if sampling else None
+    check_rss(max_rss_mb)
     
-    X, y, groups, feature_order = prepare(df)
+    with stage("prepare"):
+        X, y, groups, feature_order = prepare(df)
+    del df
+    check_rss(max_rss_mb)
     
     # Check class distribution
     unique, counts = np.unique(y, return_counts=True)
@@ -62,40 +153,84 @@ def train_model(start_iso: str, end_iso: str):
         print(f"   All labels are: {unique[0]}")
         # Continue anyway to test the evaluation fix
     
-    train_idx, val_idx = time_split(X, y, groups)
+    with stage("time_split"):
+        train_idx, val_idx = time_split(X, y, groups)
     Xtr, Xva, ytr, yva = X[train_idx], X[val_idx], y[train_idx], y[val_idx]
+    wtr, wva = (w[train_idx], w[val_idx]) if w is not None else (None, None)
     
     # Check validation split class distribution too
     unique_val, counts_val = np.unique(yva, return_counts=True)
     val_distribution = dict(zip(unique_val, counts_val))
     print(f"📊 Validation Class Distribution: {val_distribution}")
 
-    clf = LGBMClassifier(
-        n_estimators=600, learning_rate=0.03,
-        max_depth=-1, num_leaves=63,
-        subsample=0.9, colsample_bytree=0.8,
-        reg_alpha=0.1, reg_lambda=0.2,
-        random_state=42, n_jobs=-1
-    )
-    clf.fit(Xtr, ytr)
-    p_va = clf.predict_proba(Xva)[:,1]
-    metrics = evaluate(yva, p_va)
-    thresholds = choose_thresholds(p_va, high_q=0.85, med_q=0.60)
+    params, search_result = LGBM_PARAMS, None
+    if search:
+        from .search import successive_halving
+        print("🔎 Running successive-halving hyperparameter search...")
+        # Select and early-stop on weeks carved out of the training split, so the reported
+        # validation metrics stay untouched by the search
+        gtr = np.asarray(groups)[train_idx]
+        if len(np.unique(gtr)) >= 2:
+            fit_idx, sel_idx = time_split(Xtr, ytr, gtr)
+            take = lambda a, idx: None if a is None else a[idx]
+            split = (Xtr[fit_idx], ytr[fit_idx], Xtr[sel_idx], ytr[sel_idx], take(wtr, fit_idx), take(wtr, sel_idx))
+            source = "training_weeks"
+        else:
+            print("⚠️  Warning: one training week; selecting on the validation split (metrics are selection-biased)")
+            split, source = (Xtr, ytr, Xva, yva, wtr, wva), "validation"
+        with stage("search"):
+            search_result = successive_halving(*split[:4], cpu_count=n_jobs, wtr=split[4], wva=split[5])
+        search_result["selection_split"] = {"source": source, "fit_samples": len(split[1]),
+                                            "selection_samples": len(split[3])}
+        params = search_result["winner"]["params"]
+    if n_jobs:
+        params = {**params, "n_jobs": n_jobs}
 
-    version = f"risk-lgbm-{pd.Timestamp.utcnow().strftime('%Y-%m-%d-%H%M')}"
-    meta = {
-        "version": version,
-        "trained_from": start_iso,
-        "trained_to": end_iso,
-        "training_samples": len(X),
-        "validation_samples": len(Xva),
-        "feature_order": feature_order,
-        "encoders": {"region_vocab": REGION_VOCAB},
-        "thresholds": thresholds,
-        "metrics": metrics
-    }
-    save_model(clf, meta, version)
-    return meta
+    clf = LGBMClassifier(**params)
+    with stage("fit"):
+        clf.fit(Xtr, ytr, sample_weight=wtr)
+    with stage("predict_validation"):
+        p_va = clf.predict_proba(Xva)[:,1]
+    check_rss(max_rss_mb)
+    meta = build_meta(clf, yva, p_va, Xva, Xtr, feature_order, params, wva, n_jobs=n_jobs,
+                      tenant_id=tenant_id, trained_from=start_iso, trained_to=end_iso,
+                      training_samples=len(X), validation_samples=len(Xva))
+    version = meta["version"]
+    if sampling:
+        meta["sampling"] = sampling
+    if journal_dir:
+        meta["journal_dir"] = journal_dir
+    if search_result:
+        meta["hyperparameter_search"] = search_result
+        # Metrics on rows the winner's config and tree count were chosen on are optimistic
+        meta["metrics_selection_biased"] = search_result["selection_split"]["source"] == "validation"
+    if cv_folds:
+        from .cv import cross_validate
+        with stage("cross_validation"):
+            meta["cross_validation"] = cross_validate(X, y, groups, n_folds=cv_folds, params=params,
+                                                      cpu_count=n_jobs, sample_weight=w)
+        cv_auc = meta["cross_validation"].get("aggregate", {}).get("auc_roc")
+        if cv_auc:
+            print(f"📊 Rolling-origin CV AUC-ROC: {cv_auc['mean']:.3f} ± {cv_auc['std']:.3f}")
+        check_rss(max_rss_mb)
+    small = None
+    if compact:
+        from .compact import compact_model, compact_meta
+        print("✂️  Building compact serving model...")
+        with stage("compact"):
+            small, meta["compaction"] = compact_model(clf, Xtr, Xva, yva, wtr, wva, n_jobs=n_jobs)
+        check_rss(max_rss_mb)
+        lat = meta["compaction"]["latency"]
+        print(f"   Chosen: {meta['compaction']['chosen']} ({lat['full']['single_row_us']:.0f}us -> "
+              f"{lat['compact']['single_row_us']:.0f}us per row)")
+    registry_tenant = tenant_id if tenant_registry else None
+    with stage("save_model"):
+        save_model(clf, meta, version, tenant_id=registry_tenant)
+    if small is not None:
+        with stage("compact_save"):
+            small_meta = compact_meta(meta, small, Xva, yva, wva, n_jobs=n_jobs)
+            save_model(small, small_meta, small_meta["version"], tenant_id=registry_tenant)
+    return record_profile(meta, registry_tenant)
 
 if __name__ == "__main__":
     # Example: train on last 90 days fully labeled (you can pass custom dates via env)
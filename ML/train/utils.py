@@ -1,10 +1,13 @@
-import pandas as pd
+import os, sys, ctypes, shutil, tempfile
+from contextlib import contextmanager
+import numpy as np
 from sklearn.metrics import roc_auc_score, average_precision_score, brier_score_loss
 
-def evaluate(y_true, y_prob):
-    """Evaluate model performance with handling for single-class scenarios"""
-    import numpy as np
-    
+def evaluate(y_true, y_prob, sample_weight=None):
+    """Evaluate model performance with handling for single-class scenarios
+
+    `sample_weight` (e.g. from train.sampling) makes the metrics estimate the unsampled data.
+    """
     # Check if we have both classes
     unique_classes = np.unique(y_true)
     
@@ -13,18 +16,97 @@ def evaluate(y_true, y_prob):
         print("   AUC metrics cannot be calculated. Using fallback metrics.")
         return {
             "auc_roc": 0.5,  # Random performance for single class
-            "auc_pr": float(np.mean(y_true)),  # Base rate
-            "brier": float(brier_score_loss(y_true, y_prob))
+            "auc_pr": float(np.average(y_true, weights=sample_weight)),  # Base rate
+            "brier": float(brier_score_loss(y_true, y_prob, sample_weight=sample_weight))
         }
     
     return {
-        "auc_roc": float(roc_auc_score(y_true, y_prob)),
-        "auc_pr":  float(average_precision_score(y_true, y_prob)),
-        "brier":   float(brier_score_loss(y_true, y_prob))
+        "auc_roc": float(roc_auc_score(y_true, y_prob, sample_weight=sample_weight)),
+        "auc_pr":  float(average_precision_score(y_true, y_prob, sample_weight=sample_weight)),
+        "brier":   float(brier_score_loss(y_true, y_prob, sample_weight=sample_weight))
     }
 
-def choose_thresholds(y_prob, high_q=0.85, med_q=0.60):
-    import numpy as np
-    hi = float(np.quantile(y_prob, high_q))
-    md = float(np.quantile(y_prob, med_q))
-    return {"med": md, "high": hi}
\ No newline at end of file
+TIER_MED_RISK = float(os.getenv("TIER_MED_RISK", "0.4"))
+TIER_HIGH_RISK = float(os.getenv("TIER_HIGH_RISK", "0.7"))
+
+def choose_thresholds(med_risk: float = TIER_MED_RISK, high_risk: float = TIER_HIGH_RISK) -> dict:
+    """Tier cut points on calibrated risk: `med` from `med_risk`, `high` from `high_risk`.
+
+    They are risk levels, not score quantiles, so a better-calibrated model moves users between tiers.
+    """
+    if not 0.0 <= med_risk <= high_risk <= 1.0:
+        raise ValueError(f"Tier risk levels must satisfy 0 <= med <= high <= 1, got {med_risk}, {high_risk}")
+    return {"med": float(med_risk), "high": float(high_risk)}
+
+def tier_rates(p_cal, thresholds: dict, sample_weight=None) -> dict:
+    """Share of (weighted) calibrated scores `p_cal` in each tier: the capacity the thresholds imply."""
+    p_cal = np.asarray(p_cal, dtype=float)
+    w = np.ones(len(p_cal)) if sample_weight is None else np.asarray(sample_weight, dtype=float)
+    if not len(p_cal) or w.sum() <= 0:
+        return {"low": 0.0, "med": 0.0, "high": 0.0}
+    high = p_cal >= thresholds["high"]
+    med = (p_cal >= thresholds["med"]) & ~high
+    share = lambda m: float(w[m].sum() / w.sum())
+    return {"low": share(~(high | med)), "med": share(med), "high": share(high)}
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (Linux /proc; falls back to peak RSS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+TRIM_AT = 0.75  # share of the ceiling above which freed allocator memory is handed back first
+try:
+    _LIBC = ctypes.CDLL("libc.so.6")
+    _LIBC.malloc_trim  # glibc only
+except (OSError, AttributeError):
+    _LIBC = None
+
+def release_memory():
+    """Return freed heap pages to the OS. Freed pandas / Arrow buffers (one decoded row group
+    after another, a frame dropped after `prepare`) otherwise stay in the allocators' RSS."""
+    pa = sys.modules.get("pyarrow")  # only if something in this process decoded Arrow data
+    if pa is not None:
+        pa.default_memory_pool().release_unused()
+    if _LIBC is not None:
+        _LIBC.malloc_trim(0)
+
+def check_rss(max_rss_mb: float) -> float:
+    """Raise MemoryError when the process RSS is above the ceiling; returns current RSS in MB."""
+    rss = current_rss_mb()
+    if max_rss_mb and rss > TRIM_AT * max_rss_mb:
+        release_memory()
+        rss = current_rss_mb()
+    if max_rss_mb and rss > max_rss_mb:
+        raise MemoryError(f"RSS {rss:.0f} MB exceeded training ceiling of {max_rss_mb:.0f} MB")
+    return rss
+
+def split_threads(n_tasks: int, cpu_count: int | None = None):
+    """Split CPU cores between concurrent tasks: returns (workers, threads per worker)."""
+    cpus = cpu_count or os.cpu_count() or 1
+    workers = max(1, min(n_tasks, cpus))
+    return workers, max(1, cpus // workers)
+
+@contextmanager
+def shared_arrays(**arrays):
+    """Write arrays to a temp dir as .npy for read-only memory-mapping by worker processes.
+    None values are skipped (read them back with ``load_shared(..., optional=True)``)."""
+    data_dir = tempfile.mkdtemp(prefix="ml-shared-")
+    try:
+        for name, arr in arrays.items():
+            if arr is None:
+                continue
+            np.save(os.path.join(data_dir, f"{name}.npy"), np.ascontiguousarray(arr))
+        yield data_dir
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def load_shared(data_dir: str, name: str, optional: bool = False) -> np.ndarray | None:
+    """Memory-map a shared array; with `optional`, None if it was not written (e.g. no weights)."""
+    path = os.path.join(data_dir, f"{name}.npy")
+    if optional and not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,255 @@
+"""
+Chunked, parallel validation of training extracts against a declarative spec.
+
+A spec maps each column to its type (``int``, ``float``, ``str`` or ``category``),
+nullability, an optional ``[min, max]`` range, for categories the allowed values,
+and ``unique`` for key columns. `compile_spec` checks it once and turns it into
+per-column numpy checks.
+
+Sources are cut into chunks. Parquet row groups are read by the worker that
+validates them. CSV / JSONL chunks and the CS API response are read by the parent.
+The API is read in one request, because its 7d/30d features depend on the requested
+window. Every chunk is reduced to a small additive summary (counts, min/max, sums,
+value counts), so memory stays bounded by the chunks in flight. The exception is
+unique columns, which keep one 8-byte hash per row. Summaries are merged in the
+parent and turned into a JSON-serialisable report.
+"""
+
+import os, glob, json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterator, List
+import numpy as np
+import pandas as pd
+import requests
+from app.config import REGION_VOCAB
+from .data_sources import CS_FEATURES_URL, TENANT_ID
+
+CHUNK_ROWS = int(os.getenv("VALIDATE_CHUNK_ROWS", "250000"))
+MAX_UNKNOWN_VALUES = 20   # distinct out-of-vocabulary values kept per column in the report
+
+# Ranges as the pipeline expects them; out-of-range values are warnings, type / null errors fail
+DEFAULT_SPEC = {
+    "userId":                   {"type": "str", "nullable": False, "unique": True},
+    "activity_7d":              {"type": "int", "nullable": False, "min": 0, "max": 168},   # hours in a week
+    "activity_30d":             {"type": "int", "nullable": False, "min": 0, "max": 720},   # hours in a month
+    "time_since_last_use_days": {"type": "int", "nullable": False, "min": 0, "max": 365},
+    "failed_renewals_30d":      {"type": "int", "nullable": False, "min": 0, "max": 10},
+    "tickets_7d":               {"type": "int", "nullable": False, "min": 0, "max": 50},
+    "tickets_30d":              {"type": "int", "nullable": False, "min": 0, "max": 200},
+    "plan_value":               {"type": "float", "nullable": False, "min": 0, "max": 10000},
+    "usage_score":              {"type": "float", "nullable": False, "min": 0, "max": 1},
+    "region":                   {"type": "category", "nullable": True, "values": REGION_VOCAB},
+    "label":                    {"type": "category", "nullable": False, "values": [0, 1]},
+}
+TYPES = ("int", "float", "str", "category")
+
+class CompiledSpec:
+    """A checked spec: one (name, type, nullable, lo, hi, values, unique) tuple per column."""
+
+    def __init__(self, spec: Dict[str, Dict]):
+        self.columns = []
+        for name, rule in spec.items():
+            unknown = set(rule) - {"type", "nullable", "min", "max", "values", "unique"}
+            if rule.get("type") not in TYPES or unknown:
+                raise ValueError(f"bad spec for {name}: type must be one of {TYPES}, unknown keys {sorted(unknown)}")
+            if rule["type"] == "category" and not rule.get("values"):
+                raise ValueError(f"bad spec for {name}: category columns need 'values'")
+            lo, hi = rule.get("min", -np.inf), rule.get("max", np.inf)
+            values = list(rule.get("values") or [])
+            self.columns.append((name, rule["type"], bool(rule.get("nullable", True)), float(lo), float(hi), values,
+                                 bool(rule.get("unique", False))))
+        self.spec = spec
+
+def compile_spec(spec: Dict[str, Dict] | None = None) -> CompiledSpec:
+    return CompiledSpec(spec or DEFAULT_SPEC)
+
+def load_spec(path: str | None) -> CompiledSpec:
+    """Compile the spec in a JSON file (same layout as DEFAULT_SPEC), or the default spec."""
+    if not path:
+        return compile_spec()
+    with open(path) as f:
+        return compile_spec(json.load(f))
+
+def _key(v) -> str:
+    # 1.0 from a float column and 1 from an int column are the same category value
+    return str(int(v)) if isinstance(v, (float, np.floating)) and float(v).is_integer() else str(v)
+
+def _flat(df: pd.DataFrame) -> pd.DataFrame:
+    # Snapshot layout (features__<name>) and flat API rows validate against the same spec
+    return df.rename(columns=lambda c: c[len("features__"):] if c.startswith("features__") else c)
+
+def validate_chunk(df: pd.DataFrame, spec: CompiledSpec) -> Dict:
+    """Additive summary of one chunk; combine with `merge_summaries`."""
+    df = _flat(df)
+    out = {"rows": len(df), "chunks": 1, "columns": {}}
+    for name, kind, _, lo, hi, values, unique in spec.columns:
+        if name not in df:
+            out["columns"][name] = {"missing_rows": len(df)}
+            continue
+        col = df[name]
+        null = col.isna().to_numpy()
+        s = {"missing_rows": 0, "nulls": int(null.sum()), "type_errors": 0}
+        if kind in ("int", "float"):
+            v = pd.to_numeric(col, errors="coerce").to_numpy(dtype=float)
+            bad = np.isnan(v) & ~null
+            if kind == "int":
+                bad |= ~np.isnan(v) & (v != np.round(v))
+            s["type_errors"] = int(bad.sum())
+            v = v[~np.isnan(v)]
+            s.update(below=int((v < lo).sum()), above=int((v > hi).sum()), count=len(v),
+                     sum=float(v.sum()), sumsq=float((v * v).sum()),
+                     min=float(v.min()) if len(v) else None, max=float(v.max()) if len(v) else None)
+        elif kind == "category":
+            counts = col[~null].value_counts()
+            allowed = {_key(x) for x in values}
+            s["values"] = {_key(k): int(c) for k, c in counts.items() if _key(k) in allowed}
+            unknown = {_key(k): int(c) for k, c in counts.items() if _key(k) not in allowed}   # most frequent first
+            s["unknown_rows"] = sum(unknown.values())
+            s["unknown"] = dict(list(unknown.items())[:5 * MAX_UNKNOWN_VALUES])
+        else:
+            s["empty"] = int((col[~null].astype(str).str.len() == 0).sum())
+        if unique:
+            # Snapshot extracts hold one row per user and snapshot, API extracts one per user
+            keys = df.loc[~null, [name] + (["snapshot_ts"] if "snapshot_ts" in df else [])].astype(str)
+            s["hashes"] = [pd.util.hash_pandas_object(keys, index=False).to_numpy()]
+        out["columns"][name] = s
+    return out
+
+def merge_summaries(a: Dict | None, b: Dict) -> Dict:
+    if a is None:
+        return b
+    a["rows"] += b["rows"]
+    a["chunks"] += b["chunks"]
+    for name, sb in b["columns"].items():
+        sa = a["columns"].setdefault(name, {})
+        for k, v in sb.items():
+            if k == "hashes":
+                sa[k] = sa.get(k, []) + v
+            elif k == "values":
+                sa[k] = dict(Counter(sa.get(k, {})) + Counter(v))
+            elif k == "unknown":
+                # Bounded: garbage columns can have as many distinct values as rows
+                sa[k] = dict((Counter(sa.get(k, {})) + Counter(v)).most_common(5 * MAX_UNKNOWN_VALUES))
+            elif k == "min":
+                sa[k] = v if sa.get(k) is None else sa[k] if v is None else min(sa[k], v)
+            elif k == "max":
+                sa[k] = v if sa.get(k) is None else sa[k] if v is None else max(sa[k], v)
+            else:
+                sa[k] = sa.get(k, 0) + v
+    return a
+
+def finalize(summary: Dict | None, spec: CompiledSpec) -> Dict:
+    """Report: per-column stats plus a list of violations; ``ok`` is False on any error."""
+    summary = summary or {"rows": 0, "chunks": 0, "columns": {}}
+    rows, columns, violations = summary["rows"], {}, []
+
+    def flag(name, check, count, severity, **extra):
+        if count:
+            violations.append({"column": name, "check": check, "count": int(count), "severity": severity, **extra})
+
+    for name, kind, nullable, lo, hi, values, unique in spec.columns:
+        s = summary["columns"].get(name, {"missing_rows": rows})
+        flag(name, "missing", s.get("missing_rows", 0), "error")
+        flag(name, "type", s.get("type_errors", 0), "error", expected=kind)
+        if not nullable:
+            flag(name, "null", s.get("nulls", 0), "error")
+        col = {k: v for k, v in s.items() if k not in ("sum", "sumsq", "hashes")}
+        if unique and s.get("hashes"):
+            keys = np.concatenate(s["hashes"])
+            col["unique"] = int(len(np.unique(keys)))
+            flag(name, "duplicate", len(keys) - col["unique"], "error")
+        bounds = [b if np.isfinite(b) else None for b in (lo, hi)]
+        if kind in ("int", "float") and s.get("count"):
+            mean = s["sum"] / s["count"]
+            col["mean"] = round(mean, 6)
+            col["std"] = round(float(np.sqrt(max(s["sumsq"] / s["count"] - mean * mean, 0.0))), 6)
+            flag(name, "range", s["below"] + s["above"], "warning", expected=bounds, actual=[s["min"], s["max"]])
+        if kind == "category":
+            unknown = dict(sorted(s.get("unknown", {}).items(), key=lambda kv: -kv[1])[:MAX_UNKNOWN_VALUES])
+            col["unknown"] = unknown
+            flag(name, "vocabulary", s.get("unknown_rows", 0), "warning", expected=values, examples=list(unknown))
+        columns[name] = col
+    return {"ok": not any(v["severity"] == "error" for v in violations), "rows": rows,
+            "chunks": summary["chunks"], "violations": violations, "columns": columns}
+
+# ------------------------------------------------------------------------------------------
+# Chunk sources. A task is a picklable tuple; `_load` runs in the worker for Parquet row groups.
+
+def _files(path: str) -> List[str]:
+    if os.path.isdir(path):
+        return sorted(p for ext in ("parquet", "csv", "jsonl") for p in glob.glob(os.path.join(path, "**", f"*.{ext}"), recursive=True))
+    return [path]
+
+def iter_file_tasks(paths: List[str], chunk_rows: int = CHUNK_ROWS) -> Iterator[tuple]:
+    import pyarrow.parquet as pq
+    for path in (f for p in paths for f in _files(p)):
+        if path.endswith(".parquet"):
+            for rg in range(pq.ParquetFile(path).num_row_groups):
+                yield ("parquet", path, rg)
+        elif path.endswith(".csv"):
+            for df in pd.read_csv(path, chunksize=chunk_rows):
+                yield ("frame", df)
+        else:
+            for df in pd.read_json(path, lines=True, chunksize=chunk_rows):
+                yield ("frame", df)
+
+def fetch_api_extract(start: str, end: str, tenant_id: str | None = None,
+                      features_url: str | None = None) -> pd.DataFrame:
+    """The CS API extract for ``[start, end]`` as flat rows (one per customer)."""
+    params = {"startDate": start, "endDate": end, "tenantId": tenant_id or TENANT_ID}
+    resp = requests.get(features_url or CS_FEATURES_URL, params=params, timeout=60)
+    resp.raise_for_status()
+    body = resp.json()
+    if not body.get("success", False):
+        raise RuntimeError(f"API Error: {body.get('message', 'Unknown error')}")
+    items = body.get("data", [])
+    # Columnar flatten of {userId, features: {...}, label}; missing keys stay missing for the checks
+    df = pd.DataFrame([it.get("features", {}) for it in items])
+    df["userId"] = [it.get("userId") for it in items]
+    if any("label" in it for it in items):
+        df["label"] = [it.get("label") for it in items]
+    return df
+
+def iter_api_tasks(start: str, end: str, tenant_id: str | None = None, features_url: str | None = None,
+                   chunk_rows: int = CHUNK_ROWS) -> Iterator[tuple]:
+    """One API request for the whole window, validated in `chunk_rows` slices.
+
+    The endpoint returns every customer for any window, with 7d/30d features relative
+    to it, so splitting the window would repeat customers and change the features.
+    """
+    df = fetch_api_extract(start, end, tenant_id, features_url)
+    for i in range(0, len(df), chunk_rows):
+        yield ("frame", df.iloc[i:i + chunk_rows])
+
+def _load(task: tuple) -> pd.DataFrame:
+    if task[0] == "frame":
+        return task[1]
+    import pyarrow.parquet as pq
+    return pq.ParquetFile(task[1]).read_row_group(task[2]).to_pandas()
+
+def _run(task: tuple, spec: CompiledSpec) -> Dict:
+    return validate_chunk(_load(task), spec)
+
+def validate_tasks(tasks: Iterator[tuple], spec: CompiledSpec, workers: int = 1) -> Dict:
+    """Validate chunk tasks over a process pool and return the merged summary.
+
+    At most ``2 * workers`` chunks are in flight, so memory does not grow with the
+    number of chunks. ``workers <= 1`` validates in-process.
+    """
+    summary = None
+    if workers <= 1:
+        for task in tasks:
+            summary = merge_summaries(summary, _run(task, spec))
+        return summary
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for task in tasks:
+            pending.add(pool.submit(_run, task, spec))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    summary = merge_summaries(summary, fut.result())
+        for fut in pending:
+            summary = merge_summaries(summary, fut.result())
+    return summary
@@ -7,13 +7,12 @@ Run this after starting the backend server with the mock data loaded.
 
 Usage:
     python train_model.py [--days=90] [--backend_url=http://localhost:3000]
+    python train_model.py --snapshots_dir=./snapshots [--max_rss_mb=2048]   # out-of-core
 """
 
 import os
 import sys
 import argparse
-import pandas as pd
-from train.training import train_model
 
 def main():
     parser = argparse.ArgumentParser(description='Train Customer Success ML Model')
@@ -26,12 +25,31 @@ def main():
                        help='Tenant ID to use for training data')
     parser.add_argument('--mock_data_date', type=str, default='2025-08-22',
                        help='Date of mock data events (default: 2025-08-22)')
+    parser.add_argument('--cv_folds', type=int, default=0,
+                       help='Rolling-origin CV folds over weekly groups, trained in parallel (default: 0 = off)')
+    parser.add_argument('--search', action='store_true',
+                       help='Run a budgeted parallel hyperparameter search before the final fit')
+    parser.add_argument('--tenant_registry', action='store_true',
+                       help='Save into the tenant registry namespace (model_store/tenants/<tenant_id>/)')
+    parser.add_argument('--compact', action='store_true',
+                       help='Also save a size/latency-optimized <version>-compact model (truncation, pruning, distillation)')
+    parser.add_argument('--snapshots_dir', type=str, default=None,
+                       help='Train out-of-core from weekly Parquet partitions instead of the CS API')
+    parser.add_argument('--max_rss_mb', type=float, default=None,
+                       help='RSS ceiling in MB for out-of-core training (default: TRAIN_MAX_RSS_MB or none)')
+    parser.add_argument('--max_rows', type=int, default=None,
+                       help='Sample larger windows down to this many snapshots by label and week (default: TRAIN_MAX_ROWS or none)')
+    parser.add_argument('--journal_dir', type=str, default=None,
+                       help='Also train on requests the service scored in the window (its JOURNAL_DIR)')
     
     args = parser.parse_args()
+    # Deferred so --help and argument errors don't pay for pandas / LightGBM / scikit-learn
+    import pandas as pd
+    from train.training import train_model
+    from train.sampling import TRAIN_MAX_ROWS
     
-    # Set environment variables for the training process
-    os.environ['CS_FEATURES_URL'] = f"{args.backend_url}/customers/features/public"
-    os.environ['TENANT_ID'] = args.tenant_id
+    # Tenant config is passed explicitly (env vars are read once, at import of train.data_sources)
+    features_url = f"{args.backend_url}/customers/features/public"
     
     print("=" * 60)
     print("Customer Success ML Model Training")
@@ -55,7 +73,16 @@ def main():
     try:
         # Train the model
         print("Starting model training...")
-        meta = train_model(start.isoformat(), end.isoformat())
+        if args.snapshots_dir:
+            from train.chunked import train_model_chunked, MAX_RSS_MB
+            print(f"Out-of-core mode: streaming Parquet partitions from {args.snapshots_dir}")
+            meta = train_model_chunked(args.snapshots_dir, max_rss_mb=args.max_rss_mb or MAX_RSS_MB)
+        else:
+            meta = train_model(start.isoformat(), end.isoformat(), cv_folds=args.cv_folds, search=args.search,
+                               tenant_id=args.tenant_id, features_url=features_url,
+                               tenant_registry=args.tenant_registry, compact=args.compact,
+                               max_rows=args.max_rows if args.max_rows is not None else TRAIN_MAX_ROWS,
+                               journal_dir=args.journal_dir)
         
         print("\n" + "=" * 60)
         print("TRAINING COMPLETED SUCCESSFULLY!")
@@ -63,6 +90,9 @@ def main():
         print(f"Model Version: {meta['version']}")
         print(f"Training Samples: {meta.get('training_samples', 'Unknown')}")
         print(f"AUC-ROC: {meta.get('metrics', {}).get('auc_roc', 'Unknown'):.3f}")
+        auc_ci = meta.get('metrics_ci', {}).get('auc_roc', {})
+        if auc_ci.get('lo') is not None:
+            print(f"AUC-ROC 95% CI: [{auc_ci['lo']:.3f}, {auc_ci['hi']:.3f}] ({meta['metrics_ci']['n_boot']} bootstrap resamples)")
         print(f"AUC-PR: {meta.get('metrics', {}).get('auc_pr', 'Unknown'):.3f}")
         print(f"Brier Score: {meta.get('metrics', {}).get('brier', 'Unknown'):.3f}")
         print()
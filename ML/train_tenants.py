@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Multi-tenant Training Script for Customer Success ML Models
+
+Trains one churn model per tenant concurrently under a global CPU and memory budget.
+Each model is saved to model_store/tenants/<tenant_id>/ and a run summary
+(duration, sample counts, metrics per tenant) is written next to them.
+
+Usage:
+    python train_tenants.py --tenants=t1,t2,t3 [--days=90] [--cpu_budget=8] [--mem_budget_mb=8192]
+    python train_tenants.py --tenants_file=tenants.json   # [{"tenant_id": "...", "features_url": "..."}]
+"""
+
+import sys
+import json
+import argparse
+import pandas as pd
+from train.orchestrator import train_tenants, MEM_PER_TENANT_MB
+
+def main():
+    parser = argparse.ArgumentParser(description='Train Customer Success ML Models for many tenants')
+    parser.add_argument('--tenants', type=str, default='',
+                       help='Comma-separated tenant IDs')
+    parser.add_argument('--tenants_file', type=str, default=None,
+                       help='JSON list of tenant IDs or {"tenant_id", "features_url"} objects')
+    parser.add_argument('--days', type=int, default=90,
+                       help='Number of days of historical data to use for training (default: 90)')
+    parser.add_argument('--backend_url', type=str, default='http://localhost:3000',
+                       help='Backend API URL (default: http://localhost:3000)')
+    parser.add_argument('--mock_data_date', type=str, default='2025-08-22',
+                       help='Date of mock data events (default: 2025-08-22)')
+    parser.add_argument('--cpu_budget', type=int, default=None,
+                       help='Total cores shared by all tenants (default: all cores)')
+    parser.add_argument('--mem_budget_mb', type=float, default=None,
+                       help='Total memory budget in MB (default: unbounded)')
+    parser.add_argument('--mem_per_tenant_mb', type=float, default=MEM_PER_TENANT_MB,
+                       help=f'Peak memory per tenant in MB, enforced when --mem_budget_mb is set (default: {MEM_PER_TENANT_MB:.0f})')
+
+    args = parser.parse_args()
+
+    tenants = [t.strip() for t in args.tenants.split(',') if t.strip()]
+    if args.tenants_file:
+        with open(args.tenants_file) as f:
+            tenants += json.load(f)
+    if not tenants:
+        print("❌ Error: No tenants given. Use --tenants or --tenants_file")
+        return 1
+
+    features_url = f"{args.backend_url}/customers/features/public"
+    tenants = [t if isinstance(t, dict) else {"tenant_id": t, "features_url": features_url} for t in tenants]
+
+    end = pd.Timestamp(args.mock_data_date) + pd.Timedelta(days=1)
+    start = end - pd.Timedelta(days=args.days)
+
+    print("=" * 60)
+    print("Customer Success ML Multi-tenant Training")
+    print("=" * 60)
+    print(f"Tenants: {len(tenants)}")
+    print(f"Training period: {start.strftime('%Y-%m-%d')} to {end.strftime('%Y-%m-%d')}")
+    print()
+
+    summary = train_tenants(tenants, start.isoformat(), end.isoformat(), cpu_budget=args.cpu_budget,
+                            mem_budget_mb=args.mem_budget_mb, mem_per_tenant_mb=args.mem_per_tenant_mb)
+
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    print(f"{'tenant':<40} {'status':<7} {'secs':>7} {'samples':>9} {'auc':>6}")
+    for r in summary["tenants"]:
+        auc = r.get("metrics", {}).get("auc_roc")
+        auc = f"{auc:.3f}" if auc is not None else "-"
+        print(f"{r['tenant_id']:<40} {r['status']:<7} {r['duration_seconds']:>7.1f} "
+              f"{r.get('training_samples', 0):>9} {auc:>6}")
+    print(f"\nWall time: {summary['wall_seconds']:.1f}s, {summary['succeeded']} ok, {summary['failed']} failed")
+    print(f"Summary saved to {summary['summary_path']}")
+
+    return 0 if summary["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
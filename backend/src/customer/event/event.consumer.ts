@@ -12,6 +12,7 @@ import { NotificationService } from 'src/notification/notification.service';
 // ML Service interfaces
 interface  MLScoreRequest {
   userId: string;
+  tenantId?: string; // routes to the tenant's own model when one is registered
   features: {
     activity_7d?: number;
     activity_30d?: number;
@@ -101,6 +102,7 @@ export class CustomerEventConsumer {
             const mlServiceUrl = this.configService.get<string>('ML_SERVICE_URL', 'http://localhost:8000');
             const mlRequest: MLScoreRequest = {
               userId: customerIdFromEvent,
+              tenantId,
               features: {
                 activity_7d: userFeatures?.features?.activity_7d || 0,
                 activity_30d: userFeatures?.features?.activity_30d || 0,